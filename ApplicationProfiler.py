@@ -9,13 +9,25 @@
 
 import ConfigParser
 import numpy as np
-import h5py as h5
+import functools
+import time
+import os
 import re
 
 import sys
 import traceback
 
 from lib.AlphaTree import AlphaTree
+from lib.Footprint import CountBlocks, ProfileMemory
+from lib.RunStats import RunStats
+from lib.LRUStack import LRUStack
+from lib.ProfileWriter import SaveProfile, SaveCounts, PackTreeState
+from lib.Phases import PhaseTracker
+from lib.ReferenceEngine import ReferenceProfile
+from lib.ChunkProfile import ProfileChunks
+from lib.StreamDemux import DemultiplexTrace
+from lib.TracePipeline import AccessBatches
+from lib.TraceFormats import binIdle
 
 # usage string
 usage_info = "USAGE: python ApplicationProfiler.py <config_file> \n\
@@ -23,7 +35,9 @@ config_file: file specifying the configuration for the application profiler\n\n\
 all options for profiler must be under header \"[profiler]\" \n\
 profiler options: \n\
 \t- traceFile: string indicating the name of the file that contains\n\
-\tthe trace to be analyzed (plain-text)\n\n\
+\tthe trace to be analyzed (plain-text). Lines \"i,<N>\" are runs of\n\
+\tN inactive cycles, and other lines that are not accesses are one\n\
+\tinactive cycle\n\n\
 \t- outputFile: string indicating the name of the file to save the\n\
 \tapplication profile to (automatically appends \".h5\")\n\n\
 \t- reuseBins: number of bins to group reuse distances into. For\n\
@@ -32,9 +46,68 @@ profiler options: \n\
 \talpha values are calculated for each bin. Default value is 3\n\n\
 \t- blockSize: size of the largest cache block to model(in bytes).\n\
 \tdefault is 512 bytes\n\n\
+\t- statsFile: name of a JSON file to save run statistics to (sampled\n\
+\tper-stage times, throughput and LRU depth). Disabled by default\n\n\
+\t- statsSampleRate: one in every statsSampleRate lines is timed.\n\
+\tDefault is 1000\n\n\
+\t- progressInterval: seconds between progress lines when statsFile\n\
+\tis set. Default is 10\n\n\
+\t- windowSize: if > 0, the trace is also split into windows of\n\
+\twindowSize accesses and one profile is saved per phase as\n\
+\t<outputFile>_phase<i>.h5, with the phase sequence saved in\n\
+\t<outputFile>_phases.json. Default is 0 (disabled)\n\n\
+\t- phaseDetection: \"fixed\" (every window is a phase) or \"auto\"\n\
+\t(consecutive windows with similar reuse distances are merged).\n\
+\tDefault is fixed\n\n\
+\t- phaseThreshold: L1 distance (0 - 2) between reuse distance\n\
+\thistograms that starts a new phase in auto mode. Default is 0.2\n\n\
+\t- readSize: bytes read from traceFile at a time by the reader\n\
+\tthread. Default is 1048576\n\n\
+\t- queueDepth: max number of buffers queued between the reader,\n\
+\tparser and modelling stages. Default is 8\n\n\
+\t- parseProcesses: number of processes parsing buffers. 0 parses in\n\
+\ta thread. Default is 1\n\n\
+\t- maxReuseDistance: if > 0, reuse distances are only measured up to\n\
+\tthis many blocks. Longer reuse distances are counted in a single\n\
+\t\"far\" bin (the last entry of reusePMF and loadProp) with its own\n\
+\talpha bin, and the LRU stack holds at most this many blocks.\n\
+\tDefault is 0 (every reuse distance is measured)\n\n\
+\t- saveCounts: if True, the raw counts are also saved to\n\
+\t<outputFile>_counts.h5, so profiles of several trace shards can be\n\
+\tmerged with ProfileMerger.py. Default is False\n\n\
+\t- footprintPass: \"hll\" (HyperLogLog estimate) or \"exact\" to count\n\
+\tthe distinct blocks of the trace in a fast pre-pass. The count and\n\
+\tthe estimated memory needed are printed, and the count lists are\n\
+\tsized once from it. Default is no pre-pass\n\n\
+\t- memoryBudget: if > 0, the trace is rejected before profiling if\n\
+\tthe estimated memory needed is larger (in bytes). Runs a \"hll\"\n\
+\tpre-pass if footprintPass is not set. Default is 0\n\n\
+\t- engine: \"fast\" or \"reference\" (the plain single-threaded\n\
+\tprofiler in lib/ReferenceEngine.py, used to check faster engines).\n\
+\tThe reference engine does not save phases or counts. Default is fast\n\n\
+\t- parallelChunks: if > 1, the trace is cut into this many chunks that\n\
+\tare profiled in parallel (see lib/ChunkProfile.py). The profile is the\n\
+\tsame as a serial run. Not supported with windowSize. Default is 0\n\n\
+\t- chunkProcesses: number of processes profiling chunks, and of\n\
+\tprocesses updating alpha trees. Default is the number of cpus\n\n\
+\t- streamRegEx: regular expression capturing the CPU or thread id of\n\
+\teach line of an interleaved trace as group 1 (e.g. \"^(\\d+),\" for\n\
+\tlines like \"3,r,0x10\"). The match is removed from each line, and\n\
+\tlines without an id go to every stream seen so far. Each stream is\n\
+\tprofiled by a process of its own, in one pass over the trace, and\n\
+\tsaved to <outputFile>_<id>.h5. Default is \"\" (one profile)\n\n\
+\t- maxStreams: max number of streams. Default is 64\n\n\
+\t- exactReuseDistances: if > 0, reuse distances below this are saved\n\
+\tone per entry of reusePMF and loadProp, and longer ones in buckets\n\
+\t[E * 2**k, E * 2**(k + 1)) (E = exactReuseDistances). The generator\n\
+\tpicks a bucket and then a distance in it. Not supported with\n\
+\tmaxReuseDistance. Default is 0 (every distance has an entry)\n\n\
 Example configurations can be found in the \"examples\" directory\n\n"
 
-def GenerateApplicationProfile(traceFile, outputFile, reuseBins = 3, blockSize = 512):
+def GenerateApplicationProfile(traceFile, outputFile, reuseBins = 3, blockSize = 512, statsFile = None, statsSampleRate = 1000, progressInterval = 10.0, \
+    windowSize = 0, phaseDetection = "fixed", phaseThreshold = 0.2, readSize = 2**20, queueDepth = 8, parseProcesses = 1, \
+    maxReuseDistance = 0, saveCounts = False, footprintPass = "", memoryBudget = 0, engine = "fast", \
+    parallelChunks = 0, chunkProcesses = 0, streamRegEx = "", maxStreams = 64, exactReuseDistances = 0):
     """ GenerateApplicationProfile: this function operates as the main routine
         used to create an application profile from an input address & instruction
         trace
@@ -53,7 +126,73 @@ def GenerateApplicationProfile(traceFile, outputFile, reuseBins = 3, blockSize =
             alpha values are calculated for each bin. Default value is 3
             
             - blockSize: desired size of largest cache block to model. Default
-            is 512 bytes"""
+            is 512 bytes
+            
+            - statsFile: name of a JSON file to save run statistics to. 
+            Statistics are not collected if left as default
+            
+            - statsSampleRate: one in every statsSampleRate lines is timed
+            
+            - progressInterval: seconds between progress lines (0 disables)
+            
+            - windowSize: number of accesses per window. If > 0, one profile
+            is also saved per phase (see PhaseTracker). Default is 0
+            
+            - phaseDetection: "fixed" to save every window as a phase, or
+            "auto" to merge similar consecutive windows. Default is "fixed"
+            
+            - phaseThreshold: signature distance that starts a new phase in
+            "auto" mode. Default is 0.2
+            
+            - readSize: bytes read at a time by the reader thread. Default 
+            is 1 MB
+            
+            - queueDepth: max number of buffers queued between stages of 
+            the pipeline (see lib/TracePipeline.py). Default is 8
+            
+            - parseProcesses: number of processes parsing the trace. 0 
+            parses in a thread. Default is 1
+            
+            - maxReuseDistance: max reuse distance measured. If > 0, reuse
+            distances >= maxReuseDistance are counted as reuse distance
+            maxReuseDistance (the "far" bin) and have their own alpha bin
+            (index reuseBins). Default is 0 (no cap)
+            
+            - saveCounts: if True, the raw counts are also saved to
+            <outputFile>_counts.h5 (see ProfileWriter.SaveCounts). Default
+            is False
+            
+            - footprintPass: "hll" or "exact" to count the distinct blocks
+            in a pre-pass over the trace (see lib/Footprint.py), which sizes
+            the count lists up front. Default is "" (no pre-pass)
+            
+            - memoryBudget: if > 0, max estimated bytes the profile may 
+            need. Larger traces raise ValueError before the full run. 
+            Default is 0 (no limit)
+            
+            - engine: "fast", or "reference" to profile with 
+            ReferenceEngine.ReferenceProfile (windowSize & saveCounts are 
+            not supported, other options do not change the profile).
+            Default is "fast"
+            
+            - parallelChunks: if > 1, number of chunks the trace is cut into
+            and profiled in parallel by ChunkProfile.ProfileChunks. Default 
+            is 0 (serial)
+            
+            - chunkProcesses: number of chunk workers (and AlphaTree owners)
+            when parallelChunks > 1. Default is 0 (the number of cpus)
+            
+            - streamRegEx: if set, regular expression capturing the CPU or
+            thread id of each line as group 1. Each stream is profiled in a 
+            process of its own (see StreamDemux.DemultiplexTrace) and saved
+            to <outputFile>_<id>. Default is "" (one profile)
+            
+            - maxStreams: max number of streams. Default is 64
+            
+            - exactReuseDistances: if > 0, reuse distances >= this are saved
+            in log-spaced buckets (see ProfileWriter.LogBinCounts), so the
+            profile grows with log(working set). Not supported with 
+            maxReuseDistance. Default is 0 (every distance is saved)"""
     # validate inputs
     if reuseBins < 1:
         raise ValueError("(in GenerateApplicationProfile) reuseBins >= 1")
@@ -61,168 +200,294 @@ def GenerateApplicationProfile(traceFile, outputFile, reuseBins = 3, blockSize =
     if blockSize % 2 or blockSize < 8:
         raise ValueError("(in GenerateApplicationProfile) blockSize must be power of 2 >= 8")
         
-    # set regular expression
-    regEx = re.compile("(\D),0x([0-9a-f]+)")
+    if maxReuseDistance < 0:
+        raise ValueError("(in GenerateApplicationProfile) maxReuseDistance must be >= 0")
+        
+    if exactReuseDistances < 0 or (exactReuseDistances and maxReuseDistance):
+        raise ValueError("(in GenerateApplicationProfile) exactReuseDistances must be >= 0, and 0 with maxReuseDistance")
+        
+    if engine == "reference":
+        if windowSize or saveCounts:
+            raise ValueError("(in GenerateApplicationProfile) the reference engine does not save phases or counts")
+        if streamRegEx or parallelChunks > 1:
+            raise ValueError("(in GenerateApplicationProfile) the reference engine does not support streams or chunks")
+        return ReferenceProfile(traceFile, outputFile, reuseBins, blockSize, maxReuseDistance, exactReuseDistances)
+    
+    if engine != "fast":
+        raise ValueError("(in GenerateApplicationProfile) engine must be fast or reference")
+        
+    if parallelChunks > 1 and windowSize:
+        raise ValueError("(in GenerateApplicationProfile) parallelChunks does not support windowSize")
+        
+    if parallelChunks > 1 and streamRegEx:
+        raise ValueError("(in GenerateApplicationProfile) parallelChunks does not support streamRegEx")
+        
+    # set mask to pull blockAddress (any address width)
+    blockMask = ~(blockSize - 1)
+    
+    # number of alpha bins. Far reuse distances have a bin of their own
+    # after the reuseBins bins
+    alphaBins = reuseBins + 1 if maxReuseDistance else reuseBins
+    
+    # run statistics (None if disabled)
+    stats = None
+    if statsFile:
+        stats = RunStats("profiler", statsFile, statsSampleRate, progressInterval)
+    
+    # count distinct blocks in a pre-pass to size the count lists and
+    # reject traces that would not fit in memory
+    reserve = 0
+    if footprintPass or memoryBudget:
+        start = time.time()
+        numBlocks = CountBlocks(traceFile, blockMask, footprintPass or "hll", readSize = readSize, \
+            queueDepth = queueDepth, parseProcesses = parseProcesses)
+        memory = ProfileMemory(numBlocks, blockSize, alphaBins)
+        if stats:
+            stats.Wait('footprint', time.time() - start)
+        
+        print "Footprint: %d blocks (%s), about %.1f MB to profile" % \
+            (numBlocks, footprintPass or "hll", memory / 2.0**20)
+        if memoryBudget and memory > memoryBudget:
+            raise ValueError("(in GenerateApplicationProfile) estimated memory (%d bytes) exceeds memoryBudget" % memory)
         
-    # set mask to pull blockAddress
-    blockMask = 2**32 - blockSize
+        reserve = numBlocks
+    
+    # profile chunks of the trace in parallel
+    if parallelChunks > 1:
+        numAccesses = ProfileChunks(traceFile, outputFile, reuseBins, blockSize, maxReuseDistance, \
+            parallelChunks, chunkProcesses or None, saveCounts, queueDepth, stats, exactReuseDistances)
+        if stats:
+            stats.Finish(accesses = numAccesses)
+        return
+    
+    # profile each stream of an interleaved trace in a process of its own
+    if streamRegEx:
+        profileStream = functools.partial(ProfileStream, outputFile = outputFile, reuseBins = reuseBins, \
+            blockSize = blockSize, maxReuseDistance = maxReuseDistance, windowSize = windowSize, \
+            phaseDetection = phaseDetection, phaseThreshold = phaseThreshold, saveCounts = saveCounts, \
+            statsFile = statsFile, statsSampleRate = statsSampleRate, progressInterval = progressInterval, \
+            exactReuseDistances = exactReuseDistances)
+        streamIds = DemultiplexTrace(traceFile, re.compile(streamRegEx), profileStream, maxStreams, readSize, \
+            queueDepth)
+        
+        print "Profiled %d streams: %s" % (len(streamIds), ", ".join(streamIds))
+        return
+    
+    # accesses are read & parsed in the background
+    ProfileBatches(AccessBatches(traceFile, readSize, queueDepth, parseProcesses, stats), outputFile, reuseBins, \
+        blockSize, maxReuseDistance, reserve, windowSize, phaseDetection, phaseThreshold, saveCounts, stats, \
+        exactReuseDistances)
+
+def ProfileStream(streamId, batches, outputFile, reuseBins, blockSize, maxReuseDistance, windowSize, \
+    phaseDetection, phaseThreshold, saveCounts, statsFile, statsSampleRate, progressInterval, exactReuseDistances):
+    """ ProfileStream: profiles one stream of an interleaved trace in a
+        StreamDemux worker. The profile is saved to <outputFile>_<streamId>
+        (and run statistics to <statsFile>_<streamId>)
+        
+        args:
+            - streamId: id of the stream
+            - batches: iterable of the stream's parsed accesses
+            - others: see GenerateApplicationProfile"""
+    stats = None
+    if statsFile:
+        root, extension = os.path.splitext(statsFile)
+        stats = RunStats("profiler", "%s_%s%s" % (root, streamId, extension), statsSampleRate, progressInterval)
+    
+    ProfileBatches(batches, "%s_%s" % (outputFile, streamId), reuseBins, blockSize, maxReuseDistance, 0, \
+        windowSize, phaseDetection, phaseThreshold, saveCounts, stats, exactReuseDistances)
+
+def ProfileBatches(batches, outputFile, reuseBins = 3, blockSize = 512, maxReuseDistance = 0, reserve = 0, \
+    windowSize = 0, phaseDetection = "fixed", phaseThreshold = 0.2, saveCounts = False, stats = None, \
+    exactReuseDistances = 0):
+    """ ProfileBatches: creates an application profile from batches of 
+        parsed accesses. The modelling stage of GenerateApplicationProfile
+        
+        args:
+            - batches: iterable of (memAddresses, accessTypes) numpy arrays
+            (see TracePipeline.ParseChunk)
+            - reserve: estimated footprint in blocks, to presize the working
+            set, alpha forest & count lists for
+            - stats: RunStats of the run, or None
+            - others: see GenerateApplicationProfile"""
+    # set mask to pull blockAddress (any address width)
+    blockMask = ~(blockSize - 1)
+    
+    # number of alpha bins. Far reuse distances have a bin of their own
+    # after the reuseBins bins
+    alphaBins = reuseBins + 1 if maxReuseDistance else reuseBins
+    sample = False
     
     # markov matrix for cycle activity
     activityMarkov = np.zeros((2,2), dtype = np.float)
     previousCycle = 0 # indicates previous cycle's activity
     
-    # least-recently used ordered list of all 512-byte blocks accessed
-    lruStack = []
+    # least-recently used ordered list of the ids of all blocks accessed (or
+    # of the most recent maxReuseDistance blocks)
+    lruStack = LRUStack(maxReuseDistance)
     
-    # probabilty mass function of all reuse distances
-    reusePMF = [0]
+    # probabilty mass function of all reuse distances. The count lists are
+    # presized to the footprint (up to the cap) & grown if it is exceeded
+    numCounts = min(reserve, maxReuseDistance + 1) if maxReuseDistance else reserve
+    reusePMF = [0] * (numCounts + 1)
+    numReuseDistances = 1
         
-    # maintains ordered vector of application's working set
-    workingSet = []
+    # maintains ordered vector of application's working set. A block's id
+    # is its index, so this is also the id to address table. Presized like
+    # the count lists; only the first wsSize entries are used
+    workingSet = [None] * reserve
     wsSize = 0
     
+    # dense id of each block address. Sparse (e.g. 64-bit) addresses are
+    # remapped once here and every other structure is indexed by id
+    blockIndices = {}
+    
     # list of load (read) proportions for each reuse distance
-    loadProp = [0]
-    lsMap = {'r': 0, 'w':1} 
+    loadProp = [0] * (numCounts + 1)
+    
+    # list of AlphaTree objects to collect alpha values, indexed by id
+    alphaForest = [None] * reserve
     
-    # list of AlphaTree objects to collect alpha values
-    alphaForest = []
+    # phase windows (None if disabled)
+    phases = None
+    windowFull = False
+    if windowSize:
+        phases = PhaseTracker(outputFile, windowSize, phaseDetection, phaseThreshold, maxReuseDistance)
     
-    with open(traceFile) as file:
-        for line in file:
+    for memAddresses, accessTypes in batches:
+        for memAddress, accessType in zip(memAddresses.tolist(), accessTypes.tolist()):
+            if stats:
+                sample = stats.Sample()
             
-            # process inactive cycle
-            if not re.search(regEx, line):
+            if windowFull:
+                phases.EndWindow(blockSize, workingSet[:wsSize], alphaForest[:wsSize])
+                windowFull = False
+            
+            # process inactive cycle, or run of memAddress inactive cycles
+            if accessType == binIdle:
+                if phases:
+                    phases.Cycle(previousCycle, 0, memAddress)
                 activityMarkov[previousCycle, 0] += 1
+                activityMarkov[0, 0] += memAddress - 1
                 previousCycle = 0
                 continue
             
             # process active cycle
+            if phases:
+                phases.Cycle(previousCycle, 1)
             activityMarkov[previousCycle, 1] += 1
             previousCycle = 1
             
-            # seperate memory access into type and location
-            memAddress = int(re.search(regEx, line).group(2), 16)
-            accessType = re.search(regEx, line).group(1)
-
-            # get block address memAddress            
+            # get block address memAddress & its id (the next id if new)
             memBlock = memAddress & blockMask
+            blockIndex = blockIndices.get(memBlock, wsSize)
             
-            # convert access type to numeric representation
-            accessType = lsMap[accessType]
+            if sample:
+                stats.Mark('unpack')
                         
-            # look up reuse distance of this access
-            reuseDist = 0
-            while reuseDist < wsSize:
-                if lruStack[reuseDist] == memBlock:
-                    break
-                reuseDist += 1
-            
-            if reuseDist == wsSize: # if address not previously used
+            # look up reuse distance of this access & update lruStack
+            reuseDist = lruStack.Access(blockIndex)
+            
+            # block dropped past the cap of the LRU stack (far reuse)
+            if maxReuseDistance and reuseDist < 0 and blockIndex < wsSize:
+                reuseDist = maxReuseDistance
+            
+            if sample:
+                stats.Mark('reuse')
+                stats.Depth(reuseDist if reuseDist >= 0 else wsSize)
+            
+            if phases:
+                windowFull = phases.Access(reuseDist, accessType)
+            
+            if reuseDist < 0: # if address not previously used
                 # process reuse distance
                 reusePMF[0] += 1
-                reusePMF.append(0)
-                
-                # update lruStack
-                lruStack.insert(0, memBlock)
-                
-                # increase size of loadProp to match reusePMF
-                loadProp.append(0)
+                if not maxReuseDistance or numReuseDistances < maxReuseDistance + 2:
+                    # grow reusePMF & loadProp if the footprint is exceeded
+                    if numReuseDistances == len(reusePMF):
+                        reusePMF.extend([0] * len(reusePMF))
+                        loadProp.extend([0] * len(loadProp))
+                    numReuseDistances += 1
                 if not accessType: # if load
                     loadProp[0] += 1
                 
-                # allocate AlphaTree and process access
-                alphaForest.append(AlphaTree(blockSize, reuseBins))
-                alphaForest[wsSize - 1].ProcessAccess(memAddress, 0)
+                # grow the working set & forest if the footprint is exceeded
+                if wsSize == len(workingSet):
+                    workingSet.extend([None] * (wsSize or 1))
+                    alphaForest.extend([None] * (wsSize or 1))
+                
+                # allocate AlphaTree and process access (on the tree of the
+                # previous new block, or this one if it is the first)
+                alphaForest[wsSize] = AlphaTree(blockSize, alphaBins)
+                firstIndex = wsSize - 1 if wsSize else 0
+                if phases:
+                    phases.Touch(firstIndex, alphaForest[firstIndex])
+                alphaForest[firstIndex].ProcessAccess(memAddress, 0)
                 
                 # add block to the working set
-                workingSet.append(memBlock)
+                blockIndices[memBlock] = wsSize
+                workingSet[wsSize] = memBlock
                 wsSize += 1
                 
+                if sample:
+                    stats.Mark('firstTouch')
+                
                 continue
             
             # process reuse distance
             reusePMF[reuseDist + 1] += 1
             
-            # update lruStack
-            lruStack.remove(memBlock)
-            lruStack.insert(0, memBlock)
-            
             # process accesst type
             if not accessType: # if load
                 loadProp[reuseDist + 1] += 1
             
+            if sample:
+                stats.Mark('lru')
+            
+            # alpha bin of the access. Far reuses use the last bin
+            alphaBin = reuseDist
+            if maxReuseDistance:
+                alphaBin = reuseBins if reuseDist == maxReuseDistance else min(reuseDist, reuseBins - 1)
+            
             # update appropriate AlphaTree
-            blockIndex = workingSet.index(memBlock)
-            alphaForest[blockIndex].ProcessAccess(memAddress, reuseDist)
+            if phases:
+                phases.Touch(blockIndex, alphaForest[blockIndex])
+            alphaForest[blockIndex].ProcessAccess(memAddress, alphaBin)
+            
+            if sample:
+                stats.Mark('alpha')
         
-    # normalize load proprotions
-    for i in xrange(len(loadProp)):
-        if reusePMF[i]: # if non-zero
-            loadProp[i] /= float(reusePMF[i])
+    # number of memory accesses in the trace
+    numAccesses = int(sum(reusePMF))
     
-    # normalize reuse PMF
-    reusePMF /= np.linalg.norm(reusePMF, 1)
+    # save last phase & phase index
+    if phases:
+        phases.Finish(blockSize, workingSet[:wsSize], alphaForest[:wsSize])
     
-    # remove double counted inactive cycles
-    activityMarkov[0][0] -= activityMarkov[0][1]
-
-    # normalize activity markov model
-    activityMarkov[0][:] /= np.linalg.norm(activityMarkov[0][:], 1)
-    activityMarkov[1][:] /= np.linalg.norm(activityMarkov[1][:], 1)
+    # drop the unused presized entries
+    workingSet = workingSet[:wsSize]
     
-    # matrix to store calculated alpha values
-    alphas = np.zeros((wsSize, reuseBins, alphaForest[0].height, 2), dtype = np.float)
-        
-    # normalize and store alpha values
+    # collect alpha value counts
+    alphas = np.zeros((wsSize, alphaBins, alphaForest[0].height, 2), dtype = np.float)
     for i in xrange(wsSize):
-        # normalize count to get alpha values
-        alphaForest[i].NormalizeReuseCount()
-        
-        # store in matrx
         alphas[i] = alphaForest[i].reuseCount
     
-    """ structures stored in the profile:
+    # LRU stack & AlphaTree state at the end of the trace, so generation
+    # can start warm
+    treeState = PackTreeState([alphaForest[i].tree for i in xrange(wsSize)])
     
-        - blockSize: input argument value
-        
-        - workingSet: ordered list of the working set of the application
-                
-        - reusePMF: probability mass function where the i-th index represents 
-        the probability of reuse-distance = (i - 1) occuring. Index 0 indicates
-        the probability of a not-previously-accessed block being accessed 
-        (reuse-distance = Inf). This also represents a compulsory cache miss
-        
-        - loadProp: array where the i-th element corresponds to the probability
-        of a load (read) from memory occuring for reused-distance = (i-1).
-        Again, index 0 corresponds to prob(load) for a not-previously-accessed
-        block access. This is used to generate ld/str info for each access
-        based on the access' reuse distance
-        
-        - activityMarkov: markov model for the probability of an inactive/active
-        memory cycle given whether the previous memory cycle was inactive/active.
-        0 corresponds to inactive, and 1 corresponds to active. Thus, the value
-        of activityMarkov[0][0] is the probability of an inactive cycle occuring
-        given the previous cycle was inactive
-        
-        - alphas: matrix where the i-th row corresponds the the alpha values
-        for the ith block in workingSet. These are used to iteratively project 
-        accesses to memory blocks into one half of the memory block based on 
-        which half (aka subset) of the block was accessed previously. This 
-        helps to model the spatial locality of the memory reference stream"""
+    # normalize & save application profile
+    reusePMF = reusePMF[:numReuseDistances]
+    loadProp = loadProp[:numReuseDistances]
+    SaveProfile(outputFile, blockSize, workingSet, reusePMF, loadProp, activityMarkov, alphas, maxReuseDistance, \
+        exactReuseDistances, lruStack.stack, treeState)
     
-    # append 'h5' file extension
-    outputFile = outputFile + ".h5"
+    # save raw counts for merging with other shards
+    if saveCounts:
+        SaveCounts(outputFile + "_counts", blockSize, workingSet, reusePMF, loadProp, activityMarkov, \
+            alphas, maxReuseDistance, lruStack.stack, treeState)
     
-    # save application profile to file
-    outputFile = h5.File(outputFile, 'w')
-    outputFile.create_dataset('blockSize', data = blockSize, dtype = np.int)
-    outputFile.create_dataset('workingSet', data = np.asarray(workingSet, dtype = np.int))
-    outputFile.create_dataset('reusePMF', data = np.asarray(reusePMF, dtype = np.float))
-    outputFile.create_dataset('loadProp', data = np.asarray(loadProp, dtype = np.float))
-    outputFile.create_dataset('activityMarkov', data = activityMarkov)
-    outputFile.create_dataset('alphas', data = alphas)
-    outputFile.close()
+    if stats:
+        stats.Finish(accesses = numAccesses, blocks = wsSize)
     
 #
 ## main function
@@ -234,7 +499,12 @@ if __name__ == "__main__":
             raise IndexError("Invalid number of arguments. Only config file should be specified")
             
         # setup config parser with default args
-        config = ConfigParser.RawConfigParser({'reuseBins': 3, 'blockSize': 512})
+        config = ConfigParser.RawConfigParser({'reuseBins': 3, 'blockSize': 512, 'statsFile': '', \
+            'statsSampleRate': 1000, 'progressInterval': 10, 'windowSize': 0, \
+            'phaseDetection': 'fixed', 'phaseThreshold': 0.2, 'readSize': 2**20, 'queueDepth': 8, \
+            'parseProcesses': 1, 'maxReuseDistance': 0, 'saveCounts': 'False', 'footprintPass': '', \
+            'memoryBudget': 0, 'engine': 'fast', 'parallelChunks': 0, 'chunkProcesses': 0, \
+            'streamRegEx': '', 'maxStreams': 64, 'exactReuseDistances': 0})
         config.read(sys.argv[1])
         
         # pull arguments
@@ -242,9 +512,31 @@ if __name__ == "__main__":
         outputFile = config.get('profiler', 'outputFile')
         reuseBins = int(config.get('profiler', 'reuseBins'))
         blockSize = int(config.get('profiler', 'blockSize'))
+        statsFile = config.get('profiler', 'statsFile')
+        statsSampleRate = int(config.get('profiler', 'statsSampleRate'))
+        progressInterval = float(config.get('profiler', 'progressInterval'))
+        windowSize = int(config.get('profiler', 'windowSize'))
+        phaseDetection = config.get('profiler', 'phaseDetection')
+        phaseThreshold = float(config.get('profiler', 'phaseThreshold'))
+        readSize = int(config.get('profiler', 'readSize'))
+        queueDepth = int(config.get('profiler', 'queueDepth'))
+        parseProcesses = int(config.get('profiler', 'parseProcesses'))
+        maxReuseDistance = int(config.get('profiler', 'maxReuseDistance'))
+        saveCounts = config.getboolean('profiler', 'saveCounts')
+        footprintPass = config.get('profiler', 'footprintPass')
+        memoryBudget = int(config.get('profiler', 'memoryBudget'))
+        engine = config.get('profiler', 'engine')
+        parallelChunks = config.getint('profiler', 'parallelChunks')
+        chunkProcesses = config.getint('profiler', 'chunkProcesses')
+        streamRegEx = config.get('profiler', 'streamRegEx')
+        maxStreams = config.getint('profiler', 'maxStreams')
+        exactReuseDistances = config.getint('profiler', 'exactReuseDistances')
         
         # generate the profile
-        GenerateApplicationProfile(traceFile, outputFile, reuseBins, blockSize)
+        GenerateApplicationProfile(traceFile, outputFile, reuseBins, blockSize, \
+            statsFile, statsSampleRate, progressInterval, windowSize, phaseDetection, phaseThreshold, \
+            readSize, queueDepth, parseProcesses, maxReuseDistance, saveCounts, footprintPass, memoryBudget, \
+            engine, parallelChunks, chunkProcesses, streamRegEx, maxStreams, exactReuseDistances)
     
     except IOError as error:
         print "IOError: ", error
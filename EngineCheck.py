@@ -0,0 +1,106 @@
+""" filename: EngineCheck.py
+    contents: this script checks that the fast engines of the profiler and
+    generator give the same results as the reference engine
+    (lib/ReferenceEngine.py). Randomized traces are profiled with both
+    engines and the profiles compared exactly; traces generated with the
+    same seed are compared byte for byte; and traces generated with
+    different seeds are compared with chi-square goodness-of-fit tests on
+    their reuse distances, access types, spatial locality and activity"""
+
+import ConfigParser
+import tempfile
+import shutil
+
+import sys
+import traceback
+
+from lib.Equivalence import CheckEngines
+
+# usage string
+usage_info = "USAGE: python EngineCheck.py <config_file> \n\
+config_file: file specifying the configuration for the engine check\n\n\
+all options for the check must be under header \"[check]\" \n\
+check options: \n\
+\t- workDir: directory to write the random traces, profiles and\n\
+\tgenerated traces to. Default is a temporary directory, removed\n\
+\tafterwards\n\n\
+\t- numTraces: number of random traces. Every other trace is profiled\n\
+\twith maxReuseDistance set. Default is 3\n\n\
+\t- traceAccesses: number of accesses in each random trace.\n\
+\tDefault is 2000\n\n\
+\t- numBlocks: number of distinct blocks in each random trace.\n\
+\tDefault is 64\n\n\
+\t- generateLength: number of accesses in each generated trace.\n\
+\tDefault is 2000\n\n\
+\t- seed: seed of the random traces and generators. Default is 0\n\n\
+\t- significance: p-value below which a goodness-of-fit test fails.\n\
+\tDefault is 0.001\n\n\
+exits with status 1 if any check fails\n"
+
+#
+## main function
+#
+
+if __name__ == "__main__":
+    try:
+        if len(sys.argv) != 2:
+            raise IndexError("Invalid number of arguments. Only config file should be specified")
+
+        # setup config parser with default args
+        config = ConfigParser.RawConfigParser({'workDir': '', 'numTraces': '3', 'traceAccesses': '2000', \
+            'numBlocks': '64', 'generateLength': '2000', 'seed': '0', 'significance': '0.001'})
+        config.read(sys.argv[1])
+
+        # pull arguments
+        workDir = config.get('check', 'workDir')
+        numTraces = config.getint('check', 'numTraces')
+        traceAccesses = config.getint('check', 'traceAccesses')
+        numBlocks = config.getint('check', 'numBlocks')
+        generateLength = config.getint('check', 'generateLength')
+        seed = config.getint('check', 'seed')
+        significance = config.getfloat('check', 'significance')
+
+        tempDir = not workDir
+        if tempDir:
+            workDir = tempfile.mkdtemp()
+
+        try:
+            report = CheckEngines(workDir, numTraces, traceAccesses, numBlocks, generateLength, seed, \
+                significance)
+        finally:
+            if tempDir:
+                shutil.rmtree(workDir)
+
+        # print results
+        for result in report['profiles']:
+            print "Profile %s: %s" % (result['trace'], \
+                "identical" if not result['mismatches'] else "differs in " + ", ".join(result['mismatches']))
+        for result in report['traces']:
+            print "Trace %s: %s" % (result['trace'], "identical" if result['identical'] else "differs")
+        for result in report['fits']:
+            print "Fit %s: %s" % (result['trace'], \
+                ", ".join("%s p=%.4f" % item for item in sorted(result['pValues'].items())))
+
+        print "PASSED" if report['passed'] else "FAILED"
+        if not report['passed']:
+            sys.exit(1)
+
+    except IOError as error:
+        print "IOError: ", error
+
+    except ValueError as error:
+        tb = sys.exc_info()[2]
+        traceback.print_tb(tb)
+        print "ValueError: ", error
+
+    except ConfigParser.NoOptionError as error:
+        print "Invalid Args: ", error, "\n"
+        print usage_info
+
+    except ConfigParser.NoSectionError as error:
+        print "Invalid Config: ", error, "\n"
+        print usage_info
+
+    except IndexError as error:
+        print "IndexError: ", error, "\n"
+        print usage_info
@@ -0,0 +1,130 @@
+""" filename: MissRatioEvaluator.py
+    contents: this script measures the accuracy of a synthetic trace by
+    computing the LRU miss ratio curves of a real and a synthetic trace for
+    many cache sizes and block sizes in a single pass over each trace, and
+    reporting the error between them"""
+
+import numpy as np
+import ConfigParser
+import json
+
+import sys
+import traceback
+
+from lib.MissRatio import TraceMissRatios
+
+# usage string
+usage_info = "USAGE: python MissRatioEvaluator.py <config_file> \n\
+config_file: file specifying the configuration for the evaluator\n\n\
+all options for evaluator must be under header \"[evaluator]\" \n\
+evaluator options: \n\
+\t- realTrace: string indicating the name of the real trace\n\n\
+\t- syntheticTrace: string indicating the name of the synthetic trace\n\n\
+\t- realFormat: format of the real trace (OVP, Din, STL or Bin).\n\
+\tDefault is OVP\n\n\
+\t- syntheticFormat: format of the synthetic trace. Default is Din\n\n\
+\t- blockSize: largest cache block to evaluate (the blockSize of the\n\
+\tprofile). Every power of 2 from 4 bytes up to blockSize is evaluated.\n\
+\tDefault is 512 bytes\n\n\
+\t- cacheSizes: list (in brackets, separated by commas) of cache sizes\n\
+\tin bytes. Default is every power of 2 from 1KB to 4MB\n\n\
+\t- outputFile: optional name of a CSV file to save the results to\n"
+
+def EvaluateMissRatios(realTrace, syntheticTrace, realFormat = "OVP", syntheticFormat = "Din", \
+    blockSize = 512, cacheSizes = None, outputFile = None):
+    """ EvaluateMissRatios: computes the miss ratio of a fully-associative
+        LRU cache for every block size and cache size on the real and
+        synthetic traces and prints the error between them
+
+        args:
+            - realTrace: name of the real trace
+            - syntheticTrace: name of the synthetic trace
+            - realFormat: format of the real trace. Default is OVP
+            - syntheticFormat: format of the synthetic trace. Default is Din
+            - blockSize: largest block size to evaluate. Default is 512 bytes
+            - cacheSizes: list of cache sizes in bytes. Default is every
+            power of 2 from 1KB to 4MB
+            - outputFile: optional name of a CSV file to save the results to
+
+        return: tuple of (blockSizes, cacheSizes, real miss ratios,
+        synthetic miss ratios)"""
+    # validate inputs
+    if blockSize % 2 or blockSize < 8:
+        raise ValueError("(in EvaluateMissRatios) blockSize must be power of 2 >= 8")
+
+    if cacheSizes is None:
+        cacheSizes = [2**i for i in xrange(10, 23)]
+
+    blockSizes = [2**i for i in xrange(2, int(blockSize).bit_length())]
+
+    # one pass over each trace
+    real = TraceMissRatios(realTrace, realFormat, blockSizes, cacheSizes)
+    synthetic = TraceMissRatios(syntheticTrace, syntheticFormat, blockSizes, cacheSizes)
+    error = np.abs(real - synthetic)
+
+    # print results
+    print "%10s %10s %10s %10s %10s" % ("block", "cache", "real", "synthetic", "error")
+    for i in xrange(len(blockSizes)):
+        for j in xrange(len(cacheSizes)):
+            print "%10d %10d %10.4f %10.4f %10.4f" % \
+                (blockSizes[i], cacheSizes[j], real[i, j], synthetic[i, j], error[i, j])
+
+    print "\nmean absolute error: %.4f" % error.mean()
+    print "max absolute error: %.4f" % error.max()
+
+    if outputFile:
+        with open(outputFile, 'w') as file:
+            file.write("blockSize,cacheSize,real,synthetic,error\n")
+            for i in xrange(len(blockSizes)):
+                for j in xrange(len(cacheSizes)):
+                    file.write("%d,%d,%f,%f,%f\n" % \
+                        (blockSizes[i], cacheSizes[j], real[i, j], synthetic[i, j], error[i, j]))
+
+    return blockSizes, cacheSizes, real, synthetic
+
+#
+## main function
+#
+
+if __name__ == "__main__":
+    try:
+        if len(sys.argv) != 2:
+            raise IndexError("Invalid number of arguments. Only config file should be specified")
+
+        # setup config parser with default args
+        config = ConfigParser.RawConfigParser({'realFormat': 'OVP', 'syntheticFormat': 'Din', \
+            'blockSize': '512', 'cacheSizes': '', 'outputFile': ''})
+        config.read(sys.argv[1])
+
+        # pull arguments
+        realTrace = config.get('evaluator', 'realTrace')
+        syntheticTrace = config.get('evaluator', 'syntheticTrace')
+        realFormat = config.get('evaluator', 'realFormat')
+        syntheticFormat = config.get('evaluator', 'syntheticFormat')
+        blockSize = int(config.get('evaluator', 'blockSize'))
+        cacheSizes = config.get('evaluator', 'cacheSizes')
+        cacheSizes = json.loads(cacheSizes) if cacheSizes else None
+        outputFile = config.get('evaluator', 'outputFile')
+
+        EvaluateMissRatios(realTrace, syntheticTrace, realFormat, syntheticFormat, \
+            blockSize, cacheSizes, outputFile)
+
+    except IOError as error:
+        print "IOError: ", error
+
+    except ValueError as error:
+        tb = sys.exc_info()[2]
+        traceback.print_tb(tb)
+        print "ValueError: ", error
+
+    except ConfigParser.NoOptionError as error:
+        print "Invalid Args: ", error, "\n"
+        print usage_info
+
+    except ConfigParser.NoSectionError as error:
+        print "Invalid Config: ", error, "\n"
+        print usage_info
+
+    except IndexError as error:
+        print "IndexError: ", error, "\n"
+        print usage_info
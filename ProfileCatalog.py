@@ -0,0 +1,99 @@
+""" filename: ProfileCatalog.py
+    contents: this script indexes a library of application profiles in a
+    SQLite catalog of their summaries (footprint, blockSize, reuseBins,
+    coarse miss ratio curve, load ratio and activity rate), updating only
+    the profiles that changed, and prints the profiles matching a query"""
+
+import ConfigParser
+import sqlite3
+import glob
+import json
+
+import sys
+import traceback
+
+from lib.Catalog import UpdateCatalog, QueryCatalog
+
+# usage string
+usage_info = "USAGE: python ProfileCatalog.py <config_file> \n\
+config_file: file specifying the configuration for the profile catalog\n\n\
+all options for catalog must be under header \"[catalog]\" \n\
+catalog options: \n\
+\t- catalogFile: name of the SQLite database to keep the catalog in.\n\
+\tCreated if it does not exist\n\n\
+\t- profiles: list of the application profiles (or glob patterns, e.g.\n\
+\t\"profiles/*.h5\") to add. Profiles already in the catalog are only\n\
+\tread again if their modification time or size changed, and profiles\n\
+\tthat no longer exist are removed. Default is [] (no update)\n\n\
+\t- writeAttributes: if True, each summary is also saved as attributes\n\
+\tof its profile. Default is True\n\n\
+\t- numProcesses: number of processes reading profiles. Default is 1\n\n\
+\t- query: SQL condition selecting profiles to print, on the columns\n\
+\tpath, footprint, blockSize, reuseBins, maxReuseDistance, loadRatio\n\
+\tand activityRate. Points of the miss ratio curves are in the table\n\
+\tmrc(path, cacheBlocks, missRatio), e.g. \"footprint > 1000 AND path\n\
+\tIN (SELECT path FROM mrc WHERE cacheBlocks = 256 AND missRatio <\n\
+\t0.1)\". \"all\" prints every profile. Default is \"\" (none)\n"
+
+#
+## main function
+#
+
+if __name__ == "__main__":
+    try:
+        if len(sys.argv) != 2:
+            raise IndexError("Invalid number of arguments. Only config file should be specified")
+
+        # setup config parser with default args
+        config = ConfigParser.RawConfigParser({'profiles': '[]', 'writeAttributes': 'True', 'numProcesses': '1', \
+            'query': ''})
+        config.read(sys.argv[1])
+
+        # pull arguments
+        catalogFile = config.get('catalog', 'catalogFile')
+        patterns = json.loads(config.get('catalog', 'profiles'))
+        writeAttributes = config.getboolean('catalog', 'writeAttributes')
+        numProcesses = config.getint('catalog', 'numProcesses')
+        query = config.get('catalog', 'query')
+
+        # update the catalog with the profiles that changed
+        if patterns:
+            profiles = []
+            for pattern in patterns:
+                profiles.extend(glob.glob(pattern))
+
+            result = UpdateCatalog(catalogFile, profiles, writeAttributes, numProcesses)
+            print "Catalog: %d updated, %d removed, %d unchanged" % \
+                (result['updated'], result['removed'], result['unchanged'])
+            for fileName in result['failed']:
+                print "Not a readable profile: %s" % fileName
+
+        # print the profiles selected
+        if query:
+            for summary in QueryCatalog(catalogFile, "" if query == "all" else query):
+                print "%s: %d blocks of %d bytes, load ratio %.3f, activity rate %.3f, miss ratios %s" % \
+                    (summary['path'], summary['footprint'], summary['blockSize'], summary['loadRatio'], \
+                    summary['activityRate'], " ".join("%d:%.3f" % point for point in summary['mrc']))
+
+    except IOError as error:
+        print "IOError: ", error
+
+    except ValueError as error:
+        tb = sys.exc_info()[2]
+        traceback.print_tb(tb)
+        print "ValueError: ", error
+
+    except sqlite3.Error as error:
+        print "Catalog Error: ", error
+
+    except ConfigParser.NoOptionError as error:
+        print "Invalid Args: ", error, "\n"
+        print usage_info
+
+    except ConfigParser.NoSectionError as error:
+        print "Invalid Config: ", error, "\n"
+        print usage_info
+
+    except IndexError as error:
+        print "IndexError: ", error, "\n"
+        print usage_info
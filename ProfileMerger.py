@@ -0,0 +1,73 @@
+""" filename: ProfileMerger.py
+    contents: this script merges the raw counts of trace shards that were
+    profiled independently (e.g. one trace per thread or rank, each
+    profiled with "saveCounts = True") into a single application profile.
+    Shards are merged in parallel with a tree reduction"""
+
+import ConfigParser
+import json
+
+import sys
+import traceback
+
+from lib.ProfileMerge import MergeShards, SaveMergedProfile
+
+# usage string
+usage_info = "USAGE: python ProfileMerger.py <config_file> \n\
+config_file: file specifying the configuration for the profile merger\n\n\
+all options for merger must be under header \"[merger]\" \n\
+merger options: \n\
+\t- countFiles: list of the counts files (<outputFile>_counts.h5) saved\n\
+\tby the profiler for each shard\n\n\
+\t- outputFile: string indicating the name of the file to save the\n\
+\tmerged application profile to (automatically appends \".h5\")\n\n\
+\t- numProcesses: number of worker processes. Default is the number\n\
+\tof cpus\n\n\
+\t- saveCounts: if True, the merged counts are also saved to\n\
+\t<outputFile>_counts.h5 so they can be merged again. Default is False\n\n\
+\t- exactReuseDistances: if > 0, reuse distances >= this are saved in\n\
+\tlog-spaced buckets, as by the profiler. Default is 0\n"
+
+#
+## main function
+#
+
+if __name__ == "__main__":
+    try:
+        if len(sys.argv) != 2:
+            raise IndexError("Invalid number of arguments. Only config file should be specified")
+
+        # setup config parser with default args
+        config = ConfigParser.RawConfigParser({'numProcesses': '', 'saveCounts': 'False', 'exactReuseDistances': '0'})
+        config.read(sys.argv[1])
+
+        # pull arguments
+        countFiles = json.loads(config.get('merger', 'countFiles'))
+        outputFile = config.get('merger', 'outputFile')
+        numProcesses = config.get('merger', 'numProcesses')
+        numProcesses = int(numProcesses) if numProcesses else None
+        saveCounts = config.getboolean('merger', 'saveCounts')
+        exactReuseDistances = config.getint('merger', 'exactReuseDistances')
+
+        # merge the shards & save the profile
+        SaveMergedProfile(outputFile, MergeShards(countFiles, numProcesses), saveCounts, exactReuseDistances)
+
+    except IOError as error:
+        print "IOError: ", error
+
+    except ValueError as error:
+        tb = sys.exc_info()[2]
+        traceback.print_tb(tb)
+        print "ValueError: ", error
+
+    except ConfigParser.NoOptionError as error:
+        print "Invalid Args: ", error, "\n"
+        print usage_info
+
+    except ConfigParser.NoSectionError as error:
+        print "Invalid Config: ", error, "\n"
+        print usage_info
+
+    except IndexError as error:
+        print "IndexError: ", error, "\n"
+        print usage_info
@@ -0,0 +1,102 @@
+""" filename: ProfileSynthesizer.py
+    contents: this script creates an application profile directly from
+    parameters rather than from a trace, so hypothetical workloads can be
+    explored without collecting and profiling a real trace. The profile is
+    saved in the same format used by "ApplicationProfiler.py" """
+
+import ConfigParser
+import json
+
+import sys
+import traceback
+
+from lib.ProfileSynthesis import ReusePMF, SynthesizeProfile
+
+# usage string
+usage_info = "USAGE: python ProfileSynthesizer.py <config_file> \n\
+config_file: file specifying the configuration for the profile synthesizer\n\n\
+all options for synthesizer must be under header \"[synthesizer]\" \n\
+synthesizer options: \n\
+\t- outputFile: string indicating the name of the file to save the\n\
+\tapplication profile to (automatically appends \".h5\")\n\n\
+\t- wsSize: number of blocks in the working set\n\n\
+\t- reusePMF: list where the i-th value is the probability of reuse\n\
+\tdistance (i - 1), and index 0 is the probability of accessing a new\n\
+\tblock. Padded with zeros & normalized. If not set, reuseDistribution\n\
+\tis used\n\n\
+\t- reuseDistribution: distribution family of reuse distances:\n\
+\tgeometric, zipf or uniform. Default is geometric\n\n\
+\t- reuseParams: list of parameters of the distribution: [p] for\n\
+\tgeometric, [s] for zipf. Default is [0.1]\n\n\
+\t- missRate: probability of accessing a new block when using\n\
+\treuseDistribution. Default is 0.01\n\n\
+\t- loadProp: probability of a load, either one value or a list with\n\
+\tthe same indexing as reusePMF. Default is 1.0\n\n\
+\t- activityMarkov: 2x2 markov matrix for inactive/active cycles.\n\
+\tDefault is [[0,1],[0,1]] (always active)\n\n\
+\t- alphas: probability of reusing the same half of a block at each\n\
+\tlevel, either one value, a list of one value per level (smallest\n\
+\tblock first) or a list of such lists for each reuse bin. Default 0.5\n\n\
+\t- reuseBins: number of reuse distance bins. Default is 3\n\n\
+\t- blockSize: size of the largest cache block to model (in bytes).\n\
+\tDefault is 512 bytes\n\n\
+\t- baseAddress: address of the first block in the working set.\n\
+\tDefault is 0\n"
+
+#
+## main function
+#
+
+if __name__ == "__main__":
+    try:
+        if len(sys.argv) != 2:
+            raise IndexError("Invalid number of arguments. Only config file should be specified")
+
+        # setup config parser with default args
+        config = ConfigParser.RawConfigParser({'reusePMF': '', 'reuseDistribution': 'geometric', \
+            'reuseParams': '[0.1]', 'missRate': '0.01', 'loadProp': '1.0', \
+            'activityMarkov': '[[0,1],[0,1]]', 'alphas': '0.5', 'reuseBins': '3', \
+            'blockSize': '512', 'baseAddress': '0'})
+        config.read(sys.argv[1])
+
+        # pull arguments
+        outputFile = config.get('synthesizer', 'outputFile')
+        wsSize = int(config.get('synthesizer', 'wsSize'))
+        reusePMF = config.get('synthesizer', 'reusePMF')
+        loadProp = json.loads(config.get('synthesizer', 'loadProp'))
+        activityMarkov = json.loads(config.get('synthesizer', 'activityMarkov'))
+        alphas = json.loads(config.get('synthesizer', 'alphas'))
+        reuseBins = int(config.get('synthesizer', 'reuseBins'))
+        blockSize = int(config.get('synthesizer', 'blockSize'))
+        baseAddress = int(config.get('synthesizer', 'baseAddress'), 0)
+
+        if reusePMF:
+            reusePMF = json.loads(reusePMF)
+        else:
+            reusePMF = ReusePMF(wsSize, config.get('synthesizer', 'reuseDistribution'), \
+                json.loads(config.get('synthesizer', 'reuseParams')), \
+                float(config.get('synthesizer', 'missRate')))
+
+        # write the profile
+        SynthesizeProfile(outputFile, wsSize, reusePMF, loadProp, activityMarkov, alphas, \
+            blockSize, reuseBins, baseAddress)
+
+    except IOError as error:
+        print "IOError: ", error
+
+    except ValueError as error:
+        tb = sys.exc_info()[2]
+        traceback.print_tb(tb)
+        print "ValueError: ", error
+
+    except ConfigParser.NoOptionError as error:
+        print "Invalid Args: ", error, "\n"
+        print usage_info
+
+    except ConfigParser.NoSectionError as error:
+        print "Invalid Config: ", error, "\n"
+        print usage_info
+
+    except IndexError as error:
+        print "IndexError: ", error, "\n"
+        print usage_info
@@ -9,18 +9,35 @@
 import h5py as h5
 import numpy as np
 import ConfigParser
+import multiprocessing
+import tempfile
+import shutil
 import json
+import heapq
+import os
 
 import sys
 import traceback
 
 import lib.TraceFormats as TraceFormats
 import lib.PreProcessing as PreProc
+from lib.TraceStream import OpenTrace
+from lib.ReferenceEngine import ReferenceTrace
+from lib.RunStats import RunStats
+from lib.AlphaForest import AlphaForest
+from lib.AddressSpace import AddressSpace, StreamingWorkingSet
 
 # dictionary for all available trace formats
 traceFormats = {"STL":TraceFormats.STL, \
     "OVP":TraceFormats.OVP, \
-    "Din":TraceFormats.Din}
+    "Din":TraceFormats.Din, \
+    "Bin":TraceFormats.Bin}
+
+# dictionary for the trace formats of multi-core traces
+coreFormats = {"STL":TraceFormats.CoreSTL, \
+    "OVP":TraceFormats.CoreOVP, \
+    "Din":TraceFormats.CoreDin, \
+    "Bin":TraceFormats.CoreBin}
 
 # usage string
 usage_info = "USAGE: python TraceGenerator.py <config_file> \n\
@@ -42,24 +59,86 @@ generator options: \n\
 \tapplications\n\n\
 \t- formatAccess: name of callback function that is called to print the\n\
 \tmemory access. Function must be defined in the lib/TraceFormats and be\n\
-\tpresent in the \"traceFormats\" dictionary at the top of this file\n"
+\tpresent in the \"traceFormats\" dictionary at the top of this file\n\n\
+\t- streamBatch: number of accesses sent per batch when traceFile is a\n\
+\tunix socket (\"unix:<path>\") or named pipe (\"fifo:<path>\").\n\
+\tDefault is 4096\n\n\
+\t- streamWindow: max number of unacknowledged batches sent to a socket.\n\
+\tIf > 0, batches are framed with a header (see lib/TraceStream.py).\n\
+\tDefault is 0 (raw stream)\n\n\
+\t- statsFile: name of a JSON file to save run statistics to (sampled\n\
+\tper-stage times, throughput and LRU depth). Disabled by default\n\n\
+\t- statsSampleRate: one in every statsSampleRate cycles is timed.\n\
+\tDefault is 1000\n\n\
+\t- progressInterval: seconds between progress lines when statsFile\n\
+\tis set. Default is 10\n\n\
+\t- unbounded: if True, new block addresses are synthesized once the\n\
+\tprofile's working set is used up, so traceLength is not limited by\n\
+\tthe profiled footprint. Default is False (generation stops)\n\n\
+\t- maxWorkingSet: max number of blocks tracked when unbounded. The\n\
+\tleast recently used block is dropped past the cap. Default is 0\n\
+\t(no cap)\n\n\
+\t- baseAddress: address of the first synthesized block. Default is\n\
+\tthe block after the highest address in the profile's working set\n\n\
+\t- regionBlocks: synthesized blocks are laid out in regions of this\n\
+\tmany contiguous blocks. Default is 0 (one contiguous region)\n\n\
+\t- regionGap: bytes between regions of synthesized blocks. Default 0\n\n\
+\t- mixAlphas: if True, the alphas of all profiles are mixed up front\n\
+\tin sequential chunks instead of one block at a time as blocks are\n\
+\treferenced. Faster when mixing many profiles. Default is False\n\n\
+\t- mixMemoryBudget: max bytes of chunk buffers used by mixAlphas.\n\
+\tDefault is 67108864\n\n\
+\t- mixThreads: number of threads used by mixAlphas. Default is 1\n\n\
+\t- writeBuffers: number of buffers used by a background thread that\n\
+\twrites the trace to a regular file, so generation continues while\n\
+\tthe disk catches up. Default is 0 (written by the generator)\n\n\
+\t- writeBufferSize: bytes collected in each buffer before it is\n\
+\twritten. Default is 1048576\n\n\
+\t- idleRuns: if True, each run of inactive cycles is written as one\n\
+\trecord before the access that ends it (\"i,<count>\" in OVP, a record\n\
+\twith accessType 2 and the count as address in Bin). Only OVP & Bin\n\
+\thave these records. Default is False\n\n\
+\t- engine: \"fast\" or \"reference\" (the plain generator in\n\
+\tlib/ReferenceEngine.py, used to check faster engines). Only the\n\
+\tprofile, weight, format and warmStart options apply to the reference\n\
+\tengine. Default is fast\n\n\
+\t- warmStart: if True, generation starts from the LRU stack and alpha\n\
+\ttree state saved at the end of the profiled trace instead of from an\n\
+\tempty stack, so short traces need no warm-up. Every block of the\n\
+\tworking set is then already referenced: compulsory misses use the\n\
+\tleast recently used block (or a new block if unbounded). Default is\n\
+\tFalse\n\n\
+\t- phases: phase index (<name>_phases.json) saved by a windowed run of\n\
+\tthe profiler. If set, appProfiles and weights are ignored and the\n\
+\tphases are replayed in order, split over traceLength in proportion to\n\
+\ttheir profiled lengths and generated concurrently\n\n\
+\t- coreProfiles: list of application profiles, one per core. If\n\
+\tset, appProfiles and weights are ignored and each core generates\n\
+\ttraceLength accesses from its own profile. The streams are merged\n\
+\tby cycle, with the core id at the start of each access\n\n\
+\t- coreOffsets: list of the address offset added to each core's\n\
+\taccesses. Defaults to 0 for every core\n\n\
+\t- numProcesses: number of worker processes used to generate phases\n\
+\tor cores. Default is the number of cpus\n"
 
-# TODO:
-# 1. Tool to generate profiles based on a PMF 
-# 2. Print runtime generation details & progress
-def GenerateSyntheticTrace(traceFile, traceLength, appProfiles, weights=[], formatAccess=TraceFormats.STL):
+def GenerateSyntheticTrace(traceFile, traceLength, appProfiles, weights=[], formatAccess=TraceFormats.STL, streamBatch=4096, streamWindow=0, \
+    statsFile=None, statsSampleRate=1000, progressInterval=10.0, unbounded=False, maxWorkingSet=0, addressLayout={}, \
+    mixAlphas=False, mixMemoryBudget=64 * 2**20, mixThreads=1, writeBuffers=0, writeBufferSize=2**20, idleRuns=False, \
+    engine="fast", warmStart=False):
     """ GenerateSyntheticTrace: this function takes in application profiles
     generated by the \"ApplicationProfiler\" script and generates a synthetic
     address trace that models the properties of the input applications
     
     args:
         - traceFile: string specifying the name of the file to write the 
-        synthetic address trace to (plain-text)
+        synthetic address trace to. "unix:<path>" streams the trace to a unix
+        domain socket and "fifo:<path>" to a named pipe
         
         - traceLength: desired length of the synthetic trace (in memory references)
         
         - appProfiles: python list of the names of the application profiles
-        to model. At least one must be specified. If len(appProfiles) > 1, the
+        to model, or of profiles already loaded with PreProcessing.LoadProfile.
+        At least one must be specified. If len(appProfiles) > 1, the
         applications profiles are mixed by creating a linear combination with 
         the weights specified by the "weights" parameters. If weights is left
         as default, a uniform distribution is used
@@ -68,7 +147,58 @@ def GenerateSyntheticTrace(traceFile, traceLength, appProfiles, weights=[], form
         Defaults to evenly weighted applications
         
         - formatAccess: callback function that is called to print the memory
-        references. Function arguments must be (cycle, accessType, memAddress)"""
+        references. Function arguments must be (cycle, accessType, memAddress)
+        
+        - streamBatch: number of accesses per batch when streaming to a 
+        socket or named pipe. Default is 4096
+        
+        - streamWindow: max number of unacknowledged batches when streaming
+        to a socket. Default is 0 (raw stream, no framing)
+        
+        - statsFile: name of a JSON file to save run statistics to. 
+        Statistics are not collected if left as default
+        
+        - statsSampleRate: one in every statsSampleRate cycles is timed
+        
+        - progressInterval: seconds between progress lines (0 disables)
+        
+        - unbounded: if True, fresh block addresses are synthesized when the
+        working set is used up instead of exiting. Each block referenced
+        gets its own alpha tree (fresh blocks reuse the alphas of the
+        profile's blocks in turn)
+        
+        - maxWorkingSet: max number of blocks tracked when unbounded (0 is
+        no cap). Blocks past the cap are dropped in LRU order
+        
+        - addressLayout: dictionary of optional baseAddress, regionBlocks and
+        regionGap for synthesized blocks (see lib/AddressSpace.py)
+        
+        - mixAlphas: if True, all alpha values are mixed before generation
+        with PreProcessing.MixAlphas, reading the profiles in sequential 
+        chunks. Otherwise each block's alphas are mixed on first use
+        
+        - mixMemoryBudget: max bytes of chunk buffers used by MixAlphas
+        
+        - mixThreads: number of threads used by MixAlphas
+        
+        - writeBuffers: number of buffers in the ring of a background thread
+        that writes the trace to a regular file (0 writes in this thread).
+        Time spent waiting on the writer is reported in the run statistics
+        
+        - writeBufferSize: bytes collected in a buffer before it is written
+        
+        - idleRuns: if True, runs of inactive cycles are written as one
+        record each (see TraceFormats.idleFormats)
+        
+        - engine: "fast", or "reference" to generate with 
+        ReferenceEngine.ReferenceTrace (unbounded and idleRuns are not
+        supported, and generation returns when the working set is used up)
+        
+        - warmStart: if True, the LRU stack & alpha trees start from the
+        state saved at the end of the profiled trace (see 
+        PreProcessing.GetWarmState). As every block has been referenced,
+        compulsory misses use the least recently used block, or a new block
+        if unbounded"""
     # validate inputs
     if not len(appProfiles):
         raise ValueError("(in GenerateSyntheticTrace) must input >= 1 app profile")
@@ -80,6 +210,21 @@ def GenerateSyntheticTrace(traceFile, traceLength, appProfiles, weights=[], form
     if numProfiles > 1 and not(len(weights) == 0 or len(weights) == numProfiles):
         raise ValueError("(in GenerateSyntheticTrace) if len(appProfiles) > 1, len(weights) must be 0 or len(appProfiles)")
     
+    if engine == "reference":
+        if unbounded or idleRuns:
+            raise ValueError("(in GenerateSyntheticTrace) the reference engine does not support unbounded or idleRuns")
+        return ReferenceTrace(traceFile, traceLength, appProfiles, weights, formatAccess, warmStart)
+    
+    if engine != "fast":
+        raise ValueError("(in GenerateSyntheticTrace) engine must be fast or reference")
+    
+    # writer of runs of inactive cycles (None if not written)
+    formatIdle = None
+    if idleRuns:
+        formatIdle = TraceFormats.idleFormats.get(formatAccess)
+        if formatIdle is None:
+            raise ValueError("(in GenerateSyntheticTrace) idleRuns needs a format with idle records (OVP or Bin)")
+    
     # create even weights if weights is left as default
     if len(weights) == 0:
         weights = np.ones(numProfiles)
@@ -91,10 +236,15 @@ def GenerateSyntheticTrace(traceFile, traceLength, appProfiles, weights=[], form
     # markov model for cycle activity
     blockSize = np.zeros(numProfiles, dtype = np.int)
     
-    # open application profiles & find size of largest reusePMF
+    # open application profiles & find size of largest reusePMF. Profiles
+    # that are already loaded are used as-is and left for the caller to free
+    appProfiles = list(appProfiles)
+    openProfiles = []
     numReuseDistances = 0
     for i in xrange(numProfiles):
-        appProfiles[i] = h5.File(appProfiles[i])
+        if isinstance(appProfiles[i], basestring):
+            appProfiles[i] = h5.File(appProfiles[i], 'r')
+            openProfiles.append(appProfiles[i])
         
         # get blocksizes
         blockSize[i] = appProfiles[i]['blockSize'][()]
@@ -112,6 +262,10 @@ def GenerateSyntheticTrace(traceFile, traceLength, appProfiles, weights=[], form
     # build markov model
     activityMarkov = np.zeros((2,2), dtype = np.float)
     PreProc.BuildMarkovModel(appProfiles, weights, activityMarkov)
+    
+    # generation never leaves an inactive cycle without this transition
+    if not activityMarkov[0, 1]:
+        raise ValueError("(in GenerateSyntheticTrace) activityMarkov must have a nonzero inactive to active probability")
    
     # create weighted PMF for each reuse distance
     reusePMF = np.zeros(numReuseDistances, dtype = np.float)
@@ -121,21 +275,68 @@ def GenerateSyntheticTrace(traceFile, traceLength, appProfiles, weights=[], form
     loadProp = np.zeros(numReuseDistances, dtype = np.float)
     PreProc.BuildLoadProp(appProfiles, weights, loadProp)
 
+    # index of the far bin of capped profiles (None if there is none).
+    # Far reuses are spread over the blocks deeper than the cap, and use the
+    # last alpha bin
+    maxReuseDistance = PreProc.GetMaxReuseDistance(appProfiles)
+    farIndex = None
+    if maxReuseDistance and numReuseDistances == maxReuseDistance + 2:
+        farIndex = maxReuseDistance + 1
+    farBin = appProfiles[0]['alphas'].shape[1] - 1
+    
+    # first reuse distance & number of distances of each reusePMF entry of
+    # log-binned profiles (None if each distance has an entry)
+    reuseStarts = None
+    reuseWidths = None
+    reuseBounds = PreProc.GetReuseBounds(appProfiles)
+    if reuseBounds is not None:
+        reuseStarts = [0] + reuseBounds[:-1].tolist()
+        reuseWidths = [0] + np.diff(reuseBounds).tolist()
+    
     # initialize application's working set
     workingSet = PreProc.BuildWorkingSet(appProfiles).tolist()
     wsSize = len(workingSet)
-    lruStack = workingSet
+    lruStack = list(workingSet)
     
-    # create alphaForest
-    alphaForest = []
-    PreProc.BuildAlphaForest(appProfiles, weights, alphaForest, wsSize, blockSize)
-        
-    # close application profiles
-    for i in xrange(numProfiles):
-        appProfiles[i].close()  
+    # index of each block in the working set (its row of alpha values)
+    blockIndices = dict((workingSet[i], i) for i in xrange(wsSize))
+    
+    # LRU order & tree state at the end of the profiled trace
+    lruOrder = None
+    treeState = None
+    if warmStart:
+        lruOrder, treeState = PreProc.GetWarmState(appProfiles)
+        lruStack = [workingSet[i] for i in lruOrder.tolist()]
+    
+    # create alphaForest. Trees are built on first use, so the profiles
+    # stay open until generation is complete. Mixed alphas are computed up
+    # front if requested, and the forest reads its trees from them
+    if mixAlphas:
+        mixedAlphas = PreProc.MixAlphas(appProfiles, weights, wsSize, mixMemoryBudget, mixThreads)
+        alphaForest = AlphaForest([{'alphas': mixedAlphas}], [1], wsSize, blockSize, treeState)
+    else:
+        alphaForest = AlphaForest(appProfiles, weights, wsSize, blockSize, treeState)
+    
+    # working set that grows with synthesized blocks (None if bounded)
+    streamingSet = None
+    if unbounded:
+        baseAddress = addressLayout.get('baseAddress')
+        if baseAddress is None:
+            baseAddress = (max(workingSet) // blockSize + 1) * blockSize
+        addressSpace = AddressSpace(baseAddress, blockSize, addressLayout.get('regionBlocks', 0), \
+            addressLayout.get('regionGap', 0))
+        streamingSet = StreamingWorkingSet(workingSet, alphaForest, addressSpace, maxWorkingSet)
+        if warmStart:
+            streamingSet.WarmStart(lruOrder.tolist())
+    
+    # run statistics (None if disabled)
+    stats = None
+    sample = False
+    if statsFile:
+        stats = RunStats("generator", statsFile, statsSampleRate, progressInterval)
     
     # open traceFile
-    traceFile = open(traceFile, 'w')
+    traceFile = OpenTrace(traceFile, streamBatch, streamWindow, writeBuffers, writeBufferSize, stats)
     
     # get reference to random generator
     choice = np.random.choice
@@ -143,17 +344,22 @@ def GenerateSyntheticTrace(traceFile, traceLength, appProfiles, weights=[], form
     # indicates previous cycle's activity
     previousCycle = 0 
     
-    # counts unique accesses
-    uniqueAddrs = 0
+    # counts unique accesses. Every block of a warm stack is referenced
+    uniqueAddrs = wsSize if warmStart else 0
     
     # generation loop
     cycle = -1
     accesses = 0
+    idleRun = 0
     while (accesses < traceLength):
+        if stats:
+            sample = stats.Sample()
+        
         if not choice(2, p=activityMarkov[previousCycle,:]): # if inactive cycle
             # process inactive cycle
             cycle += 1            
             previousCycle = 0
+            idleRun += 1
             continue
                     
         # else, active cycle
@@ -161,18 +367,54 @@ def GenerateSyntheticTrace(traceFile, traceLength, appProfiles, weights=[], form
         previousCycle = 1
         accesses += 1
         
+        if sample:
+            stats.Mark('activityRNG')
+        
         # select reuse distance
         reuseDist = choice(numReuseDistances, p = reusePMF)
         
+        # load proportion & alpha bin of the access
+        reuseIndex = reuseDist
+        
+        # pick a distance in a log-spaced bucket
+        if reuseWidths is not None and reuseWidths[reuseDist] > 1:
+            reuseDist = reuseStarts[reuseDist] + 1 + np.random.randint(reuseWidths[reuseDist])
+        
+        alphaBin = reuseDist - 1
+        if maxReuseDistance and alphaBin > 0:
+            alphaBin = min(alphaBin, farBin - 1)
+        
+        if reuseDist == farIndex:
+            depth = len(streamingSet) if streamingSet is not None else uniqueAddrs
+            reuseDist += np.random.randint(max(depth - maxReuseDistance, 1))
+            alphaBin = farBin
+        
+        if sample:
+            stats.Mark('reuseRNG')
+        
+        # synthesized working set. Reuse distances past the end of the stack
+        # reference a new block
+        if streamingSet is not None:
+            if not reuseDist or reuseDist > len(streamingSet):
+                memAddress = streamingSet.NewBlock()
+            else:
+                memAddress = streamingSet.Reuse(reuseDist - 1)
+        
         # compulsory cache miss
-        if not reuseDist:
+        elif not reuseDist:
             # if we run out of addresses, print message and exit
-            if uniqueAddrs >= wsSize:
-                print "Exiting on cycle %d: cannot exceed size of working set"
+            if uniqueAddrs >= wsSize and not warmStart:
+                print "Exiting on cycle %d: cannot exceed size of working set" % cycle
+                traceFile.close()
+                if stats:
+                    stats.Finish(accesses = accesses - 1, cycles = cycle)
+                for profile in openProfiles:
+                    profile.close()
                 exit()
             
-            # select new cache block to reference
-            memAddress = lruStack[uniqueAddrs]
+            # select new cache block to reference (the least recently used
+            # block of a warm stack)
+            memAddress = lruStack[-1] if warmStart else lruStack[uniqueAddrs]
             
             # update lru stack
             lruStack.remove(memAddress)
@@ -189,21 +431,223 @@ def GenerateSyntheticTrace(traceFile, traceLength, appProfiles, weights=[], form
             # update lruStack
             lruStack.remove(memAddress)
             lruStack.insert(0, memAddress)
+        
+        if sample:
+            stats.Mark('lru')
+            stats.Depth(reuseDist - 1 if reuseDist else (len(streamingSet) if streamingSet is not None else uniqueAddrs))
             
         # select type of access
         rand = np.random.rand() 
-        if rand < loadProp[reuseDist]:
+        if rand < loadProp[reuseIndex]:
             accessType = 0 # load
         else:
             accessType = 1 # store
+        
+        if sample:
+            stats.Mark('typeRNG')
 
         # select 4-byte word address based on alpha values
-        blockIndex = workingSet.index(memAddress)
-        memAddress = memAddress | alphaForest[blockIndex].GenerateAccess(reuseDist - 1)
+        if streamingSet is not None:
+            memAddress = memAddress | streamingSet.Tree(memAddress).GenerateAccess(alphaBin)
+        else:
+            memAddress = memAddress | alphaForest[blockIndices[memAddress]].GenerateAccess(alphaBin)
+        
+        if sample:
+            stats.Mark('alpha')
+        
+        # print run of inactive cycles ended by this access
+        if idleRun:
+            if formatIdle:
+                formatIdle(traceFile, cycle - idleRun, idleRun)
+            idleRun = 0
         
         # print access
         formatAccess(traceFile, cycle, accessType, memAddress)
         
+        if sample:
+            stats.Mark('output')
+    
+    # close trace file and application profiles
+    traceFile.close()
+    if stats:
+        stats.Finish(accesses = accesses, cycles = cycle + 1)
+    for profile in openProfiles:
+        profile.close()
+        
+def GenerateBinTrace(args):
+    """ GenerateBinTrace: worker routine that generates a trace from one
+        profile in the binary format (one phase of a phased trace, or one 
+        core of a multi-core trace). New blocks are synthesized once the 
+        profile's working set is used up, so the trace has exactly the
+        requested length
+        
+        args:
+            - args: tuple of (output file, length, profile name, seed)"""
+    phaseTrace, phaseLength, profile, seed = args
+    np.random.seed(seed)
+    
+    GenerateSyntheticTrace(phaseTrace, phaseLength, [profile], [], TraceFormats.Bin, unbounded=True)
+    
+    return phaseTrace
+
+def GeneratePhasedTrace(traceFile, traceLength, phaseIndex, formatAccess=TraceFormats.STL, numProcesses=None, seed=None):
+    """ GeneratePhasedTrace: replays the phase sequence saved by a windowed
+        run of the profiler. Each phase is generated from its own profile in
+        a pool of worker processes, and the phases are stitched together in
+        order, with cycles continuing from the end of the previous phase.
+        Each phase starts from its profile's working set order, and 
+        synthesizes new blocks if it runs out
+    
+    args:
+        - traceFile: string specifying the name of the file to write the
+        synthetic address trace to
+        
+        - traceLength: desired length of the synthetic trace (in memory
+        references). Split between phases in proportion to the number of
+        accesses profiled in each
+        
+        - phaseIndex: name of the phase index (<name>_phases.json) saved by
+        the profiler
+        
+        - formatAccess: callback function that is called to print the memory
+        references
+        
+        - numProcesses: number of worker processes. Defaults to the number
+        of cpus
+        
+        - seed: seed for the random generator of the first phase. Phase i
+        uses seed + i. Random if left as default"""
+    # validate inputs
+    if traceLength <= 0:
+        raise ValueError("(in GeneratePhasedTrace) traceLength must be > 0)")
+    
+    with open(phaseIndex) as file:
+        phases = json.load(file)['phases']
+    
+    if not len(phases):
+        raise ValueError("(in GeneratePhasedTrace) phase index has no phases")
+    
+    # split trace length between phases
+    profiled = np.array([phase['accesses'] for phase in phases], dtype = np.float)
+    lengths = np.floor(traceLength * np.cumsum(profiled) / profiled.sum()).astype(np.int)
+    lengths = np.diff(np.append(0, lengths))
+    
+    if seed is None:
+        seed = np.random.randint(2**31 - len(phases))
+    
+    # phase profiles are stored relative to the index
+    indexDir = os.path.dirname(os.path.abspath(phaseIndex))
+    tempDir = tempfile.mkdtemp()
+    jobs = []
+    for i in xrange(len(phases)):
+        if lengths[i]:
+            jobs.append((os.path.join(tempDir, "phase%d.bin" % i), int(lengths[i]), \
+                os.path.join(indexDir, phases[i]['profile']), seed + i))
+    
+    traceFile = OpenTrace(traceFile)
+    pool = multiprocessing.Pool(numProcesses)
+    try:
+        # stitch phases in order as they complete
+        offset = 0
+        for phaseTrace in pool.imap(GenerateBinTrace, jobs):
+            cycle = offset - 1
+            with open(phaseTrace, 'rb') as phase:
+                record = phase.read(TraceFormats.binRecord.size)
+                while len(record) == TraceFormats.binRecord.size:
+                    cycle, accessType, memAddress = TraceFormats.binRecord.unpack(record)
+                    cycle += offset
+                    formatAccess(traceFile, cycle, accessType, memAddress)
+                    record = phase.read(TraceFormats.binRecord.size)
+            offset = cycle + 1
+            os.remove(phaseTrace)
+    finally:
+        pool.close()
+        pool.join()
+        traceFile.close()
+        shutil.rmtree(tempDir)
+
+def ReadBinTrace(binTrace, core, offset):
+    """ ReadBinTrace: iterates over the accesses of one core's binary trace
+    
+    args:
+        - binTrace: name of the binary trace
+        - core: id of the core
+        - offset: address offset of the core
+        
+    return: yields (cycle, core, accessType, memAddress) tuples"""
+    with open(binTrace, 'rb') as trace:
+        record = trace.read(TraceFormats.binRecord.size)
+        while len(record) == TraceFormats.binRecord.size:
+            cycle, accessType, memAddress = TraceFormats.binRecord.unpack(record)
+            yield cycle, core, accessType, memAddress + offset
+            record = trace.read(TraceFormats.binRecord.size)
+
+def GenerateMultiCoreTrace(traceFile, traceLength, coreProfiles, coreOffsets=[], formatAccess=TraceFormats.CoreSTL, numProcesses=None, seed=None):
+    """ GenerateMultiCoreTrace: generates one interleaved trace of several
+    cores, each modelling its own application profile. Each core has its own
+    reuse distances, LRU stack, alpha trees and activity chain, and the cores
+    are generated concurrently in a pool of worker processes. The streams are
+    then merged in cycle order (ties in core order)
+    
+    args:
+        - traceFile: string specifying the name of the file to write the
+        synthetic address trace to
+        
+        - traceLength: number of memory references generated by each core
+        
+        - coreProfiles: list of the names of the application profiles of
+        each core. The same profile can be used by several cores
+        
+        - coreOffsets: list of the address offset added to the accesses of 
+        each core. Defaults to 0 for every core
+        
+        - formatAccess: callback function that is called to print the memory
+        references. Function arguments must be (cycle, core, accessType,
+        memAddress)
+        
+        - numProcesses: number of worker processes. Defaults to the number
+        of cpus
+        
+        - seed: seed for the random generator of core 0. Core i uses seed + i.
+        Random if left as default"""
+    # validate inputs
+    numCores = len(coreProfiles)
+    if not numCores:
+        raise ValueError("(in GenerateMultiCoreTrace) must input >= 1 core profile")
+    
+    if traceLength <= 0:
+        raise ValueError("(in GenerateMultiCoreTrace) traceLength must be > 0)")
+    
+    if not len(coreOffsets):
+        coreOffsets = [0] * numCores
+    
+    if len(coreOffsets) != numCores:
+        raise ValueError("(in GenerateMultiCoreTrace) len(coreOffsets) must be 0 or len(coreProfiles)")
+    
+    if seed is None:
+        seed = np.random.randint(2**31 - numCores)
+    
+    tempDir = tempfile.mkdtemp()
+    jobs = [(os.path.join(tempDir, "core%d.bin" % i), traceLength, coreProfiles[i], seed + i) \
+        for i in xrange(numCores)]
+    
+    pool = multiprocessing.Pool(numProcesses)
+    try:
+        coreTraces = pool.map(GenerateBinTrace, jobs)
+        
+        # merge the cores by cycle
+        traceFile = OpenTrace(traceFile)
+        try:
+            streams = [ReadBinTrace(coreTraces[i], i, coreOffsets[i]) for i in xrange(numCores)]
+            for cycle, core, accessType, memAddress in heapq.merge(*streams):
+                formatAccess(traceFile, cycle, core, accessType, memAddress)
+        finally:
+            traceFile.close()
+    finally:
+        pool.close()
+        pool.join()
+        shutil.rmtree(tempDir)
+
 #
 ## main function
 #
@@ -214,17 +658,68 @@ if __name__ == "__main__":
             raise IndexError("Invalid number of arguments. Only config file should be specified")
             
         # setup config parser with default args
-        config = ConfigParser.RawConfigParser({'weights': [], 'formatAccess': traceFormats['STL']})
+        config = ConfigParser.RawConfigParser({'weights': '[]', 'formatAccess': 'STL', \
+            'streamBatch': '4096', 'streamWindow': '0', 'statsFile': '', \
+            'statsSampleRate': '1000', 'progressInterval': '10', 'numProcesses': '', \
+            'unbounded': 'False', 'maxWorkingSet': '0', 'baseAddress': '', 'regionBlocks': '0', \
+            'regionGap': '0', 'coreOffsets': '[]', 'mixAlphas': 'False', \
+            'mixMemoryBudget': str(64 * 2**20), 'mixThreads': '1', 'writeBuffers': '0', \
+            'writeBufferSize': str(2**20), 'idleRuns': 'False', 'engine': 'fast', \
+            'warmStart': 'False'})
         config.read(sys.argv[1])
         
         # pull arguments
         traceFile = config.get('generator', 'traceFile')
         traceLength = int(config.get('generator', 'traceLength'))
+        
+        # replay phases of a windowed profile
+        if config.has_option('generator', 'phases'):
+            formatAccess = config.get('generator', 'formatAccess')
+            numProcesses = config.get('generator', 'numProcesses')
+            numProcesses = int(numProcesses) if numProcesses else None
+            
+            GeneratePhasedTrace(traceFile, traceLength, config.get('generator', 'phases'), \
+                traceFormats[formatAccess], numProcesses)
+            sys.exit(0)
+        
+        # interleave the streams of several cores
+        if config.has_option('generator', 'coreProfiles'):
+            formatAccess = config.get('generator', 'formatAccess')
+            numProcesses = config.get('generator', 'numProcesses')
+            numProcesses = int(numProcesses) if numProcesses else None
+            
+            GenerateMultiCoreTrace(traceFile, traceLength, json.loads(config.get('generator', 'coreProfiles')), \
+                json.loads(config.get('generator', 'coreOffsets')), coreFormats[formatAccess], numProcesses)
+            sys.exit(0)
+        
         appProfiles = json.loads(config.get('generator', 'appProfiles'))
         weights = json.loads(config.get('generator', 'weights'))
         formatAccess = config.get('generator', 'formatAccess')
+        streamBatch = int(config.get('generator', 'streamBatch'))
+        streamWindow = int(config.get('generator', 'streamWindow'))
+        statsFile = config.get('generator', 'statsFile')
+        statsSampleRate = int(config.get('generator', 'statsSampleRate'))
+        progressInterval = float(config.get('generator', 'progressInterval'))
+        unbounded = config.getboolean('generator', 'unbounded')
+        maxWorkingSet = int(config.get('generator', 'maxWorkingSet'))
+        mixAlphas = config.getboolean('generator', 'mixAlphas')
+        mixMemoryBudget = int(config.get('generator', 'mixMemoryBudget'))
+        mixThreads = int(config.get('generator', 'mixThreads'))
+        writeBuffers = int(config.get('generator', 'writeBuffers'))
+        writeBufferSize = int(config.get('generator', 'writeBufferSize'))
+        idleRuns = config.getboolean('generator', 'idleRuns')
+        engine = config.get('generator', 'engine')
+        warmStart = config.getboolean('generator', 'warmStart')
+        
+        addressLayout = {'regionBlocks': int(config.get('generator', 'regionBlocks')), \
+            'regionGap': int(config.get('generator', 'regionGap'), 0)}
+        if config.get('generator', 'baseAddress'):
+            addressLayout['baseAddress'] = int(config.get('generator', 'baseAddress'), 0)
         
-        GenerateSyntheticTrace(traceFile, traceLength, appProfiles, weights, traceFormats[formatAccess])
+        GenerateSyntheticTrace(traceFile, traceLength, appProfiles, weights, traceFormats[formatAccess], \
+            streamBatch, streamWindow, statsFile, statsSampleRate, progressInterval, \
+            unbounded, maxWorkingSet, addressLayout, mixAlphas, mixMemoryBudget, mixThreads, \
+            writeBuffers, writeBufferSize, idleRuns, engine, warmStart)
     
     except IOError as error:
         print "IOError: " + str(error)
@@ -0,0 +1,262 @@
+""" filename: TraceServer.py
+    contents: this script runs the trace generator as a long-running local
+    service. Mixed profiles are kept in memory (least recently used first
+    out under a memory cap) and generation requests are received over a
+    unix domain socket and served concurrently by a pool of worker
+    processes, so each request skips interpreter start-up and profile
+    loading"""
+
+import numpy as np
+import ConfigParser
+import multiprocessing
+import threading
+import collections
+import socket
+import json
+import time
+import os
+
+import sys
+import traceback
+
+import h5py as h5
+import lib.PreProcessing as PreProc
+from TraceGenerator import GenerateSyntheticTrace, traceFormats
+
+# usage string
+usage_info = "USAGE: python TraceServer.py <config_file> \n\
+config_file: file specifying the configuration for the trace server\n\n\
+all options for the server must be under header \"[server]\" \n\
+server options: \n\
+\t- socketPath: path of the unix domain socket to listen on\n\n\
+\t- numProcesses: number of worker processes. Default is the number\n\
+\tof cpus\n\n\
+\t- memoryBudget: max bytes of mixed profiles kept by each worker.\n\
+\tThe least recently used mixtures are dropped past the budget.\n\
+\tDefault is 1073741824\n\n\
+\t- preload: list of mixtures to build before the workers start, each\n\
+\ta list of profiles or {\"appProfiles\": [...], \"weights\": [...]}.\n\
+\tPreloaded mixtures are shared by every worker. Default is []\n\n\
+requests are one JSON object per connection, ended by a newline, with\n\
+the keys traceFile, traceLength, appProfiles and optionally weights,\n\
+seed, formatAccess (default STL) and unbounded. The reply is one JSON\n\
+object with \"status\" (\"ok\" or \"error\"), \"seconds\" and, on errors,\n\
+\"error\". {\"command\": \"shutdown\"} stops the server\n"
+
+# seconds between checks for a stopped server
+pollInterval = 0.1
+
+class MixtureCache:
+    """ class MixtureCache: mixed profiles (see PreProcessing.BuildMixture)
+        keyed by their profile names & weights. Once the mixtures use more
+        than the memory budget, the least recently used are dropped"""
+
+    def __init__(self, memoryBudget = 2**30):
+        """ __init__: creates an empty cache
+
+            args:
+                - memoryBudget: max bytes of mixtures kept. The most recently
+                used mixture is always kept. Default is 1 GB"""
+        self.memoryBudget = memoryBudget
+        self.mixtures = collections.OrderedDict()
+        self.size = 0
+
+    def Get(self, appProfiles, weights = []):
+        """ Get: returns the mixture of the input profiles, building it if it
+            is not in the cache
+
+            args:
+                - appProfiles: list of the names of the profiles to mix
+                - weights: list of the weights of each profile
+
+            return: tuple of (mixture, True if it was in the cache)"""
+        key = (tuple(appProfiles), tuple(weights))
+
+        mixture = self.mixtures.pop(key, None)
+        if mixture is not None:
+            self.mixtures[key] = mixture
+            return mixture, True
+
+        profiles = [h5.File(name, 'r') for name in appProfiles]
+        try:
+            mixture = PreProc.BuildMixture(profiles, weights)
+        finally:
+            for profile in profiles:
+                profile.close()
+
+        self.mixtures[key] = mixture
+        self.size += sum(data.nbytes for data in mixture.itervalues())
+
+        # drop least recently used mixtures
+        while self.size > self.memoryBudget and len(self.mixtures) > 1:
+            key, dropped = self.mixtures.popitem(last = False)
+            self.size -= sum(data.nbytes for data in dropped.itervalues())
+
+        return mixture, False
+
+# mixtures of this process. Preloaded by the parent & inherited by workers
+mixtures = MixtureCache()
+
+def ServeRequest(request):
+    """ ServeRequest: generates the trace for one request in a worker
+        process
+
+        args:
+            - request: request dictionary (see usage_info)
+
+        return: reply dictionary"""
+    start = time.time()
+    try:
+        mixture, cached = mixtures.Get(request['appProfiles'], request.get('weights', []))
+
+        np.random.seed(request.get('seed'))
+        GenerateSyntheticTrace(request['traceFile'], int(request['traceLength']), [mixture], [], \
+            traceFormats[request.get('formatAccess', 'STL')], unbounded = bool(request.get('unbounded', False)))
+
+    except SystemExit:
+        return {'status': 'error', 'error': "working set exhausted", 'seconds': time.time() - start}
+    except Exception as error:
+        return {'status': 'error', 'error': "%s: %s" % (type(error).__name__, error), \
+            'seconds': time.time() - start}
+
+    return {'status': 'ok', 'cached': cached, 'seconds': time.time() - start}
+
+def HandleConnection(conn, pool, stop):
+    """ HandleConnection: reads one request from a client, has it served by
+        the pool and sends back the reply
+
+        args:
+            - conn: connected client socket
+            - pool: multiprocessing.Pool of workers
+            - stop: event set to stop the server"""
+    try:
+        try:
+            request = json.loads(conn.makefile('r').readline())
+        except ValueError as error:
+            reply = {'status': 'error', 'error': "bad request: %s" % error}
+        else:
+            if request.get('command') == 'shutdown':
+                stop.set()
+                reply = {'status': 'ok'}
+            else:
+                reply = pool.apply_async(ServeRequest, (request,)).get()
+
+        conn.sendall(json.dumps(reply) + "\n")
+    finally:
+        conn.close()
+
+def Serve(socketPath, numProcesses = None, memoryBudget = 2**30, preload = []):
+    """ Serve: builds the preloaded mixtures, starts the worker pool and
+        serves requests until a shutdown request is received
+
+        args:
+            - socketPath: path of the unix domain socket to listen on
+            - numProcesses: number of worker processes. Defaults to the
+            number of cpus
+            - memoryBudget: max bytes of mixtures kept by each process
+            - preload: list of mixtures to build before the workers are
+            forked, each a list of profile names or a dictionary with
+            appProfiles and weights"""
+    mixtures.memoryBudget = memoryBudget
+
+    start = time.time()
+    for entry in preload:
+        if isinstance(entry, dict):
+            mixtures.Get(entry['appProfiles'], entry.get('weights', []))
+        else:
+            mixtures.Get(entry)
+    print "Preloaded %d mixtures in %.3fs" % (len(mixtures.mixtures), time.time() - start)
+
+    pool = multiprocessing.Pool(numProcesses)
+
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(socketPath)
+    server.listen(128)
+    server.settimeout(pollInterval)
+
+    stop = threading.Event()
+    handlers = []
+    try:
+        while not stop.is_set():
+            try:
+                conn = server.accept()[0]
+            except socket.timeout:
+                continue
+
+            conn.settimeout(None)
+            handler = threading.Thread(target = HandleConnection, args = (conn, pool, stop))
+            handler.daemon = True
+            handler.start()
+            handlers.append(handler)
+
+            handlers = [handler for handler in handlers if handler.is_alive()]
+
+    finally:
+        server.close()
+        os.remove(socketPath)
+
+        for handler in handlers:
+            handler.join()
+
+        pool.close()
+        pool.join()
+
+def RequestTrace(socketPath, request):
+    """ RequestTrace: sends a request to a running server and waits for the
+        reply
+
+        args:
+            - socketPath: path of the server's unix domain socket
+            - request: request dictionary (see usage_info)
+
+        return: reply dictionary"""
+    conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        conn.connect(socketPath)
+        conn.sendall(json.dumps(request) + "\n")
+        return json.loads(conn.makefile('r').readline())
+    finally:
+        conn.close()
+
+#
+## main function
+#
+
+if __name__ == "__main__":
+    try:
+        if len(sys.argv) != 2:
+            raise IndexError("Invalid number of arguments. Only config file should be specified")
+
+        # setup config parser with default args
+        config = ConfigParser.RawConfigParser({'numProcesses': '', 'memoryBudget': str(2**30), \
+            'preload': '[]'})
+        config.read(sys.argv[1])
+
+        # pull arguments
+        socketPath = config.get('server', 'socketPath')
+        numProcesses = config.get('server', 'numProcesses')
+        numProcesses = int(numProcesses) if numProcesses else None
+        memoryBudget = int(config.get('server', 'memoryBudget'))
+        preload = json.loads(config.get('server', 'preload'))
+
+        Serve(socketPath, numProcesses, memoryBudget, preload)
+
+    except IOError as error:
+        print "IOError: " + str(error)
+
+    except ValueError as error:
+        tb = sys.exc_info()[2]
+        traceback.print_tb(tb)
+        print "ValueError: ", error
+
+    except ConfigParser.NoOptionError as error:
+        print "Invalid Args: ", error, "\n"
+        print usage_info
+
+    except ConfigParser.NoSectionError as error:
+        print "Invalid Config: ", error, "\n"
+        print usage_info
+
+    except IndexError as error:
+        print "IndexError: ", error, "\n"
+        print usage_info
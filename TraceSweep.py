@@ -0,0 +1,266 @@
+""" filename: TraceSweep.py
+    contents: this script runs many trace generator configurations in one
+    process. Each distinct application profile is loaded once into shared
+    memory and the generation jobs are spread over a pool of worker
+    processes"""
+
+import numpy as np
+import ConfigParser
+import multiprocessing
+import itertools
+import json
+import time
+
+import sys
+import traceback
+
+import lib.PreProcessing as PreProc
+from TraceGenerator import GenerateSyntheticTrace, traceFormats
+
+# usage string
+usage_info = "USAGE: python TraceSweep.py <config_file> \n\
+config_file: file specifying the jobs for the sweep\n\n\
+every section whose name starts with \"generator\" (e.g. \"[generator]\",\n\
+\"[generator.small]\") is run as one job and takes the same options as\n\
+TraceGenerator.py (except phases and coreProfiles, which are rejected),\n\
+plus an optional \"seed\" for the random generator. {job} in statsFile\n\
+is replaced with the job's number\n\n\
+an optional \"[sweep]\" section adds a parameter grid. Every combination\n\
+of the grid options is run as one job: \n\
+\t- appProfiles: list of profile lists (e.g. [[\"a.h5\"],[\"a.h5\",\"b.h5\"]])\n\n\
+\t- traceLength: list of trace lengths\n\n\
+\t- weights: list of weight lists. Default is [[]]\n\n\
+\t- formatAccess: list of format names. Default is [\"STL\"]\n\n\
+\t- traceFile: name of the file to write each trace to. Any of {job},\n\
+\t{traceLength} and {formatAccess} are replaced with the job's values\n\n\
+\t- numProcesses: number of worker processes. Default is the number\n\
+\tof cpus\n\n\
+exits with status 1 if any job fails\n"
+
+# profiles loaded by the parent, inherited by forked workers
+loadedProfiles = {}
+
+# options of a job, read by ReadJobs itself
+jobOptions = ['traceFile', 'traceLength', 'appProfiles', 'weights', 'formatAccess', 'seed']
+
+# other generator options of a "[generator*]" section, with their types.
+# These are passed to GenerateSyntheticTrace as keyword arguments
+generatorOptions = {'streamBatch': int, 'streamWindow': int, 'statsFile': str, 'statsSampleRate': int, \
+    'progressInterval': float, 'unbounded': bool, 'maxWorkingSet': int, 'mixAlphas': bool, \
+    'mixMemoryBudget': int, 'mixThreads': int, 'writeBuffers': int, 'writeBufferSize': int, \
+    'idleRuns': bool, 'engine': str, 'warmStart': bool}
+
+# generator options collected into its addressLayout argument
+layoutOptions = ['baseAddress', 'regionBlocks', 'regionGap']
+
+def GetOption(config, section, option, default):
+    """ GetOption: returns the value of an option, or the input default if
+        the option is not in the section"""
+    if config.has_option(section, option):
+        return config.get(section, option)
+    return default
+
+def BuildGrid(config):
+    """ BuildGrid: creates one job for every combination of the parameter
+        grid in the "[sweep]" section of the config
+
+        args:
+            - config: ConfigParser holding the sweep configuration
+
+        return: list of job dictionaries"""
+    jobs = []
+    if not config.has_section('sweep'):
+        return jobs
+
+    traceFile = config.get('sweep', 'traceFile')
+    appProfiles = json.loads(config.get('sweep', 'appProfiles'))
+    traceLengths = json.loads(config.get('sweep', 'traceLength'))
+    weights = json.loads(GetOption(config, 'sweep', 'weights', '[[]]'))
+    formats = json.loads(GetOption(config, 'sweep', 'formatAccess', '["STL"]'))
+
+    for profiles, length, weight, format in itertools.product(appProfiles, traceLengths, weights, formats):
+        jobs.append({'traceFile': traceFile, 'traceLength': int(length), \
+            'appProfiles': profiles, 'weights': weight, \
+            'formatAccess': format, 'seed': None, 'options': {}})
+
+    return jobs
+
+def ReadOptions(config, section):
+    """ ReadOptions: reads the generator options set in a "[generator*]"
+        section. Options left out keep the defaults of
+        GenerateSyntheticTrace
+
+        args:
+            - config: ConfigParser holding the sweep configuration
+            - section: name of the section
+
+        return: dictionary of keyword arguments for GenerateSyntheticTrace"""
+    options = {}
+    addressLayout = {}
+
+    # the config parser lower-cases option names
+    names = dict((name.lower(), name) for name in jobOptions + layoutOptions + generatorOptions.keys())
+
+    for option in config.options(section):
+        name = names.get(option)
+        if name in jobOptions:
+            continue
+        elif name in layoutOptions:
+            addressLayout[name] = int(config.get(section, option), 0)
+        elif generatorOptions.get(name) is bool:
+            options[name] = config.getboolean(section, option)
+        elif name in generatorOptions:
+            options[name] = generatorOptions[name](config.get(section, option))
+        else:
+            raise ValueError("(in ReadOptions) option %s of section [%s] is not supported by TraceSweep" % \
+                (option, section))
+
+    if addressLayout:
+        options['addressLayout'] = addressLayout
+
+    return options
+
+def ReadJobs(config):
+    """ ReadJobs: creates one job for every "[generator*]" section of the
+        config, followed by the jobs in the parameter grid
+
+        args:
+            - config: ConfigParser holding the sweep configuration
+
+        return: list of job dictionaries"""
+    jobs = []
+
+    for section in config.sections():
+        if not section.startswith('generator'):
+            continue
+
+        seed = GetOption(config, section, 'seed', '')
+        jobs.append({'traceFile': config.get(section, 'traceFile'), \
+            'traceLength': int(config.get(section, 'traceLength')), \
+            'appProfiles': json.loads(config.get(section, 'appProfiles')), \
+            'weights': json.loads(GetOption(config, section, 'weights', '[]')), \
+            'formatAccess': GetOption(config, section, 'formatAccess', 'STL'), \
+            'seed': int(seed) if seed else None, 'options': ReadOptions(config, section)})
+
+    jobs += BuildGrid(config)
+
+    # fill in output file names & validate formats
+    for i in xrange(len(jobs)):
+        jobs[i]['traceFile'] = jobs[i]['traceFile'].format(job = i, \
+            traceLength = jobs[i]['traceLength'], formatAccess = jobs[i]['formatAccess'])
+        if jobs[i]['options'].get('statsFile'):
+            jobs[i]['options']['statsFile'] = jobs[i]['options']['statsFile'].format(job = i)
+
+        if jobs[i]['formatAccess'] not in traceFormats:
+            raise KeyError(jobs[i]['formatAccess'])
+
+    return jobs
+
+def RunJob(job):
+    """ RunJob: generates the trace for one job using the profiles loaded
+        by the parent process
+
+        args:
+            - job: job dictionary created by ReadJobs
+
+        return: tuple of (wall time in seconds, error message or None)"""
+    # workers inherit the parent's random state, so reseed for every job
+    np.random.seed(job['seed'])
+
+    appProfiles = [loadedProfiles[name] for name in job['appProfiles']]
+
+    start = time.time()
+    try:
+        GenerateSyntheticTrace(job['traceFile'], job['traceLength'], appProfiles, \
+            job['weights'], traceFormats[job['formatAccess']], **job['options'])
+    except SystemExit:
+        return (time.time() - start, "working set exhausted")
+    except Exception as error:
+        return (time.time() - start, "%s: %s" % (type(error).__name__, error))
+
+    return (time.time() - start, None)
+
+def RunSweep(jobs, numProcesses = None):
+    """ RunSweep: loads every distinct profile used by the jobs once and runs
+        the jobs in a pool of worker processes, printing the wall time of
+        each job as it completes
+
+        args:
+            - jobs: list of job dictionaries created by ReadJobs
+            - numProcesses: number of worker processes. Defaults to the
+            number of cpus
+
+        return: list of (wall time, error message or None) for each job"""
+    if not len(jobs):
+        raise ValueError("(in RunSweep) no jobs to run")
+
+    # load each distinct profile once, before the workers are forked
+    start = time.time()
+    for job in jobs:
+        for name in job['appProfiles']:
+            if name not in loadedProfiles:
+                loadedProfiles[name] = PreProc.LoadProfile(name)
+    print "Loaded %d profiles in %.3fs" % (len(loadedProfiles), time.time() - start)
+
+    results = []
+    pool = multiprocessing.Pool(numProcesses)
+    try:
+        for i, result in enumerate(pool.imap(RunJob, jobs)):
+            if result[1]:
+                print "job %d (%s): failed after %.3fs: %s" % (i, jobs[i]['traceFile'], result[0], result[1])
+            else:
+                print "job %d (%s): %.3fs" % (i, jobs[i]['traceFile'], result[0])
+            results.append(result)
+    finally:
+        pool.close()
+        pool.join()
+
+    print "Total: %.3fs" % (time.time() - start)
+
+    return results
+
+#
+## main function
+#
+
+if __name__ == "__main__":
+    try:
+        if len(sys.argv) != 2:
+            raise IndexError("Invalid number of arguments. Only config file should be specified")
+
+        # setup config parser
+        config = ConfigParser.RawConfigParser()
+        config.read(sys.argv[1])
+
+        # pull arguments
+        jobs = ReadJobs(config)
+        numProcesses = None
+        if config.has_option('sweep', 'numProcesses'):
+            numProcesses = int(config.get('sweep', 'numProcesses'))
+
+        results = RunSweep(jobs, numProcesses)
+        
+        # exit with an error if any job failed
+        failed = [result for result in results if result[1]]
+        if failed:
+            print "%d of %d jobs failed" % (len(failed), len(results))
+            sys.exit(1)
+
+    except IOError as error:
+        print "IOError: " + str(error)
+
+    except ValueError as error:
+        tb = sys.exc_info()[2]
+        traceback.print_tb(tb)
+        print "ValueError: ", error
+
+    except ConfigParser.NoOptionError as error:
+        print "Invalid Args: ", error, "\n"
+        print usage_info
+
+    except KeyError as error:
+        print "KeyError: ", error
+
+    except IndexError as error:
+        print "IndexError: ", error, "\n"
+        print usage_info
@@ -0,0 +1,293 @@
+""" filename: Benchmark.py
+    contents: performance benchmarks for the profiler and generator. Builds
+    synthetic traces and profiles deterministically for several working set
+    sizes, block sizes and numbers of reuse bins, measures accesses per
+    second and peak resident memory of each routine, and compares the
+    results against a stored JSON baseline"""
+
+import numpy as np
+import h5py as h5
+import argparse
+import multiprocessing
+import resource
+import tempfile
+import shutil
+import json
+import time
+import os
+
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from ApplicationProfiler import GenerateApplicationProfile
+from TraceGenerator import GenerateSyntheticTrace
+from lib.AlphaTree import AlphaTree
+import lib.TraceFormats as TraceFormats
+
+# default location of the stored baseline
+defaultBaseline = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+def MakeTrace(fileName, wsSize, blockSize, accesses, seed = 0):
+    """ MakeTrace: writes a deterministic OVP-format trace that touches every
+        block of a working set of wsSize blocks. Half of the accesses reuse
+        one of the 16 most recent blocks, the rest are uniform over the
+        working set. About 20% of cycles are idle
+
+        args:
+            - fileName: name of the trace file to write
+            - wsSize: number of distinct blocks in the trace
+            - blockSize: size of each block (in bytes)
+            - accesses: number of memory accesses after the first touches
+            - seed: seed for the random generator"""
+    rng = np.random.RandomState(seed)
+
+    # every block is touched once, in a random order
+    blocks = rng.permutation(wsSize)
+
+    # then reuse recent blocks or pick uniformly
+    picks = rng.randint(0, wsSize, accesses)
+    recent = rng.rand(accesses) < 0.5
+    offsets = rng.randint(1, 17, accesses)
+    order = np.concatenate((blocks, np.zeros(accesses, dtype = blocks.dtype)))
+    for i in xrange(accesses):
+        j = wsSize + i
+        order[j] = order[j - offsets[i]] if recent[i] else picks[i]
+
+    # word offsets within each block
+    words = rng.randint(0, blockSize / 4, len(order)) * 4
+    addresses = order * blockSize + words
+    types = rng.rand(len(order)) < 0.3
+    idle = rng.rand(len(order)) < 0.2
+
+    with open(fileName, 'w') as trace:
+        for i in xrange(len(order)):
+            if idle[i]:
+                trace.write("idle\n")
+            trace.write("%s,0x%x\n" % ('w' if types[i] else 'r', addresses[i]))
+
+def MakeProfile(fileName, wsSize, blockSize, reuseBins, seed = 0):
+    """ MakeProfile: writes a deterministic profile with a working set of
+        wsSize blocks, a geometric reuse distance PMF and random alphas
+
+        args:
+            - fileName: name of the profile to write
+            - wsSize: number of blocks in the working set
+            - blockSize: size of each block (in bytes)
+            - reuseBins: number of reuse distance bins
+            - seed: seed for the random generator"""
+    rng = np.random.RandomState(seed)
+    height = AlphaTree(blockSize, reuseBins).height
+
+    # geometric reuse distances, plus compulsory misses
+    reusePMF = np.zeros(wsSize + 1, dtype = np.float)
+    reusePMF[1:] = 0.9 ** np.minimum(np.arange(wsSize), 700)
+    reusePMF[0] = 0.01 * reusePMF[1:].sum()
+    reusePMF /= reusePMF.sum()
+
+    alphas = rng.rand(wsSize, reuseBins, height, 2)
+    alphas /= alphas.sum(axis = 3)[..., np.newaxis]
+
+    with h5.File(fileName, 'w') as profile:
+        profile.create_dataset('blockSize', data = blockSize, dtype = np.int)
+        profile.create_dataset('workingSet', data = np.arange(wsSize, dtype = np.int) * blockSize)
+        profile.create_dataset('reusePMF', data = reusePMF)
+        profile.create_dataset('loadProp', data = np.full(wsSize + 1, 0.7))
+        profile.create_dataset('activityMarkov', data = np.array([[0.5, 0.5], [0.2, 0.8]]))
+        profile.create_dataset('alphas', data = alphas)
+
+def BenchProfiler(workDir, wsSize, blockSize, reuseBins, accesses):
+    """ BenchProfiler: times GenerateApplicationProfile on a synthetic trace
+
+        return: tuple of (accesses processed, seconds)"""
+    traceFile = os.path.join(workDir, "trace.ovp")
+    MakeTrace(traceFile, wsSize, blockSize, accesses)
+
+    start = time.time()
+    GenerateApplicationProfile(traceFile, os.path.join(workDir, "profile"), reuseBins, blockSize)
+    return wsSize + accesses, time.time() - start
+
+def BenchGenerator(workDir, wsSize, blockSize, reuseBins, accesses):
+    """ BenchGenerator: times GenerateSyntheticTrace on a synthetic profile
+
+        return: tuple of (accesses generated, seconds)"""
+    profile = os.path.join(workDir, "profile.h5")
+    MakeProfile(profile, wsSize, blockSize, reuseBins)
+    np.random.seed(0)
+
+    start = time.time()
+    GenerateSyntheticTrace(os.path.join(workDir, "trace.din"), accesses, [profile], [], TraceFormats.Din)
+    return accesses, time.time() - start
+
+def BenchProcessAccess(workDir, wsSize, blockSize, reuseBins, accesses):
+    """ BenchProcessAccess: times AlphaTree.ProcessAccess on random addresses
+
+        return: tuple of (accesses processed, seconds)"""
+    rng = np.random.RandomState(0)
+    addresses = (rng.randint(0, blockSize / 4, accesses) * 4).tolist()
+    reuseDists = rng.randint(0, reuseBins + 1, accesses).tolist()
+    tree = AlphaTree(blockSize, reuseBins)
+
+    start = time.time()
+    for i in xrange(accesses):
+        tree.ProcessAccess(addresses[i], reuseDists[i])
+    return accesses, time.time() - start
+
+def BenchGenerateAccess(workDir, wsSize, blockSize, reuseBins, accesses):
+    """ BenchGenerateAccess: times AlphaTree.GenerateAccess with random alphas
+
+        return: tuple of (accesses generated, seconds)"""
+    rng = np.random.RandomState(0)
+    np.random.seed(0)
+    tree = AlphaTree(blockSize, reuseBins)
+    alphas = rng.rand(reuseBins, tree.height, 2)
+    alphas /= alphas.sum(axis = 2)[..., np.newaxis]
+    tree.LoadAlphas(alphas)
+    reuseDists = rng.randint(0, reuseBins + 1, accesses).tolist()
+
+    start = time.time()
+    for i in xrange(accesses):
+        tree.GenerateAccess(reuseDists[i])
+    return accesses, time.time() - start
+
+# benchmarks, and whether they depend on the working set size
+benchmarks = [("GenerateApplicationProfile", BenchProfiler, True), \
+    ("GenerateSyntheticTrace", BenchGenerator, True), \
+    ("AlphaTree.ProcessAccess", BenchProcessAccess, False), \
+    ("AlphaTree.GenerateAccess", BenchGenerateAccess, False)]
+
+def RunCase(bench, wsSize, blockSize, reuseBins, accesses, results):
+    """ RunCase: runs one benchmark in a child process (so peak memory is
+        measured for that benchmark alone) and sends back its results"""
+    workDir = tempfile.mkdtemp()
+    try:
+        count, seconds = bench(workDir, wsSize, blockSize, reuseBins, accesses)
+    finally:
+        shutil.rmtree(workDir)
+
+    # ru_maxrss is in kilobytes on linux
+    peakRSS = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+    results.send({'accessesPerSecond': count / max(seconds, 1e-9), \
+        'seconds': seconds, 'peakRSS': peakRSS})
+
+def RunBenchmarks(wsSizes, blockSizes, binCounts, accesses, names = None):
+    """ RunBenchmarks: runs every benchmark for every combination of the
+        input parameters
+
+        args:
+            - wsSizes: list of working set sizes (in blocks)
+            - blockSizes: list of block sizes (in bytes)
+            - binCounts: list of numbers of reuse bins
+            - accesses: number of accesses per benchmark
+            - names: names of the benchmarks to run. Defaults to all
+
+        return: dictionary mapping case names to results"""
+    results = {}
+
+    for name, bench, usesWorkingSet in benchmarks:
+        if names and name not in names:
+            continue
+
+        for wsSize in (wsSizes if usesWorkingSet else [None]):
+            for blockSize in blockSizes:
+                for reuseBins in binCounts:
+                    case = "%s/ws=%s/bs=%d/bins=%d" % (name, wsSize, blockSize, reuseBins)
+
+                    receiver, sender = multiprocessing.Pipe(False)
+                    child = multiprocessing.Process(target = RunCase, \
+                        args = (bench, wsSize, blockSize, reuseBins, accesses, sender))
+                    child.start()
+                    sender.close()
+                    try:
+                        result = receiver.recv()
+                    except EOFError:
+                        raise RuntimeError("(in RunBenchmarks) %s failed" % case)
+                    finally:
+                        child.join()
+
+                    results[case] = result
+                    print "%-60s %12.1f acc/s %9.1f MB" % (case, result['accessesPerSecond'], result['peakRSS'])
+
+    return results
+
+def CompareBaseline(results, baseline, tolerance):
+    """ CompareBaseline: finds cases whose throughput fell or whose peak
+        memory grew by more than tolerance relative to the baseline
+
+        args:
+            - results: dictionary returned by RunBenchmarks
+            - baseline: dictionary of stored results
+            - tolerance: allowed relative change (e.g. 0.2 for 20%)
+
+        return: list of regression messages"""
+    regressions = []
+
+    for case in sorted(results):
+        if case not in baseline:
+            continue
+
+        new = results[case]
+        old = baseline[case]
+
+        if new['accessesPerSecond'] < old['accessesPerSecond'] * (1 - tolerance):
+            regressions.append("%s: throughput %.1f -> %.1f acc/s" % \
+                (case, old['accessesPerSecond'], new['accessesPerSecond']))
+
+        if new['peakRSS'] > old['peakRSS'] * (1 + tolerance):
+            regressions.append("%s: peak RSS %.1f -> %.1f MB" % \
+                (case, old['peakRSS'], new['peakRSS']))
+
+    return regressions
+
+def ParseList(value):
+    """ ParseList: converts a comma separated string to a list of ints"""
+    return [int(float(item)) for item in value.split(',')]
+
+#
+## main function
+#
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = "Profiler and generator throughput benchmarks")
+    parser.add_argument("--sizes", type = ParseList, default = [1000, 10000], \
+        help = "working set sizes in blocks (e.g. 1e3,1e4,1e5,1e6)")
+    parser.add_argument("--block-sizes", type = ParseList, default = [64, 512])
+    parser.add_argument("--reuse-bins", type = ParseList, default = [3])
+    parser.add_argument("--accesses", type = int, default = 5000, \
+        help = "accesses per benchmark")
+    parser.add_argument("--bench", action = "append", \
+        help = "only run the named benchmark (may be repeated)")
+    parser.add_argument("--baseline", default = defaultBaseline)
+    parser.add_argument("--tolerance", type = float, default = 0.2)
+    parser.add_argument("--save", action = "store_true", \
+        help = "store the results as the new baseline")
+    args = parser.parse_args()
+
+    results = RunBenchmarks(args.sizes, args.block_sizes, args.reuse_bins, args.accesses, args.bench)
+
+    if args.save:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as file:
+                baseline = json.load(file)
+        baseline.update(results)
+
+        with open(args.baseline, 'w') as file:
+            json.dump(baseline, file, indent = 2, sort_keys = True)
+        print "Saved baseline to %s" % args.baseline
+        sys.exit(0)
+
+    if not os.path.exists(args.baseline):
+        print "No baseline at %s (run with --save to create one)" % args.baseline
+        sys.exit(0)
+
+    with open(args.baseline) as file:
+        baseline = json.load(file)
+
+    regressions = CompareBaseline(results, baseline, args.tolerance)
+    if regressions:
+        print "\n%d regressions:" % len(regressions)
+        for regression in regressions:
+            print "  " + regression
+        sys.exit(1)
+
+    print "\nNo regressions"
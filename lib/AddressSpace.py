@@ -0,0 +1,205 @@
+""" filename: AddressSpace.py
+    contents: this file contains the classes used by "TraceGenerator" to
+    generate traces longer than the working set of the input profiles. New
+    block addresses are synthesized on demand from an address-space layout,
+    and the working set can be capped so memory stays bounded"""
+
+class AddressSpace:
+    """ class AddressSpace: maps compact block ids to block addresses. Blocks
+        are laid out from baseAddress in regions of regionBlocks contiguous
+        blocks, each region separated by regionGap bytes"""
+
+    def __init__(self, baseAddress, blockSize, regionBlocks = 0, regionGap = 0, addressLimit = 2**64):
+        """ __init__: saves the layout
+
+            args:
+                - baseAddress: address of block id 0. Must be a multiple of
+                blockSize
+                - blockSize: size of each block (in bytes)
+                - regionBlocks: number of contiguous blocks per region. 0 lays
+                out every block contiguously. Default is 0
+                - regionGap: bytes between regions. Must be a multiple of
+                blockSize. Default is 0
+                - addressLimit: addresses must be < addressLimit. Default is
+                2**64 (the width of addresses in the binary trace formats)"""
+        # validate inputs
+        if blockSize < 4 or blockSize & (blockSize - 1):
+            raise ValueError("(in AddressSpace.__init__) blockSize must be power of 2 >= 4")
+
+        if baseAddress < 0 or baseAddress % blockSize:
+            raise ValueError("(in AddressSpace.__init__) baseAddress must be a multiple of blockSize")
+
+        if regionBlocks < 0 or regionGap < 0 or regionGap % blockSize:
+            raise ValueError("(in AddressSpace.__init__) regionBlocks must be >= 0 and regionGap a multiple of blockSize")
+
+        self.baseAddress = baseAddress
+        self.blockSize = blockSize
+        self.regionBlocks = regionBlocks
+        self.regionGap = regionGap
+        self.addressLimit = addressLimit
+
+    def Address(self, blockId):
+        """ Address: returns the address of the input block id
+
+            args:
+                - blockId: compact id of the block (>= 0)"""
+        if self.regionBlocks:
+            region, offset = divmod(blockId, self.regionBlocks)
+            address = self.baseAddress + region * (self.regionBlocks * self.blockSize + self.regionGap) \
+                + offset * self.blockSize
+        else:
+            address = self.baseAddress + blockId * self.blockSize
+
+        if address + self.blockSize > self.addressLimit:
+            raise ValueError("(in AddressSpace.Address) address space exhausted, set a working set cap")
+
+        return address
+
+class BlockAllocator:
+    """ class BlockAllocator: hands out compact block ids. Released ids are
+        reused before new ones, so the ids in use stay in [0, peak blocks)"""
+
+    def __init__(self):
+        """ __init__: creates an empty allocator"""
+        self.nextId = 0
+        self.freeIds = []
+
+    def Allocate(self):
+        """ Allocate: returns an unused block id"""
+        if self.freeIds:
+            return self.freeIds.pop()
+
+        self.nextId += 1
+        return self.nextId - 1
+
+    def Release(self, blockId):
+        """ Release: returns a block id to the allocator
+
+            args:
+                - blockId: id returned by Allocate"""
+        self.freeIds.append(blockId)
+
+class StreamingWorkingSet:
+    """ class StreamingWorkingSet: LRU stack of the blocks referenced by the
+        generator. Compulsory misses use the profile's working set in order
+        and then fresh blocks from the address space. Each block in the stack
+        owns one AlphaTree. If the stack is capped, the least recently used
+        block is dropped when a new one is referenced, and the id of a fresh
+        block is released for reuse"""
+
+    def __init__(self, workingSet, alphaForest, addressSpace, maxBlocks = 0):
+        """ __init__: creates an empty stack
+
+            args:
+                - workingSet: list of the profile's block addresses
+                - alphaForest: AlphaForest of the profile. Block i of the
+                working set uses row i of the alphas, and fresh block id k
+                uses row (k % len(workingSet))
+                - addressSpace: AddressSpace that fresh blocks are laid out in
+                - maxBlocks: max number of blocks in the stack. 0 is
+                unbounded. Default is 0"""
+        if not len(workingSet):
+            raise ValueError("(in StreamingWorkingSet.__init__) workingSet must not be empty")
+
+        if maxBlocks < 0:
+            raise ValueError("(in StreamingWorkingSet.__init__) maxBlocks must be >= 0")
+
+        self.workingSet = workingSet
+        self.alphaForest = alphaForest
+        self.addressSpace = addressSpace
+        self.maxBlocks = maxBlocks
+        self.allocator = BlockAllocator()
+
+        # next unreferenced block of the profile's working set
+        self.nextProfileBlock = 0
+
+        # referenced blocks, most recently used first
+        self.lruStack = []
+
+        # AlphaTree & fresh block id (None for profile blocks) by address
+        self.trees = {}
+        self.blockIds = {}
+
+        # row of the blocks of a warm start whose trees are not built yet
+        self.warmRows = {}
+
+    def __len__(self):
+        """ __len__: returns the number of blocks in the stack"""
+        return len(self.lruStack)
+
+    def NewBlock(self):
+        """ NewBlock: references a block that is not in the stack and
+            returns its address"""
+        wsSize = len(self.workingSet)
+
+        # drop the least recently used block, so its id can be reused
+        if self.maxBlocks and len(self.lruStack) >= self.maxBlocks:
+            evicted = self.lruStack.pop()
+            self.trees.pop(evicted, None)
+            self.warmRows.pop(evicted, None)
+            evictedId = self.blockIds.pop(evicted)
+            if evictedId is not None:
+                self.allocator.Release(evictedId)
+
+        if self.nextProfileBlock < wsSize:
+            memAddress = self.workingSet[self.nextProfileBlock]
+            blockId = None
+            row = self.nextProfileBlock
+            self.nextProfileBlock += 1
+        else:
+            blockId = self.allocator.Allocate()
+            memAddress = self.addressSpace.Address(blockId)
+            row = blockId % wsSize
+
+            if memAddress in self.blockIds:
+                raise ValueError("(in StreamingWorkingSet.NewBlock) address space overlaps the profile's working set")
+
+        self.lruStack.insert(0, memAddress)
+        self.trees[memAddress] = self.alphaForest.BuildTree(row, blockId is None)
+        self.blockIds[memAddress] = blockId
+
+        return memAddress
+
+    def WarmStart(self, lruOrder):
+        """ WarmStart: fills the stack with the profile's blocks in the order
+            left by the profiled trace, as if they had all been referenced.
+            Their trees are built on first use, from the saved tree state
+
+            args:
+                - lruOrder: ids of the profile's blocks, most recently used
+                first (see PreProcessing.GetWarmState)"""
+        if self.maxBlocks:
+            lruOrder = lruOrder[:self.maxBlocks]
+
+        self.lruStack = [self.workingSet[i] for i in lruOrder]
+        self.warmRows = dict((self.workingSet[i], i) for i in lruOrder)
+        self.blockIds = dict((memAddress, None) for memAddress in self.lruStack)
+        self.trees = {}
+        self.nextProfileBlock = len(self.workingSet)
+
+    def Reuse(self, reuseDist):
+        """ Reuse: references the block at the input reuse distance and
+            returns its address
+
+            args:
+                - reuseDist: position of the block in the stack (< len(self))"""
+        lruStack = self.lruStack
+
+        memAddress = lruStack[reuseDist]
+        del lruStack[reuseDist]
+        lruStack.insert(0, memAddress)
+
+        return memAddress
+
+    def Tree(self, memAddress):
+        """ Tree: returns the AlphaTree of a block in the stack
+
+            args:
+                - memAddress: address of the block"""
+        tree = self.trees.get(memAddress)
+
+        if tree is None: # block of a warm start
+            tree = self.alphaForest.BuildTree(self.warmRows.pop(memAddress))
+            self.trees[memAddress] = tree
+
+        return tree
@@ -0,0 +1,98 @@
+""" filename: AlphaForest
+    contents: This file contains the AlphaForest class, which holds the
+    AlphaTree for every block in the working set of a (mixed) application
+    profile. Trees are only built the first time a block is referenced, so
+    start-up time and memory scale with the blocks actually touched"""
+
+import numpy as np
+from AlphaTree import AlphaTree
+
+class AlphaForest:
+    """ class AlphaForest: lazily materialized list of AlphaTrees. Indexing
+        the forest with a block's position in the working set returns that
+        block's AlphaTree, creating, loading and normalizing it from the
+        weighted alpha rows of each application profile on first use"""
+
+    def __init__(self, appProfiles, weights, wsSize, blockSize, treeState = None):
+        """ __init__: saves handles to the alpha datasets of each profile.
+            No alpha values are read until a tree is requested
+
+            args:
+                - appProfiles: list of open file handles for each application
+                profile. These must stay open while the forest is in use
+                - weights: python list specifying the weights of each profile
+                - wsSize: number of cache blocks in the mixed working set
+                - blockSize: size of the block represented by each tree root
+                - treeState: packed tree flags of each block to start the
+                trees from (see PreProcessing.GetWarmState). Default is None
+                (trees start empty)"""
+        numProfiles = len(appProfiles)
+
+        # handles to each profile's alpha values
+        self.alphas = [appProfiles[i]['alphas'] for i in xrange(numProfiles)]
+
+        # all profiles must share the same number of bins & tree height
+        alphaShape = self.alphas[0].shape
+        for i in xrange(1, numProfiles):
+            if self.alphas[i].shape[1:] != alphaShape[1:]:
+                raise ValueError("(in AlphaForest.__init__) all profiles must have the same reuseBins and blockSize")
+
+        # save mixing parameters
+        self.weights = weights
+        self.wsSize = wsSize
+        self.blockSize = blockSize
+        self.bins = alphaShape[1]
+        self.height = alphaShape[2]
+        self.treeState = treeState
+
+        # trees that have been materialized, keyed by block index
+        self.trees = {}
+
+    def __len__(self):
+        """ __len__: returns the number of blocks in the working set, whether
+            or not their trees have been built"""
+        return self.wsSize
+
+    def __getitem__(self, blockIndex):
+        """ __getitem__: returns the AlphaTree for the input block, building
+            it on first access
+
+            args:
+                - blockIndex: index of the block in the working set"""
+        tree = self.trees.get(blockIndex)
+
+        if tree is None:
+            tree = self.BuildTree(blockIndex)
+            self.trees[blockIndex] = tree
+
+        return tree
+
+    def BuildTree(self, blockIndex, warm = True):
+        """ BuildTree: creates an AlphaTree from the linear combination of
+            the input block's alpha values in every profile. Profiles whose
+            working set does not reach this block contribute nothing
+
+            args:
+                - blockIndex: index of the block in the working set
+                - warm: if True, the tree starts from the block's saved flags
+                (if the forest has a treeState). Default is True"""
+        if blockIndex < 0 or blockIndex >= self.wsSize:
+            raise IndexError("(in AlphaForest.BuildTree) blockIndex out of range")
+
+        # matrix to store alpha values
+        alphaValues = np.zeros((self.bins, self.height, 2), dtype = np.float)
+
+        # read only this block's row from each profile
+        for i in xrange(len(self.alphas)):
+            if blockIndex < self.alphas[i].shape[0]:
+                alphaValues += self.alphas[i][blockIndex] * self.weights[i]
+
+        # create, load and normalize the tree
+        tree = AlphaTree(self.blockSize, self.bins)
+        tree.LoadAlphas(alphaValues)
+        tree.NormalizeReuseCount()
+
+        if warm and self.treeState is not None:
+            tree.tree = np.unpackbits(self.treeState[blockIndex])[:len(tree.tree)].astype(np.bool)
+
+        return tree
@@ -0,0 +1,249 @@
+""" filename: Catalog.py
+    contents: this file contains the routines used by "ProfileCatalog" to
+    index a library of application profiles. A compact summary of each
+    profile (footprint, blockSize, reuseBins, coarse miss ratio curve, load
+    ratio and activity rate) is saved as attributes of the profile and in a
+    SQLite database. The database is updated incrementally, so profiles can
+    be selected with SQL queries without opening them"""
+
+import multiprocessing
+import sqlite3
+import os
+import numpy as np
+import h5py as h5
+
+# scalar fields of a summary, in the order of the columns of the catalog
+summaryFields = ['footprint', 'blockSize', 'reuseBins', 'maxReuseDistance', 'loadRatio', 'activityRate']
+
+# tables of the catalog. Profiles are keyed by absolute path, and the miss
+# ratio curve of each has a row per point
+catalogSchema = """
+CREATE TABLE IF NOT EXISTS profiles (path TEXT PRIMARY KEY, mtime REAL, size INTEGER,
+    footprint INTEGER, blockSize INTEGER, reuseBins INTEGER, maxReuseDistance INTEGER,
+    loadRatio REAL, activityRate REAL);
+CREATE TABLE IF NOT EXISTS mrc (path TEXT, cacheBlocks INTEGER, missRatio REAL,
+    PRIMARY KEY (path, cacheBlocks));
+CREATE INDEX IF NOT EXISTS profilesFootprint ON profiles (footprint);
+CREATE INDEX IF NOT EXISTS mrcMissRatio ON mrc (cacheBlocks, missRatio);
+"""
+
+def MissRatioPoints(reusePMF, reuseBounds = None, maxReuseDistance = 0):
+    """ MissRatioPoints: computes the miss ratio of fully-associative LRU
+        caches of 1, 2, 4, ... blocks from a profile's reusePMF. An access
+        misses in a cache of N blocks if it is a first access or its reuse
+        distance is >= N. Distances in a log-spaced bucket are taken as
+        uniform over the bucket, as in the generator
+
+        args:
+            - reusePMF: reuse distance PMF of the profile
+            - reuseBounds: bounds of each entry of log-binned profiles, or
+            None (see ProfileWriter.LogBinCounts)
+            - maxReuseDistance: cap of the profile (0 if none). Caches larger
+            than the cap are left out, as far reuses are not measured
+
+        return: tuple of (cacheBlocks, missRatios) arrays. Cache sizes go up
+        to the longest reuse distance (the cap if there is one)"""
+    reusePMF = np.asarray(reusePMF, dtype = np.float)
+
+    # far reuses miss in every cache up to the cap
+    far = 0.0
+    if maxReuseDistance and len(reusePMF) == maxReuseDistance + 2:
+        far = reusePMF[-1]
+        reusePMF = reusePMF[:-1]
+
+    # distances [low, high) of each entry after the first
+    if reuseBounds is not None:
+        high = np.asarray(reuseBounds[1:len(reusePMF)], dtype = np.float)
+        low = np.asarray(reuseBounds[:len(high)], dtype = np.float)
+    else:
+        low = np.arange(len(reusePMF) - 1, dtype = np.float)
+        high = low + 1
+
+    longest = maxReuseDistance or (int(high[-1]) if len(high) else 1)
+    cacheBlocks = 2**np.arange(longest.bit_length())
+    missRatios = np.empty(len(cacheBlocks), dtype = np.float)
+    for i in xrange(len(cacheBlocks)):
+        # share of each entry at distances >= cacheBlocks[i]
+        farther = np.clip((high - np.maximum(low, cacheBlocks[i])) / (high - low), 0, 1)
+        missRatios[i] = reusePMF[0] + np.dot(reusePMF[1:], farther) + far
+
+    return cacheBlocks, np.minimum(missRatios, 1.0)
+
+def SummarizeProfile(fileName):
+    """ SummarizeProfile: computes the summary of a profile. Only the small
+        datasets are read; the shapes of the others are enough
+
+        args:
+            - fileName: name of the profile
+
+        return: dictionary of the summaryFields, and the miss ratio curve
+        points as "mrcBlocks" & "mrcMissRatios" (see MissRatioPoints)"""
+    with h5.File(fileName, 'r') as profile:
+        reusePMF = np.asarray(profile['reusePMF'], dtype = np.float)
+        loadProp = np.asarray(profile['loadProp'], dtype = np.float)
+        activityMarkov = np.asarray(profile['activityMarkov'], dtype = np.float)
+        maxReuseDistance = int(profile['maxReuseDistance'][()]) if 'maxReuseDistance' in profile else 0
+        reuseBounds = np.asarray(profile['reuseBounds']) if 'reuseBounds' in profile else None
+
+        summary = {'footprint': profile['workingSet'].shape[0], 'blockSize': int(profile['blockSize'][()]), \
+            'maxReuseDistance': maxReuseDistance}
+
+        # capped profiles have an alpha bin for far reuses
+        summary['reuseBins'] = profile['alphas'].shape[1] - (1 if maxReuseDistance else 0)
+
+    summary['loadRatio'] = float(np.dot(reusePMF, loadProp[:len(reusePMF)]))
+
+    # share of active cycles in the steady state of the activity model
+    toActive = activityMarkov[0, 1]
+    toInactive = activityMarkov[1, 0]
+    summary['activityRate'] = float(toActive / (toActive + toInactive)) if toActive + toInactive else 1.0
+
+    summary['mrcBlocks'], summary['mrcMissRatios'] = MissRatioPoints(reusePMF, reuseBounds, maxReuseDistance)
+
+    return summary
+
+def WriteSummary(fileName, summary):
+    """ WriteSummary: saves a summary as attributes of the profile's root
+        group, so tools reading one profile need not compute it
+
+        args:
+            - fileName: name of the profile
+            - summary: dictionary returned by SummarizeProfile"""
+    with h5.File(fileName, 'a') as profile:
+        for name in summaryFields + ['mrcBlocks', 'mrcMissRatios']:
+            profile.attrs[name] = summary[name]
+
+def SummaryWorker(args):
+    """ SummaryWorker: pool worker. Summarizes one profile and optionally
+        saves the summary in it
+
+        args:
+            - args: tuple of (fileName, writeAttributes)
+
+        return: tuple of (fileName, (mtime, size) after any attributes are
+        written, summary). The summary is None if the file is not a
+        readable profile"""
+    fileName, writeAttributes = args
+
+    try:
+        summary = SummarizeProfile(fileName)
+        if writeAttributes:
+            WriteSummary(fileName, summary)
+    except (IOError, KeyError):
+        summary = None
+
+    status = os.stat(fileName)
+    return fileName, (status.st_mtime, status.st_size), summary
+
+def OpenCatalog(catalogFile):
+    """ OpenCatalog: opens the catalog database, creating its tables if
+        needed
+
+        args:
+            - catalogFile: name of the SQLite database
+
+        return: sqlite3 connection"""
+    connection = sqlite3.connect(catalogFile)
+    connection.executescript(catalogSchema)
+    return connection
+
+def UpdateCatalog(catalogFile, profiles, writeAttributes = True, numProcesses = 1):
+    """ UpdateCatalog: adds the input profiles to the catalog. Only profiles
+        that are new or whose modification time or size changed since they
+        were cataloged are read. Profiles that no longer exist are removed
+
+        args:
+            - catalogFile: name of the SQLite database
+            - profiles: list of the names of the profiles
+            - writeAttributes: if True, each summary is also saved as
+            attributes of its profile (see WriteSummary). Default is True
+            - numProcesses: number of processes summarizing profiles.
+            Default is 1 (no pool)
+
+        return: dictionary with the number of profiles "updated", "removed"
+        and "unchanged", and the list of the profiles that "failed" to be
+        read"""
+    connection = OpenCatalog(catalogFile)
+    result = {'updated': 0, 'removed': 0, 'unchanged': 0, 'failed': []}
+
+    try:
+        cataloged = dict((path, (mtime, size)) for path, mtime, size in \
+            connection.execute("SELECT path, mtime, size FROM profiles"))
+
+        # profiles new or changed since they were cataloged
+        changed = []
+        for fileName in sorted(set(os.path.abspath(fileName) for fileName in profiles)):
+            status = os.stat(fileName)
+            if cataloged.get(fileName) == (status.st_mtime, status.st_size):
+                result['unchanged'] += 1
+            else:
+                changed.append((fileName, writeAttributes))
+
+        if numProcesses > 1 and len(changed) > 1:
+            pool = multiprocessing.Pool(numProcesses)
+            try:
+                summaries = pool.map(SummaryWorker, changed)
+            finally:
+                pool.close()
+                pool.join()
+        else:
+            summaries = map(SummaryWorker, changed)
+
+        with connection:
+            for fileName, (mtime, size), summary in summaries:
+                connection.execute("DELETE FROM mrc WHERE path = ?", (fileName,))
+                if summary is None:
+                    connection.execute("DELETE FROM profiles WHERE path = ?", (fileName,))
+                    result['failed'].append(fileName)
+                    continue
+
+                connection.execute("INSERT OR REPLACE INTO profiles VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", \
+                    [fileName, mtime, size] + [summary[name] for name in summaryFields])
+                connection.executemany("INSERT INTO mrc VALUES (?, ?, ?)", [(fileName, int(cacheBlocks), \
+                    float(missRatio)) for cacheBlocks, missRatio in zip(summary['mrcBlocks'], summary['mrcMissRatios'])])
+                result['updated'] += 1
+
+            # profiles deleted since they were cataloged
+            for path in cataloged:
+                if not os.path.exists(path):
+                    connection.execute("DELETE FROM profiles WHERE path = ?", (path,))
+                    connection.execute("DELETE FROM mrc WHERE path = ?", (path,))
+                    result['removed'] += 1
+    finally:
+        connection.close()
+
+    return result
+
+def QueryCatalog(catalogFile, condition = "", parameters = ()):
+    """ QueryCatalog: selects profiles from the catalog
+
+        args:
+            - catalogFile: name of the SQLite database
+            - condition: SQL condition on the columns of the profiles table
+            (path, footprint, blockSize, reuseBins, maxReuseDistance,
+            loadRatio, activityRate), e.g. "footprint > ? AND path IN
+            (SELECT path FROM mrc WHERE cacheBlocks = 1024 AND missRatio <
+            0.1)". Default is "" (every profile)
+            - parameters: values of the "?" placeholders in condition
+
+        return: list of the summaries of the profiles selected, in order of
+        path. Each is a dictionary of "path", the summaryFields and "mrc"
+        (list of (cacheBlocks, missRatio) points)"""
+    connection = OpenCatalog(catalogFile)
+
+    try:
+        query = "SELECT path, %s FROM profiles" % ", ".join(summaryFields)
+        if condition:
+            query += " WHERE " + condition
+        rows = connection.execute(query + " ORDER BY path", parameters).fetchall()
+
+        summaries = []
+        for row in rows:
+            summary = dict(zip(['path'] + summaryFields, row))
+            summary['mrc'] = connection.execute("SELECT cacheBlocks, missRatio FROM mrc WHERE path = ? " + \
+                "ORDER BY cacheBlocks", (summary['path'],)).fetchall()
+            summaries.append(summary)
+    finally:
+        connection.close()
+
+    return summaries
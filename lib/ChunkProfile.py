@@ -0,0 +1,308 @@
+""" filename: ChunkProfile.py
+    contents: this file contains the routines used by "ApplicationProfiler"
+    to profile one trace on many cores. The trace is cut at line boundaries
+    into chunks that are profiled in a pool of worker processes, each with
+    its own LRU stack. Accesses to blocks not yet seen in their chunk are
+    left as unresolved first touches, and are resolved in trace order
+    against the LRU state left by the earlier chunks. AlphaTree updates are
+    spread over worker processes by block, so each tree sees its accesses in
+    trace order and the profile is identical to the serial profiler's"""
+
+import multiprocessing
+import bisect
+import time
+import os
+import numpy as np
+
+from AlphaTree import AlphaTree
+from LRUStack import LRUStack
+from ProfileWriter import SaveProfile, SaveCounts, PackTreeState
+from TracePipeline import ParseChunk
+from TraceFormats import binIdle
+
+def ChunkBoundaries(traceFile, numChunks):
+    """ ChunkBoundaries: cuts a trace into chunks of about the same size at
+        line boundaries
+
+        args:
+            - traceFile: name of the trace
+            - numChunks: number of chunks
+
+        return: list of (start, end) byte offsets of the non-empty chunks"""
+    size = os.path.getsize(traceFile)
+    boundaries = [0]
+
+    with open(traceFile) as file:
+        for i in xrange(1, numChunks):
+            position = size * i / numChunks
+            if position <= boundaries[-1]:
+                continue
+
+            # move to the start of the next line
+            file.seek(position - 1)
+            file.readline()
+            boundaries.append(min(file.tell(), size))
+
+    boundaries.append(size)
+    return [(boundaries[i], boundaries[i + 1]) for i in xrange(len(boundaries) - 1) \
+        if boundaries[i] < boundaries[i + 1]]
+
+def ProfileChunk(args):
+    """ ProfileChunk: pool worker. Parses one chunk and measures the reuse
+        distances of its accesses within the chunk
+
+        args:
+            - args: tuple of (traceFile, start, end, blockMask,
+            maxReuseDistance)
+
+        return: dictionary with the chunk's accesses ("memAddresses",
+        "accessTypes", "memBlocks"), their reuse distances ("reuseDists",
+        -1 for first touches in the chunk, maxReuseDistance for far reuses),
+        the chunk's blocks most recently used first ("lruStack", capped at
+        maxReuseDistance), its activity counts ("activityCount") and the
+        activity of its first & last cycles ("first", "last")"""
+    traceFile, start, end, blockMask, maxReuseDistance = args
+
+    with open(traceFile) as file:
+        file.seek(start)
+        memAddresses, accessTypes = ParseChunk(file.read(end - start))
+
+    # activity transitions within the chunk. A run of N inactive cycles has
+    # N - 1 inactive to inactive transitions of its own
+    active = (accessTypes != binIdle).astype(np.int64)
+    activityCount = np.bincount(active[:-1] * 2 + active[1:], minlength = 4).reshape((2, 2)).astype(np.float)
+    activityCount[0, 0] += float(np.sum(memAddresses[active == 0])) - np.count_nonzero(active == 0)
+
+    memAddresses = memAddresses[active > 0]
+    accessTypes = accessTypes[active > 0]
+    memBlocks = memAddresses & np.uint64(blockMask % 2**64)
+
+    # reuse distances within the chunk, over block ids dense in the chunk
+    uniqueBlocks, blockIds = np.unique(memBlocks, return_inverse = True)
+    lruStack = LRUStack(maxReuseDistance)
+    seen = bytearray(len(uniqueBlocks))
+    reuseDists = np.empty(len(memBlocks), dtype = np.int64)
+    i = 0
+    for blockId in blockIds.tolist():
+        reuseDist = lruStack.Access(blockId)
+        if reuseDist < 0:
+            if seen[blockId]: # dropped past the cap
+                reuseDist = maxReuseDistance
+            else:
+                seen[blockId] = 1
+        reuseDists[i] = reuseDist
+        i += 1
+
+    return {'memAddresses': memAddresses, 'accessTypes': accessTypes, 'memBlocks': memBlocks, \
+        'reuseDists': reuseDists, 'activityCount': activityCount, \
+        'lruStack': uniqueBlocks[np.asarray(lruStack.stack, dtype = np.intp)].tolist(), \
+        'first': int(active[0]) if len(active) else -1, 'last': int(active[-1]) if len(active) else -1}
+
+def ResolveChunk(chunk, lruStack, blockIndices, maxReuseDistance = 0):
+    """ ResolveChunk: resolves the first touches of a chunk against the LRU
+        stack left by the earlier chunks. The k-th first touch in a chunk
+        is preceded by k distinct blocks of the chunk, so its reuse distance
+        is k plus its depth in the earlier stack once the chunk's blocks are
+        removed
+
+        args:
+            - chunk: dictionary returned by ProfileChunk. Its reuseDists are
+            updated in place (-1 is left for blocks never accessed before)
+            - lruStack: blocks most recently used first after the earlier
+            chunks (capped at maxReuseDistance)
+            - blockIndices: dictionary of the blocks accessed by the earlier
+            chunks
+            - maxReuseDistance: cap of the reuse distances (0 if none)
+
+        return: LRU stack after the chunk"""
+    reuseDists = chunk['reuseDists']
+    memBlocks = chunk['memBlocks']
+
+    depths = dict((lruStack[i], i) for i in xrange(len(lruStack)))
+    removed = [] # sorted depths of the chunk's blocks in the earlier stack
+
+    firstTouches = np.flatnonzero(reuseDists < 0).tolist()
+    for touched in xrange(len(firstTouches)):
+        i = firstTouches[touched]
+        memBlock = int(memBlocks[i])
+
+        depth = depths.get(memBlock)
+        if depth is not None:
+            reuseDist = touched + depth - bisect.bisect(removed, depth)
+            bisect.insort(removed, depth)
+            if maxReuseDistance and reuseDist >= maxReuseDistance:
+                reuseDist = maxReuseDistance
+            reuseDists[i] = reuseDist
+        elif memBlock in blockIndices: # deeper than the cap
+            reuseDists[i] = maxReuseDistance
+
+    # the chunk's blocks are now on top of the stack
+    chunkBlocks = set(memBlocks.tolist())
+    lruStack = chunk['lruStack'] + [block for block in lruStack if block not in chunkBlocks]
+    if maxReuseDistance:
+        del lruStack[maxReuseDistance:]
+
+    return lruStack
+
+def AlphaOwner(accessQueue, resultQueue, blockSize, alphaBins):
+    """ AlphaOwner: worker process that owns the AlphaTrees of a subset of
+        the blocks. Processes batches of accesses in the order received and
+        ends with the alpha counts & edge flags of its trees when it
+        receives None
+
+        args:
+            - accessQueue: queue of (trees, memAddresses, alphaBins) arrays
+            - resultQueue: queue to send the {tree: (counts, flags)}
+            dictionary to
+            - blockSize: size of the blocks
+            - alphaBins: number of alpha bins"""
+    alphaForest = {}
+    while True:
+        batch = accessQueue.get()
+        if batch is None:
+            break
+
+        for tree, memAddress, alphaBin in zip(*[array.tolist() for array in batch]):
+            if tree not in alphaForest:
+                alphaForest[tree] = AlphaTree(blockSize, alphaBins)
+            alphaForest[tree].ProcessAccess(memAddress, alphaBin)
+
+    resultQueue.put(dict((tree, (alphaForest[tree].reuseCount, alphaForest[tree].tree)) for tree in alphaForest))
+
+def ProfileChunks(traceFile, outputFile, reuseBins = 3, blockSize = 512, maxReuseDistance = 0, numChunks = 4, \
+    numProcesses = None, saveCounts = False, queueDepth = 8, stats = None, exactReuseDistances = 0):
+    """ ProfileChunks: creates an application profile from a trace profiled
+        in chunks on many cores. The profile is identical to the serial
+        profiler's
+
+        args:
+            - traceFile, outputFile, reuseBins, blockSize, maxReuseDistance,
+            saveCounts, queueDepth, exactReuseDistances: see 
+            GenerateApplicationProfile
+            - numChunks: number of chunks to cut the trace into. Each chunk's
+            accesses are held in memory while it is resolved
+            - numProcesses: number of chunk workers, and of AlphaTree owners.
+            Default is the number of cpus
+            - stats: RunStats to record waits for chunks in, or None
+
+        return: number of accesses in the trace"""
+    numProcesses = numProcesses or multiprocessing.cpu_count()
+    blockMask = ~(blockSize - 1)
+    alphaBins = reuseBins + 1 if maxReuseDistance else reuseBins
+
+    activityMarkov = np.zeros((2, 2), dtype = np.float)
+    previousCycle = 0
+
+    lruStack = []
+    workingSet = []
+    blockIndices = {}
+
+    reusePMF = np.zeros(1, dtype = np.float)
+    loadProp = np.zeros(1, dtype = np.float)
+
+    # AlphaTree owners. Block i's tree is owned by owner i % numProcesses
+    resultQueue = multiprocessing.Queue()
+    accessQueues = [multiprocessing.Queue(queueDepth) for i in xrange(numProcesses)]
+    owners = [multiprocessing.Process(target = AlphaOwner, args = (accessQueues[i], resultQueue, blockSize, \
+        alphaBins)) for i in xrange(numProcesses)]
+    for owner in owners:
+        owner.daemon = True
+        owner.start()
+
+    pool = multiprocessing.Pool(numProcesses)
+    try:
+        chunks = pool.imap(ProfileChunk, [(traceFile, start, end, blockMask, maxReuseDistance) \
+            for start, end in ChunkBoundaries(traceFile, numChunks)])
+
+        while True:
+            start = time.time()
+            try:
+                chunk = next(chunks)
+            except StopIteration:
+                break
+            if stats:
+                stats.Wait('chunk', time.time() - start)
+
+            # activity, including the transition from the previous chunk
+            if chunk['first'] < 0:
+                continue
+            activityMarkov[previousCycle, chunk['first']] += 1
+            activityMarkov += chunk['activityCount']
+            previousCycle = chunk['last']
+
+            lruStack = ResolveChunk(chunk, lruStack, blockIndices, maxReuseDistance)
+            reuseDists = chunk['reuseDists']
+            memBlocks = chunk['memBlocks']
+
+            # first accesses update the tree of the previous new block
+            trees = np.empty(len(reuseDists), dtype = np.int64)
+            for i in np.flatnonzero(reuseDists < 0).tolist():
+                memBlock = int(memBlocks[i])
+                trees[i] = len(workingSet) - 1 if workingSet else 0
+                blockIndices[memBlock] = len(workingSet)
+                workingSet.append(memBlock)
+
+            reuses = reuseDists >= 0
+            uniqueBlocks, inverse = np.unique(memBlocks[reuses], return_inverse = True)
+            trees[reuses] = np.array([blockIndices[block] for block in uniqueBlocks.tolist()], \
+                dtype = np.int64)[inverse]
+
+            # alpha bin of each access. Far reuses use the last bin
+            alphaBin = np.maximum(reuseDists, 0)
+            if maxReuseDistance:
+                alphaBin = np.where(reuseDists == maxReuseDistance, reuseBins, np.minimum(alphaBin, reuseBins - 1))
+
+            for i in xrange(numProcesses):
+                owned = trees % numProcesses == i
+                accessQueues[i].put((trees[owned], chunk['memAddresses'][owned], alphaBin[owned]))
+
+            # reuse distance & load counts
+            counts = np.bincount(reuseDists + 1)
+            loads = np.bincount(reuseDists + 1, weights = chunk['accessTypes'] == 0)
+            if len(counts) > len(reusePMF):
+                reusePMF = np.append(reusePMF, np.zeros(len(counts) - len(reusePMF)))
+                loadProp = np.append(loadProp, np.zeros(len(counts) - len(loadProp)))
+            reusePMF[:len(counts)] += counts
+            loadProp[:len(loads)] += loads
+
+        for accessQueue in accessQueues:
+            accessQueue.put(None)
+
+        alphaCounts = {}
+        for owner in owners:
+            alphaCounts.update(resultQueue.get())
+        for owner in owners:
+            owner.join()
+
+    finally:
+        pool.close()
+        pool.join()
+        for owner in owners:
+            if owner.is_alive():
+                owner.terminate()
+
+    # the serial profiler has one reuse distance per block (and the far
+    # bin if capped)
+    numReuseDistances = len(workingSet) + 1
+    if maxReuseDistance:
+        numReuseDistances = min(numReuseDistances, maxReuseDistance + 2)
+    reusePMF = np.append(reusePMF, np.zeros(max(numReuseDistances - len(reusePMF), 0)))[:numReuseDistances]
+    loadProp = np.append(loadProp, np.zeros(max(numReuseDistances - len(loadProp), 0)))[:numReuseDistances]
+
+    emptyTree = AlphaTree(blockSize, alphaBins)
+    alphas = np.zeros((len(workingSet), alphaBins, emptyTree.height, 2), dtype = np.float)
+    treeFlags = np.zeros((len(workingSet), len(emptyTree.tree)), dtype = np.bool)
+    for tree in alphaCounts:
+        alphas[tree], treeFlags[tree] = alphaCounts[tree]
+
+    # LRU stack & AlphaTree state at the end of the trace
+    lruOrder = [blockIndices[block] for block in lruStack]
+    treeState = PackTreeState(treeFlags)
+
+    SaveProfile(outputFile, blockSize, workingSet, reusePMF, loadProp, activityMarkov, alphas, maxReuseDistance, \
+        exactReuseDistances, lruOrder, treeState)
+    if saveCounts:
+        SaveCounts(outputFile + "_counts", blockSize, workingSet, reusePMF, loadProp, activityMarkov, \
+            alphas, maxReuseDistance, lruOrder, treeState)
+
+    return int(reusePMF.sum())
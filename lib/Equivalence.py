@@ -0,0 +1,268 @@
+""" filename: Equivalence.py
+    contents: this file contains the routines used by "EngineCheck" to
+    check that the fast engines of the profiler and generator are
+    equivalent to the reference engine (see ReferenceEngine.py). Profiles of
+    random traces are compared exactly, traces generated with the same seed
+    are compared byte for byte, and traces generated with different seeds
+    are compared with chi-square goodness-of-fit tests"""
+
+import numpy as np
+import h5py as h5
+import math
+import os
+import re
+
+from LRUStack import LRUStack
+
+# datasets of a profile compared by CompareProfiles
+profileDatasets = ['blockSize', 'workingSet', 'reusePMF', 'loadProp', 'activityMarkov', 'alphas', \
+    'maxReuseDistance', 'lruOrder', 'treeState']
+
+# regular expression matching an access of an STL trace
+stlRegEx = re.compile("(\d+): (read|write) 0x([0-9a-f]+)")
+
+# min count of a histogram bin in a chi-square test. Smaller bins are
+# pooled into one
+minBinCount = 10
+
+def RandomTrace(traceFile, numAccesses, numBlocks, blockSize = 512, seed = None):
+    """ RandomTrace: writes a random OVP trace with temporal locality (most
+        accesses reuse a recently used block), spatial locality within
+        blocks, loads & stores, and single inactive cycles as well as runs
+
+        args:
+            - traceFile: name of the trace to write
+            - numAccesses: number of accesses
+            - numBlocks: number of distinct blocks that may be accessed
+            - blockSize: size of each block (in bytes)
+            - seed: seed of the trace's random generator"""
+    random = np.random.RandomState(seed)
+    recent = []
+
+    with open(traceFile, 'w') as file:
+        for i in xrange(numAccesses):
+            # inactive cycles
+            idle = random.randint(4)
+            if idle == 1:
+                file.write("idle\n")
+            elif idle == 2:
+                file.write("i,%d\n" % random.randint(1, 20))
+
+            # reuse a recent block or pick any block
+            if recent and random.rand() < 0.8:
+                block = recent[min(random.geometric(0.3) - 1, len(recent) - 1)]
+                recent.remove(block)
+            else:
+                block = random.randint(numBlocks)
+                if block in recent:
+                    recent.remove(block)
+            recent.insert(0, block)
+
+            offset = (random.geometric(0.2) * 4) % blockSize
+            file.write("%s,0x%x\n" % ("rw"[random.rand() < 0.3], block * blockSize + offset))
+
+def CompareProfiles(first, second):
+    """ CompareProfiles: compares two profiles exactly
+
+        args:
+            - first: name of the first profile
+            - second: name of the second profile
+
+        return: list of the names of the datasets that differ"""
+    mismatches = []
+    with h5.File(first, 'r') as a, h5.File(second, 'r') as b:
+        for name in profileDatasets:
+            if (name in a) != (name in b):
+                mismatches.append(name)
+            elif name in a and not np.array_equal(a[name][()], b[name][()]):
+                mismatches.append(name)
+
+    return mismatches
+
+def ChiSquareSF(statistic, dof):
+    """ ChiSquareSF: survival function of the chi-square distribution (the
+        regularized upper incomplete gamma function Q(dof / 2, statistic / 2))
+
+        args:
+            - statistic: value of the chi-square statistic
+            - dof: degrees of freedom (>= 1)
+
+        return: probability of a value >= statistic"""
+    a = dof / 2.0
+    x = statistic / 2.0
+    if x <= 0:
+        return 1.0
+
+    logPrefix = a * math.log(x) - x - math.lgamma(a)
+
+    # series for the lower function
+    if x < a + 1:
+        term = 1.0 / a
+        total = term
+        n = a
+        while abs(term) > abs(total) * 1e-15:
+            n += 1
+            term *= x / n
+            total += term
+        return max(0.0, 1.0 - total * math.exp(logPrefix))
+
+    # continued fraction for the upper function (modified Lentz)
+    tiny = 1e-300
+    b = x + 1 - a
+    c = 1 / tiny
+    d = 1 / b
+    h = d
+    for i in xrange(1, 1000):
+        an = -i * (i - a)
+        b += 2
+        d = an * d + b
+        d = tiny if abs(d) < tiny else d
+        c = b + an / c
+        c = tiny if abs(c) < tiny else c
+        d = 1 / d
+        delta = d * c
+        h *= delta
+        if abs(delta - 1) < 1e-15:
+            break
+    return math.exp(logPrefix) * h
+
+def HomogeneityTest(first, second):
+    """ HomogeneityTest: chi-square test that two histograms are samples of
+        the same distribution. Bins with few counts are pooled
+
+        args:
+            - first: list of counts of the first sample
+            - second: list of counts of the second sample (same bins)
+
+        return: p-value of the test (1.0 if there is only one bin)"""
+    size = max(len(first), len(second))
+    counts = np.zeros((2, size), dtype = np.float)
+    counts[0, :len(first)] = first
+    counts[1, :len(second)] = second
+
+    # pool small bins
+    total = counts.sum(axis = 0)
+    small = total < minBinCount
+    counts = np.column_stack([counts[:, ~small], counts[:, small].sum(axis = 1)])
+    counts = counts[:, counts.sum(axis = 0) > 0]
+
+    if counts.shape[1] < 2 or not counts.sum(axis = 1).all():
+        return 1.0
+
+    expected = np.outer(counts.sum(axis = 1), counts.sum(axis = 0)) / counts.sum()
+    statistic = ((counts - expected)**2 / expected).sum()
+
+    return ChiSquareSF(statistic, counts.shape[1] - 1)
+
+def TraceStatistics(traceFile, blockSize):
+    """ TraceStatistics: histograms of the properties a generated STL trace
+        models
+
+        args:
+            - traceFile: name of the STL trace
+            - blockSize: block size of the profile it was generated from
+
+        return: dictionary of histograms: "reuse" (log2 reuse distance
+        buckets, 0 for first accesses), "type" (loads & stores), "spatial"
+        (level of the alpha tree at which the word differs from the previous
+        word accessed in the block, 0 for the same word) and "gap" (inactive
+        cycles between accesses, the last bin is for >= 15). Word offsets
+        themselves are not compared, as they are strongly correlated within
+        a trace"""
+    stack = LRUStack()
+    lastWord = {}
+    histograms = {'reuse': np.zeros(65), 'type': np.zeros(2), 'spatial': np.zeros(blockSize.bit_length()), \
+        'gap': np.zeros(16)}
+
+    previousCycle = -1
+    with open(traceFile) as file:
+        for line in file:
+            match = stlRegEx.search(line)
+            if not match:
+                continue
+
+            cycle = int(match.group(1))
+            memAddress = int(match.group(3), 16)
+
+            memBlock = memAddress & ~(blockSize - 1)
+            word = (memAddress & (blockSize - 1)) >> 2
+
+            reuseDist = stack.Access(memBlock)
+            histograms['reuse'][int(reuseDist + 1).bit_length()] += 1
+            histograms['type'][int(match.group(2) == "write")] += 1
+            if memBlock in lastWord:
+                histograms['spatial'][(word ^ lastWord[memBlock]).bit_length()] += 1
+            lastWord[memBlock] = word
+            histograms['gap'][min(cycle - previousCycle - 1, 15)] += 1
+            previousCycle = cycle
+
+    return histograms
+
+def CheckEngines(workDir, numTraces = 3, traceAccesses = 2000, numBlocks = 64, generateLength = 2000, \
+    seed = 0, significance = 0.001, blockSize = 512, reuseBins = 3):
+    """ CheckEngines: profiles random traces with the fast and reference
+        engines and generates traces from the profiles with both engines.
+        Every other trace is profiled with maxReuseDistance set, so the far
+        bin is checked as well
+
+        args:
+            - workDir: directory to write traces & profiles to
+            - numTraces: number of random traces
+            - traceAccesses: number of accesses in each random trace
+            - numBlocks: number of distinct blocks in each random trace
+            - generateLength: number of accesses in each generated trace
+            - seed: seed of the random traces & generators
+            - significance: p-value below which a goodness-of-fit test fails
+            - blockSize: block size of the profiles
+            - reuseBins: number of reuse bins of the profiles
+
+        return: dictionary with the results of every check and "passed"
+        (True if every check passed)"""
+    # imported here as the engines import the lib modules
+    from ApplicationProfiler import GenerateApplicationProfile
+    from TraceGenerator import GenerateSyntheticTrace
+    import TraceFormats
+
+    engines = ["fast", "reference"]
+    report = {'profiles': [], 'traces': [], 'fits': []}
+
+    for i in xrange(numTraces):
+        trace = os.path.join(workDir, "random%d.ovp" % i)
+        RandomTrace(trace, traceAccesses, numBlocks, blockSize, seed + i)
+        maxReuseDistance = numBlocks / 4 if i % 2 else 0
+
+        # profiles must be identical
+        profiles = {}
+        for engine in engines:
+            profiles[engine] = os.path.join(workDir, "random%d_%s" % (i, engine))
+            GenerateApplicationProfile(trace, profiles[engine], reuseBins, blockSize, parseProcesses = 0, \
+                maxReuseDistance = maxReuseDistance, engine = engine)
+        mismatches = CompareProfiles(profiles['fast'] + ".h5", profiles['reference'] + ".h5")
+        report['profiles'].append({'trace': trace, 'mismatches': mismatches})
+
+        # traces with the same seed must be identical, and traces with
+        # different seeds must have the same distributions
+        outputs = {}
+        for engine, offset in [("fast", 0), ("reference", 0), ("fast", 1), ("reference", 2)]:
+            output = os.path.join(workDir, "random%d_%s_%d.stl" % (i, engine, offset))
+            np.random.seed(seed + i + offset * 1000)
+            try:
+                GenerateSyntheticTrace(output, generateLength, [profiles['reference'] + ".h5"], [], \
+                    TraceFormats.STL, engine = engine)
+            except SystemExit: # working set used up
+                pass
+            outputs[(engine, offset)] = output
+
+        with open(outputs[("fast", 0)], 'rb') as a, open(outputs[("reference", 0)], 'rb') as b:
+            report['traces'].append({'trace': trace, 'identical': a.read() == b.read()})
+
+        fast = TraceStatistics(outputs[("fast", 1)], blockSize)
+        reference = TraceStatistics(outputs[("reference", 2)], blockSize)
+        pValues = dict((name, HomogeneityTest(fast[name], reference[name])) for name in fast)
+        report['fits'].append({'trace': trace, 'pValues': pValues})
+
+    report['passed'] = all(not result['mismatches'] for result in report['profiles']) and \
+        all(result['identical'] for result in report['traces']) and \
+        all(min(result['pValues'].values()) >= significance for result in report['fits'])
+
+    return report
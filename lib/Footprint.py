@@ -0,0 +1,136 @@
+""" filename: Footprint.py
+    contents: this file contains the routines used by "ApplicationProfiler"
+    to count the distinct blocks of a trace in a fast pre-pass, either
+    exactly or approximately with a HyperLogLog sketch, so its structures
+    can be sized up front and traces that would not fit in memory can be
+    rejected before the full run starts"""
+
+import numpy as np
+
+from TracePipeline import AccessBatches
+from TraceFormats import binIdle
+
+# approximate bytes used per block by the profiler, not counting the alpha
+# counts (AlphaTree object, array headers, list & dict entries)
+blockOverhead = 600
+
+class HyperLogLog:
+    """ class HyperLogLog: sketch estimating the number of distinct values
+        added to it in a fixed 2**precision bytes of registers. The relative
+        error is about 1.04 / sqrt(2**precision)"""
+
+    def __init__(self, precision = 14):
+        """ __init__: creates empty registers
+
+            args:
+                - precision: log2 of the number of registers (4 - 18).
+                Default is 14 (error about 0.8%)"""
+        if precision < 4 or precision > 18:
+            raise ValueError("(in HyperLogLog.__init__) precision must be 4 - 18")
+
+        self.precision = precision
+        self.registers = np.zeros(2**precision, dtype = np.uint8)
+
+    def Add(self, values):
+        """ Add: adds an array of values to the sketch
+
+            args:
+                - values: numpy array of integers"""
+        # splitmix64 finalizer
+        h = values.astype(np.uint64)
+        h ^= h >> np.uint64(30)
+        h *= np.uint64(0xbf58476d1ce4e5b9)
+        h ^= h >> np.uint64(27)
+        h *= np.uint64(0x94d049bb133111eb)
+        h ^= h >> np.uint64(31)
+
+        # top bits pick the register, the rank is 1 + the leading zeros of
+        # the low 32 bits
+        index = (h >> np.uint64(64 - self.precision)).astype(np.intp)
+        low = (h & np.uint64(0xffffffff)).astype(np.float64)
+
+        rank = np.full(len(low), 33, dtype = np.uint8)
+        nonzero = low > 0
+        rank[nonzero] = 32 - np.floor(np.log2(low[nonzero])).astype(np.uint8)
+
+        np.maximum.at(self.registers, index, rank)
+
+    def Estimate(self):
+        """ Estimate: returns the estimated number of distinct values"""
+        m = float(len(self.registers))
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.sum(2.0 ** -self.registers.astype(np.float64))
+
+        # linear counting for small cardinalities
+        zeros = np.count_nonzero(self.registers == 0)
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * np.log(m / zeros)
+
+        return int(round(estimate))
+
+class ExactCount:
+    """ class ExactCount: exact count of the distinct values added to it.
+        Uses memory proportional to the number of distinct values"""
+
+    def __init__(self):
+        """ __init__: creates an empty set of values"""
+        self.values = set()
+
+    def Add(self, values):
+        """ Add: adds an array of values to the set
+
+            args:
+                - values: numpy array of integers"""
+        self.values.update(np.unique(values).tolist())
+
+    def Estimate(self):
+        """ Estimate: returns the number of distinct values"""
+        return len(self.values)
+
+def CountBlocks(traceFile, blockMask, method = "hll", precision = 14, readSize = 2**20, queueDepth = 8, \
+    parseProcesses = 1):
+    """ CountBlocks: counts the distinct blocks accessed in a trace
+
+        args:
+            - traceFile: name of the trace to read (OVP format)
+            - blockMask: mask that pulls the block address from an address
+            - method: "hll" to estimate with a HyperLogLog sketch, or "exact".
+            Default is "hll"
+            - precision: precision of the HyperLogLog sketch
+            - readSize, queueDepth, parseProcesses: see
+            TracePipeline.AccessBatches
+
+        return: number of distinct blocks (estimated for "hll")"""
+    if method == "hll":
+        counter = HyperLogLog(precision)
+    elif method == "exact":
+        counter = ExactCount()
+    else:
+        raise ValueError("(in CountBlocks) method must be hll or exact")
+
+    # mask as an unsigned 64-bit value, like the parsed addresses
+    blockMask = np.uint64(blockMask % 2**64)
+
+    for memAddresses, accessTypes in AccessBatches(traceFile, readSize, queueDepth, parseProcesses):
+        memAddresses = memAddresses[accessTypes != binIdle]
+        if len(memAddresses):
+            counter.Add(memAddresses & blockMask)
+
+    return counter.Estimate()
+
+def ProfileMemory(numBlocks, blockSize, alphaBins):
+    """ ProfileMemory: estimates the memory the profiler needs for a trace
+
+        args:
+            - numBlocks: number of distinct blocks in the trace
+            - blockSize: size of the largest cache block modeled
+            - alphaBins: number of alpha bins of each block
+
+        return: approximate number of bytes"""
+    height = int(np.log2(blockSize / 4))
+
+    # alpha counts are held by each AlphaTree and again when saved, and
+    # each tree also has one flag per node
+    perBlock = 2 * alphaBins * height * 2 * 8 + blockSize / 2 + blockOverhead
+
+    return numBlocks * perBlock
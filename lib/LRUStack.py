@@ -0,0 +1,52 @@
+""" filename: LRUStack
+    contents: This file contains the LRUStack class, the least-recently used
+    stack used to measure reuse distances of memory blocks by the profiler
+    and the miss ratio evaluator"""
+
+class LRUStack:
+    """ class LRUStack: ordered list of all blocks accessed, most recently
+        used first. The position of a block in the stack when it is accessed
+        is its reuse distance. If the depth is capped, blocks pushed past the
+        cap are dropped, so lookups and memory are bounded by the cap"""
+
+    def __init__(self, maxDepth = 0):
+        """ __init__: creates an empty stack
+
+            args:
+                - maxDepth: max number of blocks kept in the stack. 0 keeps
+                every block. Default is 0"""
+        if maxDepth < 0:
+            raise ValueError("(in LRUStack.__init__) maxDepth must be >= 0")
+
+        self.stack = []
+        self.maxDepth = maxDepth
+
+    def __len__(self):
+        """ __len__: returns the number of blocks in the stack (the number
+            of distinct blocks accessed if the depth is not capped)"""
+        return len(self.stack)
+
+    def Access(self, block):
+        """ Access: looks up the reuse distance of the input block and moves
+            it to the top of the stack
+
+            args:
+                - block: block address that was accessed
+
+            return: reuse distance of the access, or -1 if the block is not
+            in the stack (not previously accessed, or dropped past the cap)"""
+        stack = self.stack
+
+        try:
+            reuseDist = stack.index(block)
+        except ValueError:
+            stack.insert(0, block)
+            if self.maxDepth and len(stack) > self.maxDepth:
+                stack.pop()
+            return -1
+
+        # move block to top of the stack
+        del stack[reuseDist]
+        stack.insert(0, block)
+
+        return reuseDist
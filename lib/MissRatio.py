@@ -0,0 +1,131 @@
+""" filename: MissRatio
+    contents: this file contains the routines used by "MissRatioEvaluator"
+    to compute LRU miss ratio curves for many cache and block sizes in a
+    single pass over a trace, and to compare the curves of a real and a
+    synthetic trace"""
+
+import numpy as np
+import re
+
+from LRUStack import LRUStack
+from TraceFormats import binRecord, binIdle
+
+# regular expressions matching the accesses of each text trace format.
+# group 2 of each holds the hex address
+formatRegEx = {"OVP": "(\D),0x([0-9a-f]+)", \
+    "Din": "^(\d) 0x([0-9a-f]+)", \
+    "STL": "(read|write) 0x([0-9a-f]+)"}
+
+def ReadAddresses(traceFile, traceFormat = "OVP"):
+    """ ReadAddresses: iterates over the memory addresses in a trace. Lines
+        that are not accesses (e.g. inactive cycles) are skipped
+
+        args:
+            - traceFile: name of the trace to read
+            - traceFormat: name of the format the trace is in ("OVP", "Din",
+            "STL" or "Bin"). Default is "OVP"
+    """
+    if traceFormat == "Bin":
+        with open(traceFile, 'rb') as file:
+            while True:
+                record = file.read(binRecord.size)
+                if len(record) < binRecord.size:
+                    return
+                cycle, accessType, memAddress = binRecord.unpack(record)
+                if accessType != binIdle:
+                    yield memAddress
+
+    if traceFormat not in formatRegEx:
+        raise ValueError("(in ReadAddresses) unknown trace format: %s" % traceFormat)
+
+    regEx = re.compile(formatRegEx[traceFormat])
+    with open(traceFile) as file:
+        for line in file:
+            match = regEx.search(line)
+            if match:
+                yield int(match.group(2), 16)
+
+class MissRatioCurves:
+    """ class MissRatioCurves: collects the reuse distance histogram of a
+        stream of accesses for several block sizes at once, from which the
+        miss ratio of a fully-associative LRU cache of any size can be
+        computed"""
+
+    def __init__(self, blockSizes):
+        """ __init__: creates one LRU stack & histogram per block size
+
+            args:
+                - blockSizes: list of block sizes (in bytes) to model. Each
+                must be a power of 2 >= 4"""
+        for blockSize in blockSizes:
+            if blockSize < 4 or blockSize & (blockSize - 1):
+                raise ValueError("(in MissRatioCurves.__init__) blockSizes must be powers of 2 >= 4")
+
+        self.blockSizes = list(blockSizes)
+        self.shifts = [int(blockSize).bit_length() - 1 for blockSize in blockSizes]
+        self.stacks = [LRUStack() for blockSize in blockSizes]
+
+        # reuse distance counts & compulsory misses for each block size
+        self.reuseCount = [[] for blockSize in blockSizes]
+        self.coldMisses = [0] * len(blockSizes)
+        self.accesses = 0
+
+    def Access(self, memAddress):
+        """ Access: records the reuse distance of an access for every block
+            size
+
+            args:
+                - memAddress: address of the access"""
+        self.accesses += 1
+
+        for i in xrange(len(self.stacks)):
+            reuseDist = self.stacks[i].Access(memAddress >> self.shifts[i])
+
+            if reuseDist < 0:
+                self.coldMisses[i] += 1
+                self.reuseCount[i].append(0)
+                continue
+
+            self.reuseCount[i][reuseDist] += 1
+
+    def MissRatios(self, cacheSizes):
+        """ MissRatios: computes the miss ratio of a fully-associative LRU
+            cache for each block size and cache size. An access misses in a
+            cache of N blocks if its reuse distance is >= N
+
+            args:
+                - cacheSizes: list of cache sizes (in bytes)
+
+            return: len(blockSizes) x len(cacheSizes) matrix of miss ratios"""
+        missRatios = np.ones((len(self.blockSizes), len(cacheSizes)), dtype = np.float)
+        if not self.accesses:
+            return missRatios
+
+        for i in xrange(len(self.blockSizes)):
+            # number of accesses with reuse distance >= N
+            counts = np.asarray(self.reuseCount[i], dtype = np.float)
+            farther = np.append(np.cumsum(counts[::-1])[::-1], 0)
+
+            for j in xrange(len(cacheSizes)):
+                numBlocks = min(cacheSizes[j] / self.blockSizes[i], len(counts))
+                missRatios[i, j] = (self.coldMisses[i] + farther[numBlocks]) / float(self.accesses)
+
+        return missRatios
+
+def TraceMissRatios(traceFile, traceFormat, blockSizes, cacheSizes):
+    """ TraceMissRatios: computes the miss ratio curves of a trace in a
+        single pass
+
+        args:
+            - traceFile: name of the trace to read
+            - traceFormat: name of the format the trace is in
+            - blockSizes: list of block sizes (in bytes)
+            - cacheSizes: list of cache sizes (in bytes)
+
+        return: len(blockSizes) x len(cacheSizes) matrix of miss ratios"""
+    curves = MissRatioCurves(blockSizes)
+
+    for memAddress in ReadAddresses(traceFile, traceFormat):
+        curves.Access(memAddress)
+
+    return curves.MissRatios(cacheSizes)
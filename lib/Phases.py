@@ -0,0 +1,239 @@
+""" filename: Phases.py
+    contents: this file contains the PhaseTracker class, used by
+    "ApplicationProfiler" to split a trace into windows and save one
+    sub-profile per phase in a single pass, along with an index of the
+    phase sequence that "TraceGenerator" replays"""
+
+import numpy as np
+import json
+import os
+
+from ProfileWriter import SaveProfile
+
+# number of log2 reuse distance buckets in a window's signature
+signatureBuckets = 64
+
+class PhaseCounts:
+    """ class PhaseCounts: counts collected over a window or phase. Reuse
+        and load counts are kept sparse, and alpha counts are kept as each
+        touched block's counts before its first access in the window, so
+        the cost is proportional to the accesses, not the working set"""
+
+    def __init__(self):
+        """ __init__: creates empty counts"""
+        self.reuseCount = {}
+        self.loadCount = {}
+        self.activityCount = np.zeros((2, 2), dtype = np.float)
+
+        # alpha counts of each touched block before its first access
+        self.alphaStart = {}
+
+        self.signature = np.zeros(signatureBuckets, dtype = np.float)
+        self.accesses = 0
+        self.cycles = 0
+
+        # number of blocks in the working set at the end of the counts
+        self.wsSize = 0
+
+    def Merge(self, other):
+        """ Merge: adds the counts of the following window to these
+
+            args:
+                - other: PhaseCounts of the window"""
+        for index, count in other.reuseCount.iteritems():
+            self.reuseCount[index] = self.reuseCount.get(index, 0) + count
+
+        for index, count in other.loadCount.iteritems():
+            self.loadCount[index] = self.loadCount.get(index, 0) + count
+
+        for blockIndex, counts in other.alphaStart.iteritems():
+            self.alphaStart.setdefault(blockIndex, counts)
+
+        self.activityCount += other.activityCount
+        self.signature += other.signature
+        self.accesses += other.accesses
+        self.cycles += other.cycles
+        self.wsSize = other.wsSize
+
+class PhaseTracker:
+    """ class PhaseTracker: tracks fixed-size windows of accesses during
+        profiling. With "fixed" detection every window is a phase. With
+        "auto" detection consecutive windows are merged into one phase
+        until a window's reuse distance signature differs from the phase's
+        by more than a threshold. Phase profiles hold only the counts
+        collected during the phase"""
+
+    def __init__(self, outputFile, windowSize, detection = "fixed", threshold = 0.2, maxReuseDistance = 0):
+        """ __init__: initializes window counters
+
+            args:
+                - outputFile: base name of the profile. Phase profiles are
+                saved as <outputFile>_phase<i>.h5 and the index as
+                <outputFile>_phases.json
+                - windowSize: number of accesses per window
+                - detection: "fixed" or "auto". Default is "fixed"
+                - threshold: L1 distance (0 - 2) between normalized window
+                and phase signatures that starts a new phase in "auto" mode.
+                Default is 0.2
+                - maxReuseDistance: cap on the reuse distances measured by
+                the profiler (0 if none)"""
+        # validate inputs
+        if windowSize < 1:
+            raise ValueError("(in PhaseTracker.__init__) windowSize must be >= 1")
+
+        if detection not in ("fixed", "auto"):
+            raise ValueError("(in PhaseTracker.__init__) detection must be fixed or auto")
+
+        self.outputFile = outputFile
+        self.windowSize = windowSize
+        self.detection = detection
+        self.threshold = threshold
+        self.maxReuseDistance = maxReuseDistance
+
+        # counts of the current window and of the finished windows of the
+        # current phase (auto mode)
+        self.window = PhaseCounts()
+        self.phase = None
+
+        # saved phases
+        self.phases = []
+
+    def Cycle(self, previousCycle, active, count = 1):
+        """ Cycle: records one cycle of the trace, or a run of inactive
+            cycles
+
+            args:
+                - previousCycle: 1 if the previous cycle was active, else 0
+                - active: 1 if this cycle is active, else 0
+                - count: number of consecutive inactive cycles. Default is 1"""
+        self.window.activityCount[previousCycle, active] += 1
+        self.window.activityCount[0, 0] += count - 1
+        self.window.cycles += count
+
+    def Access(self, reuseDist, accessType):
+        """ Access: records one access of the trace
+
+            args:
+                - reuseDist: reuse distance of the access (-1 if the block
+                was not previously accessed)
+                - accessType: 0 for load, 1 for store
+
+            return: True if the window is full"""
+        window = self.window
+        index = reuseDist + 1
+
+        window.reuseCount[index] = window.reuseCount.get(index, 0) + 1
+        if not accessType:
+            window.loadCount[index] = window.loadCount.get(index, 0) + 1
+
+        window.signature[int(index).bit_length()] += 1
+        window.accesses += 1
+
+        return window.accesses >= self.windowSize
+
+    def Touch(self, blockIndex, tree):
+        """ Touch: records the alpha counts of a block before the profiler
+            updates its AlphaTree
+
+            args:
+                - blockIndex: index of the block's tree in the forest
+                - tree: the block's AlphaTree"""
+        if blockIndex not in self.window.alphaStart:
+            self.window.alphaStart[blockIndex] = tree.reuseCount.copy()
+
+    def EndWindow(self, blockSize, workingSet, alphaForest):
+        """ EndWindow: called by the profiler when a window is full. Saves a
+            phase if one ended at this boundary
+
+            args:
+                - blockSize: size of the largest cache block modeled
+                - workingSet: the profiler's working set
+                - alphaForest: the profiler's list of AlphaTrees"""
+        window = self.window
+        window.wsSize = len(workingSet)
+
+        if self.detection == "fixed":
+            self.SavePhase(window, blockSize, workingSet, alphaForest)
+
+        elif self.phase is None:
+            self.phase = window
+
+        else:
+            # normalized signatures of this window & the phase
+            current = window.signature / max(window.signature.sum(), 1)
+            phase = self.phase.signature / max(self.phase.signature.sum(), 1)
+
+            # new phase started at the last boundary. The trees of blocks
+            # touched in this window are restored to their counts then
+            if np.abs(current - phase).sum() > self.threshold:
+                self.SavePhase(self.phase, blockSize, workingSet, alphaForest, window.alphaStart)
+                self.phase = window
+            else:
+                self.phase.Merge(window)
+
+        # start next window
+        self.window = PhaseCounts()
+
+    def Finish(self, blockSize, workingSet, alphaForest):
+        """ Finish: saves the last phase (including any partial window) and
+            the phase index
+
+            args: final state of the profiler (see EndWindow)"""
+        window = self.window
+        window.wsSize = len(workingSet)
+
+        if self.phase is not None:
+            self.phase.Merge(window)
+            window = self.phase
+
+        if window.accesses or not self.phases:
+            self.SavePhase(window, blockSize, workingSet, alphaForest)
+
+        # save index of the phase sequence
+        index = {'blockSize': blockSize, 'phases': self.phases}
+        with open(self.outputFile + "_phases.json", 'w') as file:
+            json.dump(index, file, indent = 2)
+
+    def SavePhase(self, counts, blockSize, workingSet, alphaForest, alphaEnd = {}):
+        """ SavePhase: saves the counts of one phase as a profile. The
+            phase's working set is every block accessed up to the end of the
+            phase, so all of its reuse distances are valid
+
+            args:
+                - counts: PhaseCounts of the phase
+                - blockSize: size of the largest cache block modeled
+                - workingSet: the profiler's working set
+                - alphaForest: the profiler's list of AlphaTrees
+                - alphaEnd: alpha counts at the end of the phase of blocks
+                whose trees have been updated since. Other blocks use their
+                current counts"""
+        wsSize = counts.wsSize
+
+        # capped profiles end at the far bin
+        numReuseDistances = wsSize + 1
+        if self.maxReuseDistance:
+            numReuseDistances = min(numReuseDistances, self.maxReuseDistance + 2)
+
+        reuseCount = np.zeros(numReuseDistances, dtype = np.float)
+        for index, count in counts.reuseCount.iteritems():
+            reuseCount[index] = count
+
+        loadCount = np.zeros(numReuseDistances, dtype = np.float)
+        for index, count in counts.loadCount.iteritems():
+            loadCount[index] = count
+
+        # only blocks touched in the phase have alpha counts
+        treeShape = alphaForest[0].reuseCount.shape if len(alphaForest) else (0, 0, 2)
+        alphaCounts = np.zeros((wsSize,) + treeShape, dtype = np.float)
+        for blockIndex, start in counts.alphaStart.iteritems():
+            end = alphaEnd.get(blockIndex)
+            if end is None:
+                end = alphaForest[blockIndex].reuseCount
+            alphaCounts[blockIndex] = end - start
+
+        name = "%s_phase%d" % (self.outputFile, len(self.phases))
+        SaveProfile(name, blockSize, workingSet[:wsSize], reuseCount, loadCount, \
+            counts.activityCount, alphaCounts, self.maxReuseDistance)
+
+        self.phases.append({'profile': os.path.basename(name) + ".h5", \
+            'accesses': counts.accesses, 'cycles': counts.cycles})
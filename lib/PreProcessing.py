@@ -6,40 +6,110 @@
     date: 3.5.16"""
 
 import numpy as np
+from multiprocessing.pool import ThreadPool
+from multiprocessing.sharedctypes import RawArray
+import h5py as h5
 from AlphaTree import AlphaTree
 
-def BuildAlphaForest(appProfiles, weights, alphaForest, wsSize, blockSize):
-    """ BuildAlphaForest: combines all alpha values for the input application
-        profiles and builds the alphaForest accordingly
+def MixAlphas(appProfiles, weights, wsSize, memoryBudget = 64 * 2**20, numThreads = 1):
+    """ MixAlphas: creates the linear combination of all profiles alpha values
+        by walking the working set in fixed-size chunks and reading the
+        matching rows (hyperslab) from every profile. Each chunk is read into
+        a reusable buffer and accumulated in place, so no full-size copies of
+        any profile's alphas are made
         
         args:
-            - appProfiles: list of open file handles for each application profile
+            - appProfiles: list of open file handles for each application
+            profile, or of profiles loaded with LoadProfile
             - weights: python list specifying the weights of each profile
-            - alphaForest: list to store alphaTrees in
-            - wsSize: max number of cache blocks accessed by any"""
+            - wsSize: number of cache blocks in the mixed working set
+            - memoryBudget: max number of bytes of chunk buffers in flight at
+            once (in addition to the output matrix). Default is 64MB
+            - numThreads: number of threads to spread the chunks over.
+            Default is 1
+            
+        return: wsSize x reuseBins x treeHeight x 2 matrix of mixed alpha values"""
+    # validate inputs
+    if memoryBudget <= 0:
+        raise ValueError("(in MixAlphas) memoryBudget must be > 0")
+        
+    if numThreads < 1:
+        raise ValueError("(in MixAlphas) numThreads must be >= 1")
+    
     # get number of profiles
     numProfiles = len(appProfiles)
     
-    # get shape of first alpha matrix
-    alphaShape = np.asarray(appProfiles[0]['alphas']).shape
+    # get handles & shape of first alpha matrix
+    alphas = [appProfiles[i]['alphas'] for i in xrange(numProfiles)]
+    alphaShape = alphas[0].shape
+    for i in xrange(1, numProfiles):
+        if alphas[i].shape[1:] != alphaShape[1:]:
+            raise ValueError("(in MixAlphas) all profiles must have the same reuseBins and blockSize")
     
     # matrix to store alpha values
-    alphaValues = np.zeros((wsSize, alphaShape[1], alphaShape[2], 2), dtype = np.float)
-
-    # create linear combination of all profiles alpha values
-    for i in xrange(numProfiles):
-        temp = np.asarray(appProfiles[i]['alphas'])
+    alphaValues = np.zeros((wsSize,) + alphaShape[1:], dtype = np.float)
+    if not wsSize:
+        return alphaValues
+    
+    # size chunks so all threads' buffers fit in the budget
+    rowBytes = alphaValues[0].nbytes
+    chunkRows = max(1, memoryBudget / (rowBytes * numThreads))
+    chunkRows = min(chunkRows, wsSize)
+    
+    def MixChunk(start):
+        # buffer reused for every profile in this chunk
+        buffer = np.empty((chunkRows,) + alphaShape[1:], dtype = np.float)
         
-        # resize alpha matrix
-        temp.resize(alphaValues.shape)
+        for i in xrange(numProfiles):
+            # clip to the rows this profile has
+            stop = min(start + chunkRows, alphas[i].shape[0])
+            if stop <= start:
+                continue
+            rows = stop - start
             
-        # add to sum
-        alphaValues += temp * weights[i]    
+            # read hyperslab (or copy rows of a loaded profile) and
+            # accumulate weighted values in place
+            if isinstance(alphas[i], np.ndarray):
+                buffer[:rows] = alphas[i][start:stop]
+            else:
+                alphas[i].read_direct(buffer, np.s_[start:stop], np.s_[0:rows])
+            buffer[:rows] *= weights[i]
+            alphaValues[start:stop] += buffer[:rows]
+    
+    chunks = xrange(0, wsSize, chunkRows)
+    if numThreads == 1:
+        for start in chunks:
+            MixChunk(start)
+    else:
+        pool = ThreadPool(numThreads)
+        try:
+            pool.map(MixChunk, chunks)
+        finally:
+            pool.close()
+            pool.join()
+    
+    return alphaValues
+
+def BuildAlphaForest(appProfiles, weights, alphaForest, wsSize, blockSize, memoryBudget = 64 * 2**20, numThreads = 1):
+    """ BuildAlphaForest: combines all alpha values for the input application
+        profiles and builds the alphaForest accordingly
+        
+        args:
+            - appProfiles: list of open file handles for each application profile
+            - weights: python list specifying the weights of each profile
+            - alphaForest: list to store alphaTrees in
+            - wsSize: max number of cache blocks accessed by any
+            - memoryBudget: max bytes of chunk buffers used while mixing
+            (see MixAlphas). Default is 64MB
+            - numThreads: number of threads used while mixing. Default is 1"""
+    # create linear combination of all profiles alpha values
+    alphaValues = MixAlphas(appProfiles, weights, wsSize, memoryBudget, numThreads)
+    bins = alphaValues.shape[1]
         
     # for each cache block
     for i in xrange(wsSize):        
         # create an AlphaTree
-        alphaForest.append(AlphaTree(blockSize, alphaShape[1]))
+        alphaForest.append(AlphaTree(blockSize, bins))
         
         # load alpha values
         alphaForest[i].LoadAlphas(alphaValues[i])
@@ -80,7 +150,7 @@ def BuildReusePMF(appProfiles, weights, reusePMF):
     # for each profile
     for i in xrange(numProfiles):
         # weighted sum of reusePMFs
-        temp = np.asarray(appProfiles[i]['reusePMF'])
+        temp = np.array(appProfiles[i]['reusePMF'])
         temp.resize(numReuseDistances)
         reusePMF += temp * weights[i]
         
@@ -101,7 +171,7 @@ def BuildLoadProp(appProfiles, weights, loadProp):
     # for each profile
     for i in xrange(numProfiles):        
         # weights sume of load proportions
-        temp = np.asarray(appProfiles[i]['loadProp'])
+        temp = np.array(appProfiles[i]['loadProp'])
         temp.resize(numReuseDistances)
         loadProp += temp * weights[i]
     
@@ -125,3 +195,164 @@ def BuildWorkingSet(appProfiles):
             ws = i
     
     return np.asarray(appProfiles[ws]['workingSet'])
+
+def GetMaxReuseDistance(appProfiles):
+    """ GetMaxReuseDistance: finds the cap on reuse distances that the input
+        profiles were made with. Profiles with different caps cannot be
+        mixed, as the far bin of one overlaps the exact bins of another
+        
+        args:
+            - appProfiles: list of open file handles for each application profile
+            
+        return: the cap, or 0 if the profiles were not capped"""
+    caps = set()
+    for profile in appProfiles:
+        if 'maxReuseDistance' in profile:
+            caps.add(int(profile['maxReuseDistance'][()]))
+        else:
+            caps.add(0)
+    
+    if len(caps) > 1:
+        raise ValueError("(in GetMaxReuseDistance) all profiles must have the same maxReuseDistance")
+    
+    return caps.pop()
+
+def GetReuseBounds(appProfiles):
+    """ GetReuseBounds: finds the bounds of the reuse distances of each
+        reusePMF entry of log-binned profiles (see ProfileWriter.LogBinCounts).
+        Profiles binned the same way differ only in where their last bucket
+        ends, so the longest bounds are used
+        
+        args:
+            - appProfiles: list of open file handles for each application profile
+            
+        return: numpy array of the bounds, or None if the profiles were not
+        binned"""
+    bounds = [np.asarray(profile['reuseBounds']) if 'reuseBounds' in profile else None for profile in appProfiles]
+    if all(reuseBounds is None for reuseBounds in bounds):
+        return None
+    
+    if any(reuseBounds is None for reuseBounds in bounds):
+        raise ValueError("(in GetReuseBounds) binned and unbinned profiles cannot be mixed")
+    
+    longest = max(bounds, key = len)
+    for reuseBounds in bounds:
+        if not np.array_equal(reuseBounds[:-1], longest[:len(reuseBounds) - 1]):
+            raise ValueError("(in GetReuseBounds) all profiles must be binned with the same exactReuseDistances")
+    
+    return longest
+
+def GetWarmState(appProfiles):
+    """ GetWarmState: reads the LRU stack & AlphaTree state saved at the end
+        of the profiled trace, from the profile whose working set is used
+        (see BuildWorkingSet)
+        
+        args:
+            - appProfiles: list of open file handles for each application profile
+            
+        return: tuple of (lruOrder, treeState): the ids of every block of the
+        working set, most recently used first (blocks deeper than the saved
+        stack follow in order of first access), and the packed tree flags of
+        each block (see ProfileWriter.PackTreeState)"""
+    wsSize = len(BuildWorkingSet(appProfiles))
+    for profile in reversed(appProfiles):
+        if len(profile['workingSet']) == wsSize:
+            break
+    
+    if 'lruOrder' not in profile or 'treeState' not in profile:
+        raise ValueError("(in GetWarmState) the profile has no warm state, profile the trace again to save one")
+    
+    lruOrder = np.asarray(profile['lruOrder'], dtype = np.int64)
+    deeper = np.ones(wsSize, dtype = np.bool)
+    deeper[lruOrder] = False
+    
+    return np.append(lruOrder, np.flatnonzero(deeper)), np.asarray(profile['treeState'])
+
+def LoadProfile(fileName):
+    """ LoadProfile: reads every dataset of an application profile into 
+        shared memory. The result can be passed to GenerateSyntheticTrace in
+        place of the profile's name, and is shared (not copied) with worker
+        processes forked after it is loaded
+        
+        args:
+            - fileName: name of the application profile to load
+            
+        return: dictionary mapping dataset names to numpy arrays"""
+    profile = {}
+    
+    with h5.File(fileName, 'r') as file:
+        for name in file:
+            data = np.asarray(file[name])
+            
+            # copy dataset into a shared buffer
+            buffer = RawArray('b', max(1, data.nbytes))
+            shared = np.frombuffer(buffer, dtype = data.dtype, count = data.size)
+            shared = shared.reshape(data.shape)
+            shared[...] = data
+            
+            profile[name] = shared
+            
+    return profile
+
+def BuildMixture(appProfiles, weights = [], memoryBudget = 64 * 2**20, numThreads = 1):
+    """ BuildMixture: mixes application profiles into a single in-memory 
+        profile. The result can be passed to GenerateSyntheticTrace in place
+        of the profiles (with no weights), which then skips reading and
+        mixing them
+        
+        args:
+            - appProfiles: list of open file handles for each application
+            profile, or of profiles loaded with LoadProfile
+            - weights: python list specifying the weights of each profile.
+            Defaults to evenly weighted profiles
+            - memoryBudget: max bytes of chunk buffers used while mixing
+            alphas (see MixAlphas). Default is 64MB
+            - numThreads: number of threads used while mixing alphas
+            
+        return: dictionary mapping dataset names to numpy arrays"""
+    numProfiles = len(appProfiles)
+    if not numProfiles:
+        raise ValueError("(in BuildMixture) must input >= 1 app profile")
+    
+    if len(weights) == 0:
+        weights = np.ones(numProfiles)
+    
+    if len(weights) != numProfiles:
+        raise ValueError("(in BuildMixture) len(weights) must be 0 or len(appProfiles)")
+    
+    # all blocksizes must be the same
+    blockSize = int(appProfiles[0]['blockSize'][()])
+    for i in xrange(1, numProfiles):
+        if int(appProfiles[i]['blockSize'][()]) != blockSize:
+            raise ValueError("(in BuildMixture) all profiles must have the same blockSize")
+    
+    numReuseDistances = max(len(appProfiles[i]['reusePMF']) for i in xrange(numProfiles))
+    
+    mixture = {'blockSize': np.asarray(blockSize, dtype = np.int)}
+    mixture['activityMarkov'] = np.zeros((2, 2), dtype = np.float)
+    BuildMarkovModel(appProfiles, weights, mixture['activityMarkov'])
+    
+    mixture['reusePMF'] = np.zeros(numReuseDistances, dtype = np.float)
+    BuildReusePMF(appProfiles, weights, mixture['reusePMF'])
+    
+    mixture['loadProp'] = np.zeros(numReuseDistances, dtype = np.float)
+    BuildLoadProp(appProfiles, weights, mixture['loadProp'])
+    
+    mixture['workingSet'] = np.array(BuildWorkingSet(appProfiles))
+    mixture['alphas'] = MixAlphas(appProfiles, weights, len(mixture['workingSet']), memoryBudget, numThreads)
+    
+    maxReuseDistance = GetMaxReuseDistance(appProfiles)
+    if maxReuseDistance:
+        mixture['maxReuseDistance'] = np.asarray(maxReuseDistance, dtype = np.int)
+    
+    reuseBounds = GetReuseBounds(appProfiles)
+    if reuseBounds is not None:
+        mixture['reuseBounds'] = reuseBounds
+    
+    # warm state of the profile whose working set is used
+    try:
+        mixture['lruOrder'], mixture['treeState'] = GetWarmState(appProfiles)
+    except ValueError:
+        pass
+    
+    return mixture
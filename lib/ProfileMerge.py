@@ -0,0 +1,147 @@
+""" filename: ProfileMerge.py
+    contents: this file contains the routines used by "ProfileMerger" to
+    combine the raw counts of independently profiled trace shards (e.g. one
+    trace per thread) into a single profile. Counts are summed, so the
+    result is the same as profiling the shards as one trace whose streams
+    do not interfere with each other's reuse distances"""
+
+import multiprocessing
+import numpy as np
+
+from ProfileWriter import LoadCounts, SaveCounts, SaveProfile
+
+def AddPadded(first, second):
+    """ AddPadded: adds two 1-D count arrays of possibly different lengths
+
+        return: sum of the arrays, as long as the longer one"""
+    if len(first) < len(second):
+        first, second = second, first
+
+    result = np.array(first, dtype = np.float)
+    result[:len(second)] += second
+    return result
+
+def MergeCounts(first, second):
+    """ MergeCounts: sums the counts of two shards. Blocks are matched by
+        address: the merged working set is the blocks of the first shard
+        followed by the new blocks of the second, and the alpha counts of
+        blocks in both are summed. A block first touched in both shards is
+        counted as a compulsory miss in each. The end state (LRU stack &
+        AlphaTree flags) is that of the second shard on top of the first,
+        and is only kept if both shards have one
+
+        args:
+            - first: counts of the first shard (see LoadCounts), or the
+            name of its counts file
+            - second: counts of the second shard, or the name of its file
+
+        return: dictionary of the merged counts"""
+    if isinstance(first, basestring):
+        first = LoadCounts(first)
+    if isinstance(second, basestring):
+        second = LoadCounts(second)
+
+    # validate inputs
+    if first['blockSize'] != second['blockSize']:
+        raise ValueError("(in MergeCounts) all shards must have the same blockSize")
+
+    if first['maxReuseDistance'] != second['maxReuseDistance']:
+        raise ValueError("(in MergeCounts) all shards must have the same maxReuseDistance")
+
+    if first['alphaCounts'].shape[1:] != second['alphaCounts'].shape[1:]:
+        raise ValueError("(in MergeCounts) all shards must have the same reuseBins")
+
+    # union of the working sets in first-shard order
+    workingSet = first['workingSet'].tolist()
+    blockIndices = dict((workingSet[i], i) for i in xrange(len(workingSet)))
+    for block in second['workingSet'].tolist():
+        if block not in blockIndices:
+            blockIndices[block] = len(workingSet)
+            workingSet.append(block)
+
+    alphaCounts = np.zeros((len(workingSet),) + first['alphaCounts'].shape[1:], dtype = np.float)
+    alphaCounts[:len(first['alphaCounts'])] = first['alphaCounts']
+    indices = [blockIndices[block] for block in second['workingSet'].tolist()]
+    alphaCounts[indices] += second['alphaCounts']
+
+    # blocks of the second shard were used last, and their trees were last
+    # updated by it
+    lruOrder = None
+    treeState = None
+    if first.get('lruOrder') is not None and second.get('lruOrder') is not None:
+        secondBlocks = set(indices)
+        lruOrder = [indices[i] for i in second['lruOrder'].tolist()] + \
+            [i for i in first['lruOrder'].tolist() if i not in secondBlocks]
+        if first['maxReuseDistance']:
+            del lruOrder[first['maxReuseDistance']:]
+        lruOrder = np.asarray(lruOrder, dtype = np.int64)
+
+        treeState = np.zeros((len(workingSet),) + first['treeState'].shape[1:], dtype = np.uint8)
+        treeState[:len(first['treeState'])] = first['treeState']
+        treeState[indices] = second['treeState']
+
+    return {'blockSize': first['blockSize'], 'maxReuseDistance': first['maxReuseDistance'], \
+        'workingSet': np.asarray(workingSet, dtype = np.uint64), \
+        'reuseCount': AddPadded(first['reuseCount'], second['reuseCount']), \
+        'loadCount': AddPadded(first['loadCount'], second['loadCount']), \
+        'activityCount': first['activityCount'] + second['activityCount'], \
+        'alphaCounts': alphaCounts, 'lruOrder': lruOrder, 'treeState': treeState}
+
+def MergePair(pair):
+    """ MergePair: pool worker. Merges a pair of shards, or loads a single
+        shard left over at the end of a level
+
+        args:
+            - pair: tuple of one or two shards (counts or file names)"""
+    if len(pair) == 1:
+        return pair[0] if not isinstance(pair[0], basestring) else LoadCounts(pair[0])
+    return MergeCounts(pair[0], pair[1])
+
+def MergeShards(countFiles, numProcesses = None):
+    """ MergeShards: merges the counts of many shards with a tree reduction.
+        Each level merges pairs of shards in a pool of worker processes, so
+        N shards are merged in log2(N) levels
+
+        args:
+            - countFiles: list of the names of the shards' counts files
+            - numProcesses: number of worker processes. Default is the number
+            of cpus
+
+        return: dictionary of the merged counts (see LoadCounts)"""
+    if not len(countFiles):
+        raise ValueError("(in MergeShards) must input >= 1 counts file")
+
+    shards = list(countFiles)
+    if len(shards) == 1:
+        return LoadCounts(shards[0])
+
+    pool = multiprocessing.Pool(numProcesses)
+    try:
+        while len(shards) > 1:
+            pairs = [tuple(shards[i:i + 2]) for i in xrange(0, len(shards), 2)]
+            shards = pool.map(MergePair, pairs)
+    finally:
+        pool.close()
+        pool.join()
+
+    return shards[0]
+
+def SaveMergedProfile(outputFile, counts, saveCounts = False, exactReuseDistances = 0):
+    """ SaveMergedProfile: normalizes merged counts and saves them as an
+        application profile
+
+        args:
+            - outputFile: name of the profile (automatically appends ".h5")
+            - counts: dictionary of counts (see LoadCounts)
+            - saveCounts: if True, the counts are also saved to 
+            <outputFile>_counts.h5 so the profile can be merged again
+            - exactReuseDistances: if > 0, long reuse distances are saved in
+            log-spaced buckets (see ProfileWriter.LogBinCounts). The counts
+            are saved unbinned"""
+    args = (counts['blockSize'], counts['workingSet'], counts['reuseCount'], counts['loadCount'], \
+        counts['activityCount'], counts['alphaCounts'], counts['maxReuseDistance'])
+
+    state = {'lruOrder': counts.get('lruOrder'), 'treeState': counts.get('treeState')}
+    SaveProfile(outputFile, *args, exactDistances = exactReuseDistances, **state)
+    if saveCounts:
+        SaveCounts(outputFile + "_counts", *args, **state)
@@ -0,0 +1,169 @@
+""" filename: ProfileSynthesis.py
+    contents: this file contains the routines used by "ProfileSynthesizer"
+    to build application profiles directly from parameters (a reuse
+    distance PMF, load proportions, an activity markov model and alpha
+    values) instead of from a trace. Profiles are written in the same
+    layout as those created by "ApplicationProfiler" """
+
+import numpy as np
+import h5py as h5
+
+from AlphaTree import AlphaTree
+
+def ReusePMF(wsSize, family, params = [], missRate = 0.01):
+    """ ReusePMF: builds a reuse distance PMF from a distribution family
+
+        args:
+            - wsSize: number of blocks in the working set
+            - family: name of the distribution of reuse distances d = 0 ...
+            wsSize - 1. "geometric" (params = [p], P(d) ~ (1 - p)^d), "zipf"
+            (params = [s], P(d) ~ (d + 1)^-s) or "uniform" (no params)
+            - params: list of parameters of the distribution
+            - missRate: probability of a not-previously-accessed block being
+            accessed (index 0 of the PMF). Default is 0.01
+
+        return: numpy array of wsSize + 1 probabilities"""
+    # validate inputs
+    if wsSize < 1:
+        raise ValueError("(in ReusePMF) wsSize must be >= 1")
+
+    if missRate < 0 or missRate > 1:
+        raise ValueError("(in ReusePMF) missRate must be in [0, 1]")
+
+    distances = np.arange(wsSize, dtype = np.float)
+
+    if family == "geometric":
+        if len(params) != 1 or not (0 < params[0] <= 1):
+            raise ValueError("(in ReusePMF) geometric takes one param 0 < p <= 1")
+        reuse = (1 - float(params[0])) ** distances
+
+    elif family == "zipf":
+        if len(params) != 1 or params[0] < 0:
+            raise ValueError("(in ReusePMF) zipf takes one param s >= 0")
+        reuse = (distances + 1) ** -float(params[0])
+
+    elif family == "uniform":
+        reuse = np.ones(wsSize, dtype = np.float)
+
+    else:
+        raise ValueError("(in ReusePMF) unknown distribution family: %s" % family)
+
+    reusePMF = np.zeros(wsSize + 1, dtype = np.float)
+    reusePMF[0] = missRate
+    reusePMF[1:] = reuse * (1 - missRate) / reuse.sum()
+
+    return reusePMF
+
+def ExpandTable(values, length, name):
+    """ ExpandTable: converts a scalar or a list of values into an array of
+        the input length. Lists shorter than length are padded with their
+        last value
+
+        args:
+            - values: scalar or list of values
+            - length: length of the output array
+            - name: name of the values (used in error messages)"""
+    values = np.atleast_1d(np.asarray(values, dtype = np.float))
+
+    if not len(values) or len(values) > length:
+        raise ValueError("(in ExpandTable) %s must have between 1 and %d values" % (name, length))
+
+    table = np.empty(length, dtype = np.float)
+    table[:len(values)] = values
+    table[len(values):] = values[-1]
+
+    return table
+
+def SynthesizeProfile(outputFile, wsSize, reusePMF, loadProp = 1.0, activityMarkov = [[0, 1], [0, 1]], \
+    alphas = 0.5, blockSize = 512, reuseBins = 3, baseAddress = 0, chunkRows = 65536):
+    """ SynthesizeProfile: writes an application profile built from the
+        input parameters
+
+        args:
+            - outputFile: string indicating the desired file name for the
+            profile (automatically appends ".h5")
+            - wsSize: number of blocks in the working set
+            - reusePMF: list where the i-th value is the probability of reuse
+            distance = (i - 1), and index 0 is the probability of a not-
+            previously-accessed block. Padded with zeros to wsSize + 1 and
+            normalized
+            - loadProp: probability of a load for each reuse distance (same
+            indexing as reusePMF), or a single value for all distances.
+            Lists are padded with their last value. Default is 1.0
+            - activityMarkov: 2x2 markov matrix for inactive (0) / active (1)
+            cycles. Rows are normalized. Default is always active
+            - alphas: probability of reusing the same subset at each tree
+            level. A single value, a list of one value per level (index 0 is
+            alpha(4, 8)), or a reuseBins x levels list of lists. Default 0.5
+            - blockSize: size of the largest cache block to model. Default
+            is 512 bytes
+            - reuseBins: number of reuse distance bins. Default is 3
+            - baseAddress: address of the first block in the working set.
+            Default is 0
+            - chunkRows: number of blocks' alpha values written at once"""
+    # validate inputs
+    if wsSize < 1:
+        raise ValueError("(in SynthesizeProfile) wsSize must be >= 1")
+
+    if reuseBins < 1:
+        raise ValueError("(in SynthesizeProfile) reuseBins >= 1")
+
+    if blockSize % 2 or blockSize < 8:
+        raise ValueError("(in SynthesizeProfile) blockSize must be power of 2 >= 8")
+
+    if baseAddress % blockSize:
+        raise ValueError("(in SynthesizeProfile) baseAddress must be a multiple of blockSize")
+
+    # reuse distance PMF
+    reusePMF = np.asarray(reusePMF, dtype = np.float)
+    if len(reusePMF) > wsSize + 1 or (reusePMF < 0).any() or not reusePMF.sum():
+        raise ValueError("(in SynthesizeProfile) reusePMF must have <= wsSize + 1 non-negative values")
+    temp = np.zeros(wsSize + 1, dtype = np.float)
+    temp[:len(reusePMF)] = reusePMF
+    reusePMF = temp / temp.sum()
+
+    # load proportions
+    loadProp = ExpandTable(loadProp, wsSize + 1, "loadProp")
+    if (loadProp < 0).any() or (loadProp > 1).any():
+        raise ValueError("(in SynthesizeProfile) loadProp values must be in [0, 1]")
+
+    # activity markov model
+    activityMarkov = np.asarray(activityMarkov, dtype = np.float)
+    if activityMarkov.shape != (2, 2) or (activityMarkov < 0).any() or not activityMarkov.sum(axis = 1).all():
+        raise ValueError("(in SynthesizeProfile) activityMarkov must be a 2x2 matrix of non-negative rows")
+    activityMarkov /= activityMarkov.sum(axis = 1)[:, np.newaxis]
+
+    # alpha values for one block
+    height = AlphaTree(blockSize, reuseBins).height
+    alphas = np.asarray(alphas, dtype = np.float)
+    try:
+        alphas = np.broadcast_to(alphas, (reuseBins, height)) if alphas.ndim < 2 else alphas
+    except ValueError:
+        alphas = None
+    if alphas is None or alphas.shape != (reuseBins, height) or (alphas < 0).any() or (alphas > 1).any():
+        raise ValueError("(in SynthesizeProfile) alphas must be values in [0, 1] for each of %d levels" % height)
+
+    blockAlphas = np.empty((reuseBins, height, 2), dtype = np.float)
+    blockAlphas[:, :, 0] = 1 - alphas
+    blockAlphas[:, :, 1] = alphas
+
+    # working set in address order
+    workingSet = baseAddress + np.arange(wsSize, dtype = np.int) * blockSize
+
+    # save application profile to file
+    outputFile = h5.File(outputFile + ".h5", 'w')
+    outputFile.create_dataset('blockSize', data = blockSize, dtype = np.int)
+    outputFile.create_dataset('workingSet', data = workingSet)
+    outputFile.create_dataset('reusePMF', data = reusePMF)
+    outputFile.create_dataset('loadProp', data = loadProp)
+    outputFile.create_dataset('activityMarkov', data = activityMarkov)
+
+    # every block has the same alphas, so write them a chunk at a time
+    alphaSet = outputFile.create_dataset('alphas', (wsSize, reuseBins, height, 2), dtype = np.float)
+    chunk = np.empty((min(chunkRows, wsSize), reuseBins, height, 2), dtype = np.float)
+    chunk[:] = blockAlphas
+    for start in xrange(0, wsSize, len(chunk)):
+        stop = min(start + len(chunk), wsSize)
+        alphaSet[start:stop] = chunk[:stop - start]
+
+    outputFile.close()
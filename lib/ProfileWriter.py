@@ -0,0 +1,239 @@
+""" filename: ProfileWriter.py
+    contents: this file contains the routines used by "ApplicationProfiler"
+    to turn the counts collected from a trace into a normalized application
+    profile and save it in HDF5 format"""
+
+import numpy as np
+import h5py as h5
+
+def NormalizeAlphas(alphaCounts):
+    """ NormalizeAlphas: normalizes the non-reuse/reuse counts of every
+        block, bin and level so they represent probabilities. Levels with
+        no counts are set to always reuse (same as
+        AlphaTree.NormalizeReuseCount)
+
+        args:
+            - alphaCounts: wsSize x bins x height x 2 matrix of counts.
+            Normalized in place"""
+    norm = alphaCounts.sum(axis = -1)
+    empty = norm == 0
+
+    norm[empty] = 1
+    alphaCounts /= norm[..., np.newaxis]
+
+    alphaCounts[empty, 0] = 0
+    alphaCounts[empty, 1] = 1.0
+
+def LogBinCounts(reuseCount, loadCount, exactDistances):
+    """ LogBinCounts: sums the reuse distance & load counts of long reuse
+        distances into log-spaced buckets. Distances below exactDistances
+        keep an entry each, and bucket k holds the distances in
+        [exactDistances * 2**k, exactDistances * 2**(k + 1)), the last 
+        bucket ending at the longest distance counted
+
+        args:
+            - reuseCount: list of counts indexed as in SaveProfile
+            - loadCount: list of load counts (same indexing)
+            - exactDistances: number of distances with an entry each (>= 1)
+
+        return: tuple of (reuseCount, loadCount, reuseBounds) arrays, where
+        entry i > 0 of the counts holds the distances in
+        [reuseBounds[i - 1], reuseBounds[i]) and reuseBounds[0] is 0"""
+    reuseCount = np.asarray(reuseCount, dtype = np.float)
+    loadCount = np.asarray(loadCount, dtype = np.float)
+    numDistances = len(reuseCount) - 1
+
+    reuseBounds = range(min(exactDistances, numDistances) + 1)
+    while reuseBounds[-1] < numDistances:
+        reuseBounds.append(min(reuseBounds[-1] * 2, numDistances))
+    reuseBounds = np.array(reuseBounds, dtype = np.int64)
+
+    if numDistances:
+        reuseCount = np.append(reuseCount[0], np.add.reduceat(reuseCount[1:], reuseBounds[:-1]))
+        loadCount = np.append(loadCount[0], np.add.reduceat(loadCount[1:], reuseBounds[:-1]))
+
+    return reuseCount, loadCount, reuseBounds
+
+def PackTreeState(treeFlags):
+    """ PackTreeState: packs the edge flags of each block's AlphaTree (which
+        subsets were used last) into bits, so the state of the trees at the
+        end of a trace can be saved with the profile
+
+        args:
+            - treeFlags: list of the "tree" arrays of each block's AlphaTree,
+            or a wsSize x nodes array of them
+
+        return: wsSize x ceil(nodes / 8) uint8 array. Row i is unpacked
+        with np.unpackbits(row)[:nodes]"""
+    return np.packbits(np.asarray(treeFlags, dtype = np.bool), axis = -1)
+
+def SaveProfile(outputFile, blockSize, workingSet, reuseCount, loadCount, activityCount, alphaCounts, maxReuseDistance = 0, \
+    exactDistances = 0, lruOrder = None, treeState = None):
+    """ SaveProfile: normalizes the input counts and saves them as an
+        application profile
+
+        args:
+            - outputFile: string indicating the desired file name for the
+            profile (automatically appends ".h5")
+            - blockSize: size of the largest cache block modeled
+            - workingSet: list of the blocks in the working set
+            - reuseCount: list where the i-th value is the number of accesses
+            with reuse distance (i - 1). Index 0 counts accesses to
+            not-previously-accessed blocks
+            - loadCount: list of the number of loads for each reuse distance
+            (same indexing as reuseCount)
+            - activityCount: 2x2 matrix counting transitions between
+            inactive (0) and active (1) cycles
+            - alphaCounts: wsSize x bins x height x 2 matrix of non-reuse/reuse
+            counts for each block
+            - maxReuseDistance: cap on the reuse distances measured (0 if
+            none). Saved with the profile if set
+            - exactDistances: if > 0, reuse distances >= exactDistances are
+            saved in log-spaced buckets (see LogBinCounts)
+            - lruOrder: ids (indices in workingSet) of the blocks in the LRU
+            stack at the end of the trace, most recently used first. Saved
+            if set
+            - treeState: packed AlphaTree flags at the end of the trace (see
+            PackTreeState). Saved if set"""
+    reuseBounds = None
+    if exactDistances:
+        reuseCount, loadCount, reuseBounds = LogBinCounts(reuseCount, loadCount, exactDistances)
+
+    reusePMF = np.array(reuseCount, dtype = np.float)
+    loadProp = np.array(loadCount, dtype = np.float)
+    activityMarkov = np.array(activityCount, dtype = np.float)
+    alphas = np.array(alphaCounts, dtype = np.float)
+
+    # normalize load proprotions
+    for i in xrange(len(loadProp)):
+        if reusePMF[i]: # if non-zero
+            loadProp[i] /= reusePMF[i]
+
+    # normalize reuse PMF
+    reusePMF /= np.linalg.norm(reusePMF, 1)
+
+    # remove double counted inactive cycles
+    activityMarkov[0][0] -= activityMarkov[0][1]
+
+    # normalize activity markov model. Rows with no transitions (e.g. a
+    # trace with no inactive cycles) are set to always active
+    for i in xrange(2):
+        norm = np.linalg.norm(activityMarkov[i][:], 1)
+        if not norm:
+            activityMarkov[i][:] = [0, 1.0]
+            continue
+        activityMarkov[i][:] /= norm
+
+    # normalize alpha values
+    NormalizeAlphas(alphas)
+
+    """ structures stored in the profile:
+
+        - blockSize: input argument value
+
+        - workingSet: ordered list of the working set of the application
+
+        - reusePMF: probability mass function where the i-th index represents
+        the probability of reuse-distance = (i - 1) occuring. Index 0 indicates
+        the probability of a not-previously-accessed block being accessed
+        (reuse-distance = Inf). This also represents a compulsory cache miss
+
+        - loadProp: array where the i-th element corresponds to the probability
+        of a load (read) from memory occuring for reused-distance = (i-1).
+        Again, index 0 corresponds to prob(load) for a not-previously-accessed
+        block access. This is used to generate ld/str info for each access
+        based on the access' reuse distance
+
+        - activityMarkov: markov model for the probability of an inactive/active
+        memory cycle given whether the previous memory cycle was inactive/active.
+        0 corresponds to inactive, and 1 corresponds to active. Thus, the value
+        of activityMarkov[0][0] is the probability of an inactive cycle occuring
+        given the previous cycle was inactive
+
+        - alphas: matrix where the i-th row corresponds the the alpha values
+        for the ith block in workingSet. These are used to iteratively project
+        accesses to memory blocks into one half of the memory block based on
+        which half (aka subset) of the block was accessed previously. This
+        helps to model the spatial locality of the memory reference stream
+
+        - maxReuseDistance: only saved if reuse distances were capped. 
+        reusePMF & loadProp then have at most maxReuseDistance + 2 entries,
+        where the entry at maxReuseDistance + 1 is for all reuse distances
+        >= maxReuseDistance (the "far" bin), and the last alpha bin is used
+        only by far reuses
+
+        - reuseBounds: only saved if reuse distances were log-binned. Entry 
+        i > 0 of reusePMF & loadProp is then for the reuse distances in
+        [reuseBounds[i - 1], reuseBounds[i]), so short distances have an
+        entry each and long ones share log-spaced buckets
+
+        - lruOrder & treeState: the state of the LRU stack and of every
+        block's AlphaTree at the end of the trace. The generator can start
+        from them (warmStart) instead of from an empty stack and trees, so
+        short traces do not need a warm-up run"""
+
+    # append 'h5' file extension
+    outputFile = outputFile + ".h5"
+
+    # save application profile to file
+    outputFile = h5.File(outputFile, 'w')
+    outputFile.create_dataset('blockSize', data = blockSize, dtype = np.int)
+    outputFile.create_dataset('workingSet', data = np.asarray(workingSet, dtype = np.uint64))
+    outputFile.create_dataset('reusePMF', data = reusePMF)
+    outputFile.create_dataset('loadProp', data = loadProp)
+    outputFile.create_dataset('activityMarkov', data = activityMarkov)
+    outputFile.create_dataset('alphas', data = alphas)
+    if maxReuseDistance:
+        outputFile.create_dataset('maxReuseDistance', data = maxReuseDistance, dtype = np.int)
+    if reuseBounds is not None:
+        outputFile.create_dataset('reuseBounds', data = reuseBounds)
+    if lruOrder is not None:
+        outputFile.create_dataset('lruOrder', data = np.asarray(lruOrder, dtype = np.int64))
+    if treeState is not None:
+        outputFile.create_dataset('treeState', data = np.asarray(treeState, dtype = np.uint8))
+    outputFile.close()
+
+def SaveCounts(outputFile, blockSize, workingSet, reuseCount, loadCount, activityCount, alphaCounts, maxReuseDistance = 0, \
+    lruOrder = None, treeState = None):
+    """ SaveCounts: saves the raw counts collected from a trace (before they
+        are normalized by SaveProfile), so profiles of several trace shards
+        can be merged exactly by summing their counts (see ProfileMerge.py)
+
+        args: same as SaveProfile. The counts file is saved as
+        <outputFile>.h5 with the datasets blockSize, workingSet, 
+        reuseCount, loadCount, activityCount, alphaCounts and (if set)
+        maxReuseDistance, lruOrder & treeState"""
+    outputFile = h5.File(outputFile + ".h5", 'w')
+    outputFile.create_dataset('blockSize', data = blockSize, dtype = np.int)
+    outputFile.create_dataset('workingSet', data = np.asarray(workingSet, dtype = np.uint64))
+    outputFile.create_dataset('reuseCount', data = np.asarray(reuseCount, dtype = np.float))
+    outputFile.create_dataset('loadCount', data = np.asarray(loadCount, dtype = np.float))
+    outputFile.create_dataset('activityCount', data = np.asarray(activityCount, dtype = np.float))
+    outputFile.create_dataset('alphaCounts', data = np.asarray(alphaCounts, dtype = np.float))
+    if maxReuseDistance:
+        outputFile.create_dataset('maxReuseDistance', data = maxReuseDistance, dtype = np.int)
+    if lruOrder is not None:
+        outputFile.create_dataset('lruOrder', data = np.asarray(lruOrder, dtype = np.int64))
+    if treeState is not None:
+        outputFile.create_dataset('treeState', data = np.asarray(treeState, dtype = np.uint8))
+    outputFile.close()
+
+def LoadCounts(fileName):
+    """ LoadCounts: reads a counts file saved by SaveCounts
+
+        args:
+            - fileName: name of the counts file
+
+        return: dictionary of the counts (see SaveCounts). maxReuseDistance
+        is 0 if the counts were not capped, and lruOrder & treeState are
+        None if they were not saved"""
+    counts = {}
+    with h5.File(fileName, 'r') as file:
+        counts['blockSize'] = int(file['blockSize'][()])
+        counts['maxReuseDistance'] = int(file['maxReuseDistance'][()]) if 'maxReuseDistance' in file else 0
+        for name in ['workingSet', 'reuseCount', 'loadCount', 'activityCount', 'alphaCounts']:
+            counts[name] = np.asarray(file[name])
+        for name in ['lruOrder', 'treeState']:
+            counts[name] = np.asarray(file[name]) if name in file else None
+
+    return counts
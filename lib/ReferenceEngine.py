@@ -0,0 +1,214 @@
+""" filename: ReferenceEngine.py
+    contents: this file contains the "reference" engine of the profiler and
+    the generator: plain, single-threaded implementations of the models
+    used by "ApplicationProfiler" and "TraceGenerator", with no pipeline,
+    caches or presizing. Faster engines must give the same profiles and,
+    for a fixed seed, the same traces (see Equivalence.py)"""
+
+import numpy as np
+import h5py as h5
+
+import PreProcessing as PreProc
+import TraceFormats
+from AlphaTree import AlphaTree
+from ProfileWriter import SaveProfile, PackTreeState
+from TracePipeline import regEx, idleRegEx, lsMap
+
+def ReferenceProfile(traceFile, outputFile, reuseBins = 3, blockSize = 512, maxReuseDistance = 0, exactReuseDistances = 0):
+    """ ReferenceProfile: creates an application profile from a trace, one
+        line and one cycle at a time
+
+        args: same as GenerateApplicationProfile"""
+    # set mask to pull blockAddress (any address width)
+    blockMask = ~(blockSize - 1)
+    alphaBins = reuseBins + 1 if maxReuseDistance else reuseBins
+
+    activityMarkov = np.zeros((2, 2), dtype = np.float)
+    previousCycle = 0
+
+    # blocks most recently used first, and in order of first access
+    lruStack = []
+    workingSet = []
+
+    reusePMF = [0]
+    loadProp = [0]
+    alphaForest = []
+
+    with open(traceFile) as file:
+        for line in file:
+            match = regEx.search(line)
+
+            # inactive cycle, or run of inactive cycles
+            if not match:
+                idle = idleRegEx.match(line)
+                for i in xrange(max(int(idle.group(1)), 1) if idle else 1):
+                    activityMarkov[previousCycle, 0] += 1
+                    previousCycle = 0
+                continue
+
+            activityMarkov[previousCycle, 1] += 1
+            previousCycle = 1
+
+            memAddress = int(match.group(2), 16)
+            accessType = lsMap[match.group(1)]
+            memBlock = memAddress & blockMask
+
+            # reuse distance & move block to the top of the stack
+            reuseDist = -1
+            if memBlock in lruStack:
+                reuseDist = lruStack.index(memBlock)
+                del lruStack[reuseDist]
+            lruStack.insert(0, memBlock)
+
+            if maxReuseDistance and len(lruStack) > maxReuseDistance:
+                lruStack.pop()
+
+            # far reuse of a block dropped past the cap
+            if reuseDist < 0 and memBlock in workingSet:
+                reuseDist = maxReuseDistance
+
+            # first access to the block
+            if reuseDist < 0:
+                reusePMF[0] += 1
+                if not maxReuseDistance or len(reusePMF) < maxReuseDistance + 2:
+                    reusePMF.append(0)
+                    loadProp.append(0)
+                if not accessType:
+                    loadProp[0] += 1
+
+                # the first access updates the tree of the previous block
+                alphaForest.append(AlphaTree(blockSize, alphaBins))
+                alphaForest[len(workingSet) - 1].ProcessAccess(memAddress, 0)
+
+                workingSet.append(memBlock)
+                continue
+
+            reusePMF[reuseDist + 1] += 1
+            if not accessType:
+                loadProp[reuseDist + 1] += 1
+
+            alphaBin = reuseDist
+            if maxReuseDistance:
+                alphaBin = reuseBins if reuseDist == maxReuseDistance else min(reuseDist, reuseBins - 1)
+
+            alphaForest[workingSet.index(memBlock)].ProcessAccess(memAddress, alphaBin)
+
+    alphas = np.zeros((len(workingSet), alphaBins, alphaForest[0].height, 2), dtype = np.float)
+    for i in xrange(len(workingSet)):
+        alphas[i] = alphaForest[i].reuseCount
+
+    lruOrder = [workingSet.index(memBlock) for memBlock in lruStack]
+    treeState = PackTreeState([tree.tree for tree in alphaForest])
+
+    SaveProfile(outputFile, blockSize, workingSet, reusePMF, loadProp, activityMarkov, alphas, maxReuseDistance, \
+        exactReuseDistances, lruOrder, treeState)
+
+def ReferenceTrace(traceFile, traceLength, appProfiles, weights = [], formatAccess = TraceFormats.STL, warmStart = False):
+    """ ReferenceTrace: generates a synthetic trace from application
+        profiles, building every block's AlphaTree up front. Stops when the
+        working set is used up
+
+        args: same as GenerateSyntheticTrace"""
+    numProfiles = len(appProfiles)
+    if len(weights) == 0:
+        weights = np.ones(numProfiles)
+
+    appProfiles = list(appProfiles)
+    openProfiles = []
+    for i in xrange(numProfiles):
+        if isinstance(appProfiles[i], basestring):
+            appProfiles[i] = h5.File(appProfiles[i], 'r')
+            openProfiles.append(appProfiles[i])
+
+    try:
+        blockSize = int(appProfiles[0]['blockSize'][()])
+        numReuseDistances = max(len(appProfiles[i]['reusePMF']) for i in xrange(numProfiles))
+
+        activityMarkov = np.zeros((2, 2), dtype = np.float)
+        PreProc.BuildMarkovModel(appProfiles, weights, activityMarkov)
+
+        reusePMF = np.zeros(numReuseDistances, dtype = np.float)
+        PreProc.BuildReusePMF(appProfiles, weights, reusePMF)
+
+        loadProp = np.zeros(numReuseDistances, dtype = np.float)
+        PreProc.BuildLoadProp(appProfiles, weights, loadProp)
+
+        # far bin of capped profiles
+        maxReuseDistance = PreProc.GetMaxReuseDistance(appProfiles)
+        farIndex = None
+        if maxReuseDistance and numReuseDistances == maxReuseDistance + 2:
+            farIndex = maxReuseDistance + 1
+        farBin = appProfiles[0]['alphas'].shape[1] - 1
+
+        # buckets of log-binned profiles
+        reuseBounds = PreProc.GetReuseBounds(appProfiles)
+
+        workingSet = PreProc.BuildWorkingSet(appProfiles).tolist()
+        wsSize = len(workingSet)
+        lruStack = list(workingSet)
+
+        alphaForest = []
+        PreProc.BuildAlphaForest(appProfiles, weights, alphaForest, wsSize, blockSize)
+
+        # stack & trees left by the profiled trace
+        if warmStart:
+            lruOrder, treeState = PreProc.GetWarmState(appProfiles)
+            lruStack = [workingSet[i] for i in lruOrder]
+            for i in xrange(wsSize):
+                alphaForest[i].tree = np.unpackbits(treeState[i])[:len(alphaForest[i].tree)].astype(np.bool)
+    finally:
+        for profile in openProfiles:
+            profile.close()
+
+    choice = np.random.choice
+    previousCycle = 0
+    uniqueAddrs = wsSize if warmStart else 0
+
+    with open(traceFile, 'wb') as traceFile:
+        cycle = -1
+        accesses = 0
+        while accesses < traceLength:
+            cycle += 1
+            if not choice(2, p = activityMarkov[previousCycle, :]):
+                previousCycle = 0
+                continue
+
+            previousCycle = 1
+            accesses += 1
+
+            reuseDist = choice(numReuseDistances, p = reusePMF)
+
+            reuseIndex = reuseDist
+
+            # distance in a log-spaced bucket
+            if reuseBounds is not None and reuseDist and reuseBounds[reuseDist] - reuseBounds[reuseDist - 1] > 1:
+                reuseDist = reuseBounds[reuseDist - 1] + 1 + \
+                    np.random.randint(reuseBounds[reuseDist] - reuseBounds[reuseDist - 1])
+
+            alphaBin = reuseDist - 1
+            if maxReuseDistance and alphaBin > 0:
+                alphaBin = min(alphaBin, farBin - 1)
+
+            # far reuses are spread over the blocks deeper than the cap
+            if reuseDist == farIndex:
+                reuseDist += np.random.randint(max(uniqueAddrs - maxReuseDistance, 1))
+                alphaBin = farBin
+
+            if warmStart and not reuseDist:
+                memAddress = lruStack[-1]
+            elif not reuseDist:
+                if uniqueAddrs >= wsSize:
+                    return
+                memAddress = lruStack[uniqueAddrs]
+            else:
+                if reuseDist > uniqueAddrs:
+                    uniqueAddrs += 1
+                memAddress = lruStack[reuseDist - 1]
+
+            lruStack.remove(memAddress)
+            lruStack.insert(0, memAddress)
+
+            accessType = 0 if np.random.rand() < loadProp[reuseIndex] else 1
+
+            memAddress = memAddress | alphaForest[workingSet.index(memAddress)].GenerateAccess(alphaBin)
+            formatAccess(traceFile, cycle, accessType, memAddress)
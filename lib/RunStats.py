@@ -0,0 +1,170 @@
+""" filename: RunStats
+    contents: This file contains the RunStats class, used by the profiler
+    and generator to collect sampled per-stage timings, throughput, LRU
+    stack depth statistics and progress while they run, and to save them
+    as a JSON stats file
+
+    routines using RunStats keep a reference that is None when stats are
+    disabled, so the only cost in the hot loop is a single check"""
+
+import json
+import time
+
+class RunStats:
+    """ class RunStats: collects statistics for one profiler or generator
+        run. Every sampleRate-th iteration of the main loop is sampled, and
+        the time between consecutive calls to Mark is charged to the named
+        stage"""
+
+    def __init__(self, name, statsFile, sampleRate = 1000, progressInterval = 10.0):
+        """ __init__: initializes the counters and starts the run timer
+
+            args:
+                - name: name of the routine, used in progress lines
+                - statsFile: name of the JSON file to save the stats to
+                - sampleRate: one in every sampleRate iterations is timed.
+                Default is 1000
+                - progressInterval: seconds between progress lines. 0
+                disables progress lines. Default is 10 seconds"""
+        # validate input
+        if sampleRate < 1:
+            raise ValueError("(in RunStats.__init__) sampleRate must be >= 1")
+
+        self.name = name
+        self.statsFile = statsFile
+        self.sampleRate = sampleRate
+        self.progressInterval = progressInterval
+
+        # iterations since last sample & number of samples
+        self.count = 0
+        self.samples = 0
+
+        # accumulated time & number of samples for each stage
+        self.stageTime = {}
+        self.stageCount = {}
+
+        # total time & number of waits for each waited-on resource (timed
+        # on every wait, not sampled)
+        self.waitTime = {}
+        self.waitCount = {}
+
+        # histogram of log2(LRU stack depth) & running totals
+        self.depthHist = {}
+        self.depthSum = 0
+        self.depthMax = 0
+        self.depthCount = 0
+
+        # run timer & time of previous mark
+        self.start = time.time()
+        self.last = self.start
+        self.nextProgress = self.start + progressInterval
+
+    def Sample(self):
+        """ Sample: called once per iteration of the main loop
+
+            return: True if this iteration should be timed"""
+        self.count += 1
+        if self.count < self.sampleRate:
+            return False
+
+        self.count = 0
+        self.samples += 1
+
+        now = time.time()
+        if self.progressInterval and now >= self.nextProgress:
+            self.Progress(now)
+            self.nextProgress = now + self.progressInterval
+
+        self.last = time.time()
+        return True
+
+    def Mark(self, stage):
+        """ Mark: charges the time since the previous mark (or the start
+            of the sampled iteration) to the input stage
+
+            args:
+                - stage: name of the stage that just finished"""
+        now = time.time()
+
+        self.stageTime[stage] = self.stageTime.get(stage, 0.0) + now - self.last
+        self.stageCount[stage] = self.stageCount.get(stage, 0) + 1
+
+        self.last = now
+
+    def Wait(self, name, seconds):
+        """ Wait: records time the main loop spent blocked outside the
+            sampled stages (e.g. waiting on a background thread)
+
+            args:
+                - name: name of the resource waited on
+                - seconds: time spent waiting"""
+        self.waitTime[name] = self.waitTime.get(name, 0.0) + seconds
+        self.waitCount[name] = self.waitCount.get(name, 0) + 1
+
+    def Depth(self, depth):
+        """ Depth: records the depth searched in the LRU stack
+
+            args:
+                - depth: index in the LRU stack that was searched to"""
+        bucket = int(depth).bit_length()
+        self.depthHist[bucket] = self.depthHist.get(bucket, 0) + 1
+
+        self.depthSum += depth
+        self.depthCount += 1
+        if depth > self.depthMax:
+            self.depthMax = depth
+
+    def Iterations(self):
+        """ Iterations: returns the number of iterations of the main loop
+            seen so far"""
+        return self.samples * self.sampleRate + self.count
+
+    def Progress(self, now):
+        """ Progress: prints a progress line
+
+            args:
+                - now: current time"""
+        elapsed = now - self.start
+        iterations = self.Iterations()
+
+        print "[%s] %.1fs: %d cycles, %.1f cycles/s" % \
+            (self.name, elapsed, iterations, iterations / max(elapsed, 1e-9))
+
+    def Finish(self, **counters):
+        """ Finish: saves the collected stats to the stats file
+
+            args:
+                - counters: named totals for the run (e.g. accesses=N). Rates
+                per second are reported for each"""
+        elapsed = time.time() - self.start
+
+        # estimated total time in each stage
+        stages = {}
+        for stage in self.stageTime:
+            mean = self.stageTime[stage] / self.stageCount[stage]
+            stages[stage] = {'samples': self.stageCount[stage], \
+                'meanSeconds': mean, \
+                'fraction': self.stageTime[stage] * self.sampleRate / max(elapsed, 1e-9)}
+
+        # total time blocked on each resource
+        waits = {}
+        for name in self.waitTime:
+            waits[name] = {'count': self.waitCount[name], 'seconds': self.waitTime[name], \
+                'fraction': self.waitTime[name] / max(elapsed, 1e-9)}
+
+        depth = {'samples': self.depthCount, 'max': self.depthMax, \
+            'mean': self.depthSum / float(max(self.depthCount, 1)), \
+            'log2Histogram': dict((str(bucket), self.depthHist[bucket]) for bucket in self.depthHist)}
+
+        rates = {}
+        for counter in counters:
+            rates[counter + 'PerSecond'] = counters[counter] / max(elapsed, 1e-9)
+
+        stats = {'name': self.name, 'seconds': elapsed, 'sampleRate': self.sampleRate, \
+            'cycles': self.Iterations(), 'counters': counters, 'rates': rates, \
+            'stages': stages, 'waits': waits, 'lruDepth': depth}
+
+        with open(self.statsFile, 'w') as file:
+            json.dump(stats, file, indent = 2, sort_keys = True)
+
+        return stats
@@ -0,0 +1,160 @@
+""" filename: StreamDemux.py
+    contents: this file contains the routines used by "ApplicationProfiler"
+    to profile traces that interleave the records of several CPUs or
+    threads. The trace is read once; each buffer's lines are split by the
+    stream id captured from each line and sent to a worker process per
+    stream, which parses its lines and keeps a profiler state of its own"""
+
+import multiprocessing
+import Queue
+
+from TracePipeline import ParseChunk
+
+# seconds between checks for a stopped worker
+pollInterval = 0.1
+
+def SplitStreams(chunk, streamRegEx, streamIds):
+    """ SplitStreams: splits a buffer of whole trace lines by stream. The
+        stream id (group 1 of streamRegEx) and the rest of the match are
+        removed from each line. Lines without a stream id (e.g. inactive
+        cycles of the whole system) go to every stream seen so far
+
+        args:
+            - chunk: string of trace lines
+            - streamRegEx: compiled regular expression capturing the id
+            - streamIds: list of the streams seen so far, in order of first
+            appearance. New streams are appended
+
+        return: dictionary of the lines of each stream in the buffer"""
+    lines = chunk.split('\n')
+    if not lines[-1]: # buffer ends with a newline
+        lines.pop()
+
+    streams = {}
+    search = streamRegEx.search
+    for line in lines:
+        match = search(line)
+        if not match:
+            for streamId in streamIds:
+                streams.setdefault(streamId, []).append(line)
+            continue
+
+        streamId = match.group(1)
+        if streamId not in streams:
+            streams[streamId] = []
+            if streamId not in streamIds:
+                streamIds.append(streamId)
+        streams[streamId].append(line[:match.start()] + line[match.end():])
+
+    return dict((streamId, '\n'.join(streams[streamId]) + '\n') for streamId in streams)
+
+def StreamBatches(textQueue):
+    """ StreamBatches: iterates over the parsed accesses of one stream
+
+        args:
+            - textQueue: queue of the stream's lines, ended by None
+
+        return: generator of (memAddresses, accessTypes) numpy arrays"""
+    while True:
+        text = textQueue.get()
+        if text is None:
+            return
+        yield ParseChunk(text)
+
+def StreamWorker(profileStream, streamId, textQueue, resultQueue):
+    """ StreamWorker: worker process of one stream. Runs profileStream on the
+        stream's accesses and sends (streamId, error) to resultQueue, with
+        error None on success. After an error, the rest of the stream is
+        read and dropped so the reader is never blocked
+
+        args:
+            - profileStream: function(streamId, batches) profiling a stream
+            - streamId: id of the stream
+            - textQueue: queue of the stream's lines, ended by None
+            - resultQueue: queue of the workers' results"""
+    try:
+        profileStream(streamId, StreamBatches(textQueue))
+    except Exception as error:
+        resultQueue.put((streamId, error))
+        while textQueue.get() is not None:
+            pass
+        return
+
+    resultQueue.put((streamId, None))
+
+def DemultiplexTrace(traceFile, streamRegEx, profileStream, maxStreams = 64, readSize = 2**20, queueDepth = 8):
+    """ DemultiplexTrace: reads an interleaved trace once and profiles each
+        stream concurrently in a worker process of its own
+
+        args:
+            - traceFile: name of the trace to read
+            - streamRegEx: compiled regular expression capturing the stream id
+            of a line as group 1
+            - profileStream: function(streamId, batches) run in each worker
+            - maxStreams: max number of streams (worker processes)
+            - readSize: size of each read (in bytes)
+            - queueDepth: max number of buffers queued for each worker
+
+        return: list of the stream ids, in order of first appearance"""
+    streamIds = []
+    workers = {}
+    resultQueue = multiprocessing.Queue()
+
+    try:
+        with open(traceFile) as file:
+            while True:
+                chunk = file.read(readSize)
+                if not chunk:
+                    break
+
+                if chunk[-1] != '\n':
+                    chunk += file.readline()
+
+                for streamId, text in SplitStreams(chunk, streamRegEx, streamIds).iteritems():
+                    if streamId not in workers:
+                        if len(workers) >= maxStreams:
+                            raise ValueError("(in DemultiplexTrace) trace has more than %d streams" % maxStreams)
+
+                        textQueue = multiprocessing.Queue(queueDepth)
+                        worker = multiprocessing.Process(target = StreamWorker, \
+                            args = (profileStream, streamId, textQueue, resultQueue))
+                        worker.daemon = True
+                        worker.start()
+                        workers[streamId] = (worker, textQueue)
+
+                    Send(workers[streamId], text)
+
+        for streamId in streamIds:
+            Send(workers[streamId], None)
+
+        errors = dict(resultQueue.get() for streamId in streamIds)
+        for streamId in streamIds:
+            workers[streamId][0].join()
+
+    finally:
+        for worker, textQueue in workers.itervalues():
+            if worker.is_alive():
+                worker.terminate()
+
+    # raise the error of the first stream that failed
+    for streamId in streamIds:
+        if errors[streamId] is not None:
+            raise errors[streamId]
+
+    return streamIds
+
+def Send(worker, text):
+    """ Send: adds a buffer to a worker's queue, waiting while the queue is
+        full
+
+        args:
+            - worker: tuple of (process, queue) of the worker
+            - text: buffer of lines, or None to end the stream"""
+    process, textQueue = worker
+    while True:
+        try:
+            textQueue.put(text, timeout = pollInterval)
+            return
+        except Queue.Full:
+            if not process.is_alive():
+                raise IOError("(in DemultiplexTrace) a stream worker stopped")
@@ -8,6 +8,11 @@
     
     author: Trevor Gale
     date: 3.5.16"""
+
+import struct
+
+# record layout of the binary format
+binRecord = struct.Struct("<QBQ")
     
 def STL(traceFile, cycle, accessType, memAddress):
     """ STL: prints the memory reference in the format used in
@@ -31,4 +36,63 @@ def OVP(traceFile, cycle, accessType, memAddress):
 def Din(traceFile, cycle, accessType, memAddress):
     """ Din: prints the memory reference in the "traditional
         dinero" format used by the DineroIV cache simulator"""
-    traceFile.write("%d 0x%x\n" % (accessType, memAddress))
\ No newline at end of file
+    traceFile.write("%d 0x%x\n" % (accessType, memAddress))
+
+def Bin(traceFile, cycle, accessType, memAddress):
+    """ Bin: prints the memory reference as a packed binary record of
+        little-endian (uint64 cycle, uint8 accessType, uint64 memAddress)"""
+    traceFile.write(binRecord.pack(cycle, accessType, memAddress))
+
+# run-length records of inactive cycles. These take the arguments
+# (traceFile, cycle, count), where cycle is the first of count consecutive
+# inactive cycles, and are written before the access that ends the run
+
+# access type of an inactive run in the binary format. The memAddress
+# field holds the number of cycles
+binIdle = 2
+
+def OVPIdle(traceFile, cycle, count):
+    """ OVPIdle: prints a run of inactive cycles as "i,<count>" """
+    traceFile.write("i,%d\n" % count)
+
+def BinIdle(traceFile, cycle, count):
+    """ BinIdle: prints a run of inactive cycles as a binary record with
+        accessType binIdle and the number of cycles as memAddress"""
+    traceFile.write(binRecord.pack(cycle, binIdle, count))
+
+# run-length record of each format that has one
+idleFormats = {OVP: OVPIdle, Bin: BinIdle}
+
+# record layout of the binary format with a core id
+binCoreRecord = struct.Struct("<QHBQ")
+
+# formats of multi-core traces. These take the arguments (traceFile, cycle,
+# core, accessType, memAddress), where core is the integer id of the core
+# that made the access. Text formats prefix each line with the core id
+
+def CoreSTL(traceFile, cycle, core, accessType, memAddress):
+    """ CoreSTL: prints the memory reference in STL, prefixed with the
+        core id"""
+    if not accessType:
+        traceFile.write("%d %d: read 0x%x\n" % (core, cycle, memAddress))
+    else:
+        traceFile.write("%d %d: write 0x%x 0xABCD\n" % (core, cycle, memAddress))
+
+def CoreOVP(traceFile, cycle, core, accessType, memAddress):
+    """ CoreOVP: prints the memory reference in the OVP format, prefixed
+        with the core id and a comma (e.g. "3,r,0x10")"""
+    if not accessType:
+        traceFile.write("%d,r,0x%x\n" % (core, memAddress))
+    else:
+        traceFile.write("%d,w,0x%x\n" % (core, memAddress))
+
+def CoreDin(traceFile, cycle, core, accessType, memAddress):
+    """ CoreDin: prints the memory reference in the dinero format, prefixed
+        with the core id"""
+    traceFile.write("%d %d 0x%x\n" % (core, accessType, memAddress))
+
+def CoreBin(traceFile, cycle, core, accessType, memAddress):
+    """ CoreBin: prints the memory reference as a packed binary record of
+        little-endian (uint64 cycle, uint16 core, uint8 accessType, uint64
+        memAddress)"""
+    traceFile.write(binCoreRecord.pack(cycle, core, accessType, memAddress))
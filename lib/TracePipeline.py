@@ -0,0 +1,214 @@
+""" filename: TracePipeline.py
+    contents: this file contains the routines used by "ApplicationProfiler"
+    to read and parse a plain-text trace in the background. A reader thread
+    reads large buffers of whole lines, a parser stage (a pool of worker
+    processes, or a thread) turns each buffer into numpy arrays of accesses,
+    and the profiler consumes the arrays in order. Stages are connected by
+    bounded queues, so memory use is limited to a few buffers"""
+
+import multiprocessing
+import threading
+import Queue
+import time
+import numpy as np
+import re
+
+from TraceFormats import binIdle
+
+# regular expression matching an access of an OVP trace
+regEx = re.compile("(\D),0x([0-9a-f]+)")
+
+# regular expression matching a run of inactive cycles
+idleRegEx = re.compile("^i,(\d+)")
+
+# numeric representation of access types
+lsMap = {'r': 0, 'w': 1}
+
+# seconds between checks for a stopped pipeline
+pollInterval = 0.1
+
+def ParseChunk(chunk):
+    """ ParseChunk: parses a buffer of whole trace lines
+
+        args:
+            - chunk: string of trace lines
+
+        return: tuple of numpy arrays (memAddresses, accessTypes) with one
+        element per line. Addresses are unsigned 64-bit. As in the binary
+        format, inactive cycles have accessType binIdle and the number of
+        cycles as memAddress (1, or N for a run "i,<N>")"""
+    lines = chunk.split('\n')
+    if not lines[-1]: # buffer ends with a newline
+        lines.pop()
+
+    memAddresses = np.empty(len(lines), dtype = np.uint64)
+    accessTypes = np.zeros(len(lines), dtype = np.int8)
+
+    search = regEx.search
+    idleMatch = idleRegEx.match
+    try:
+        for i in xrange(len(lines)):
+            match = search(lines[i])
+
+            if not match: # inactive cycle or run of inactive cycles
+                match = idleMatch(lines[i])
+                memAddresses[i] = max(int(match.group(1)), 1) if match else 1
+                accessTypes[i] = binIdle
+                continue
+
+            memAddresses[i] = int(match.group(2), 16)
+            accessTypes[i] = lsMap[match.group(1)]
+
+    except OverflowError:
+        raise ValueError("(in ParseChunk) address out of range (>= 2**64): " + lines[i])
+
+    return memAddresses, accessTypes
+
+def Put(queue, item, stop):
+    """ Put: adds an item to a bounded queue, giving up if the pipeline is
+        stopped while waiting
+
+        args:
+            - queue: queue to add to
+            - item: item to add
+            - stop: event set when the pipeline is stopped"""
+    while not stop.is_set():
+        try:
+            queue.put(item, timeout = pollInterval)
+            return
+        except Queue.Full:
+            pass
+
+def Get(queue, stop):
+    """ Get: removes an item from a queue. Returns None if the pipeline is
+        stopped while waiting
+
+        args:
+            - queue: queue to remove from
+            - stop: event set when the pipeline is stopped"""
+    while not stop.is_set():
+        try:
+            return queue.get(timeout = pollInterval)
+        except Queue.Empty:
+            pass
+
+def ReadChunks(traceFile, readSize, rawQueue, stop):
+    """ ReadChunks: reader stage. Reads buffers of about readSize bytes,
+        extended to the end of the last line. Ends with None, or with the
+        exception that stopped it
+
+        args:
+            - traceFile: name of the trace to read
+            - readSize: size of each read (in bytes)
+            - rawQueue: queue of buffers to the parser stage
+            - stop: event set when the pipeline is stopped"""
+    try:
+        with open(traceFile) as file:
+            while not stop.is_set():
+                chunk = file.read(readSize)
+                if not chunk:
+                    break
+
+                if chunk[-1] != '\n':
+                    chunk += file.readline()
+
+                Put(rawQueue, chunk, stop)
+
+    except Exception as error:
+        Put(rawQueue, error, stop)
+        return
+
+    Put(rawQueue, None, stop)
+
+def ParseChunks(rawQueue, batchQueue, pool, stop):
+    """ ParseChunks: parser stage. Parses each buffer in the pool of worker
+        processes, or in this thread if pool is None. Results are queued in
+        trace order (pending results from the pool are queued as-is)
+
+        args:
+            - rawQueue: queue of buffers from the reader stage
+            - batchQueue: queue of batches to the modelling stage
+            - pool: multiprocessing.Pool of parsers, or None
+            - stop: event set when the pipeline is stopped"""
+    while not stop.is_set():
+        chunk = Get(rawQueue, stop)
+
+        # pass on end of trace & errors
+        if chunk is None or isinstance(chunk, Exception):
+            Put(batchQueue, chunk, stop)
+            return
+
+        if pool:
+            Put(batchQueue, pool.apply_async(ParseChunk, (chunk,)), stop)
+            continue
+
+        try:
+            Put(batchQueue, ParseChunk(chunk), stop)
+        except Exception as error:
+            Put(batchQueue, error, stop)
+            return
+
+def AccessBatches(traceFile, readSize = 2**20, queueDepth = 8, parseProcesses = 1, stats = None):
+    """ AccessBatches: iterates over the accesses of a trace in batches,
+        reading and parsing ahead in the background
+
+        args:
+            - traceFile: name of the trace to read (OVP format)
+            - readSize: bytes read per buffer. Default is 1 MB
+            - queueDepth: max number of buffers waiting in each queue.
+            Default is 8
+            - parseProcesses: number of parser processes. 0 parses in a
+            thread. Default is 1
+            - stats: RunStats the time spent waiting for each batch is
+            recorded in (as "parse"), or None
+
+        return: yields the (memAddresses, accessTypes) of each buffer in
+        trace order (see ParseChunk)"""
+    # validate inputs
+    if readSize < 1 or queueDepth < 1 or parseProcesses < 0:
+        raise ValueError("(in AccessBatches) readSize & queueDepth must be >= 1 and parseProcesses >= 0")
+
+    stop = threading.Event()
+    rawQueue = Queue.Queue(queueDepth)
+    batchQueue = Queue.Queue(queueDepth)
+
+    pool = None
+    if parseProcesses:
+        pool = multiprocessing.Pool(parseProcesses)
+
+    stages = [threading.Thread(target = ReadChunks, args = (traceFile, readSize, rawQueue, stop)), \
+        threading.Thread(target = ParseChunks, args = (rawQueue, batchQueue, pool, stop))]
+    for stage in stages:
+        stage.daemon = True
+        stage.start()
+
+    try:
+        while True:
+            if stats:
+                start = time.time()
+
+            batch = batchQueue.get()
+
+            if batch is None:
+                return
+
+            if isinstance(batch, Exception):
+                raise batch
+
+            # wait for pending results from the pool
+            if not isinstance(batch, tuple):
+                batch = batch.get()
+
+            if stats:
+                stats.Wait('parse', time.time() - start)
+
+            yield batch
+
+    finally:
+        stop.set()
+        for stage in stages:
+            stage.join()
+
+        if pool:
+            pool.terminate()
+            pool.join()
@@ -0,0 +1,280 @@
+""" filename: TraceStream
+    contents: this file contains the TraceStream class and the OpenTrace
+    routine used by "GenerateSyntheticTrace" to write a trace directly to a
+    consumer on the same host (e.g. a simulator) through a unix domain
+    socket or a named pipe (FIFO) instead of a regular file
+
+    records are grouped into batches. If a window is used, every batch is
+    framed with a header of two little-endian uint32 values (number of
+    records, number of payload bytes) followed by the payload, and the end
+    of the trace is marked with a (0, 0) header. Over a socket, the
+    consumer acknowledges batches by sending a little-endian uint32 count
+    of batches consumed; at most "window" batches are left unacknowledged.
+    With no window (window = 0) the records are written as a raw stream.
+    In either case writes block while the consumer is behind, which applies
+    backpressure to the generator
+
+    regular files can instead be written by a background thread through
+    the AsyncWriter class, so the generator keeps running while the writes
+    to disk are in progress"""
+
+import threading
+import Queue
+import socket
+import struct
+import time
+import stat
+import os
+
+# batch header & acknowledgement formats
+headerFormat = "<II"
+ackFormat = "<I"
+
+def OpenTrace(traceFile, batchSize = 4096, window = 0, writeBuffers = 0, writeBufferSize = 2**20, stats = None):
+    """ OpenTrace: opens the output for a synthetic trace
+
+        args:
+            - traceFile: name of the output. "unix:<path>" connects to a
+            unix domain socket and "fifo:<path>" (or the path of an existing
+            named pipe) opens a FIFO. Anything else is opened as a regular file
+            - batchSize: number of records sent per batch to a stream
+            - window: max number of unacknowledged batches. 0 writes a raw
+            stream with no framing
+            - writeBuffers: number of buffers in the ring of a background
+            writer for a regular file. 0 writes in the caller's thread
+            - writeBufferSize: bytes collected in a buffer before it is
+            passed to the background writer
+            - stats: RunStats that time spent waiting on the background
+            writer is recorded in (as "writer"), or None
+
+        return: object with write and close methods"""
+    if traceFile.startswith("unix:"):
+        return TraceStream(traceFile[5:], True, batchSize, window)
+
+    if traceFile.startswith("fifo:"):
+        return TraceStream(traceFile[5:], False, batchSize, window)
+
+    if os.path.exists(traceFile) and stat.S_ISFIFO(os.stat(traceFile).st_mode):
+        return TraceStream(traceFile, False, batchSize, window)
+
+    if writeBuffers:
+        return AsyncWriter(open(traceFile, 'wb'), writeBuffers, writeBufferSize, stats)
+
+    return open(traceFile, 'wb')
+
+class AsyncWriter:
+    """ class AsyncWriter: file-like writer that collects records in a
+        buffer and hands full buffers to a background thread, which writes
+        them to the file (releasing the GIL while it does). Buffers are
+        reused from a fixed ring, so the caller only blocks when every
+        buffer is waiting to be written"""
+
+    def __init__(self, file, numBuffers = 2, bufferSize = 2**20, stats = None):
+        """ __init__: creates the buffers & starts the writer thread
+
+            args:
+                - file: open file to write to. Closed by close
+                - numBuffers: number of buffers in the ring (>= 2)
+                - bufferSize: bytes collected before a buffer is handed off
+                - stats: RunStats that time spent waiting for a free buffer
+                is recorded in (as "writer"), or None"""
+        # validate input
+        if numBuffers < 2:
+            raise ValueError("(in AsyncWriter.__init__) numBuffers must be >= 2")
+
+        if bufferSize < 1:
+            raise ValueError("(in AsyncWriter.__init__) bufferSize must be >= 1")
+
+        self.file = file
+        self.bufferSize = bufferSize
+        self.stats = stats
+
+        # buffers ready to be filled & buffers waiting to be written
+        self.free = Queue.Queue()
+        self.full = Queue.Queue()
+        for i in xrange(numBuffers - 1):
+            self.free.put(bytearray())
+
+        # buffer being filled
+        self.buffer = bytearray()
+
+        # total time spent waiting for a free buffer
+        self.stallTime = 0.0
+
+        # error raised by the writer thread
+        self.error = None
+
+        self.thread = threading.Thread(target = self.WriteBuffers)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def WriteBuffers(self):
+        """ WriteBuffers: writer thread. Writes each full buffer and returns
+            it to the ring, until None is received"""
+        while True:
+            buffer = self.full.get()
+            if buffer is None:
+                self.full.task_done()
+                return
+
+            try:
+                if not self.error:
+                    self.file.write(buffer)
+            except Exception as error:
+                self.error = error
+
+            del buffer[:]
+            self.free.put(buffer)
+            self.full.task_done()
+
+    def write(self, record):
+        """ write: adds a record to the current buffer, handing the buffer
+            to the writer once it is full
+
+            args:
+                - record: string holding one or more formatted accesses"""
+        self.buffer += record
+
+        if len(self.buffer) >= self.bufferSize:
+            self.HandOff()
+
+    def HandOff(self):
+        """ HandOff: queues the current buffer to be written and takes a
+            free buffer, waiting for one if the writer is behind"""
+        if self.error:
+            raise self.error
+
+        self.full.put(self.buffer)
+
+        start = time.time()
+        self.buffer = self.free.get()
+        stall = time.time() - start
+
+        self.stallTime += stall
+        if self.stats:
+            self.stats.Wait('writer', stall)
+
+    def flush(self):
+        """ flush: waits until every record written so far is in the file"""
+        if self.buffer:
+            self.HandOff()
+
+        self.full.join()
+        if self.error:
+            raise self.error
+
+        self.file.flush()
+
+    def close(self):
+        """ close: writes any remaining records, stops the writer thread and
+            closes the file"""
+        try:
+            if self.buffer:
+                self.HandOff()
+        finally:
+            self.full.put(None)
+            self.thread.join()
+            self.file.close()
+
+        if self.error:
+            raise self.error
+
+class TraceStream:
+    """ class TraceStream: file-like writer that groups records into batches
+        and sends them to a unix domain socket or named pipe"""
+
+    def __init__(self, path, isSocket, batchSize = 4096, window = 0):
+        """ __init__: connects to the consumer. Opening a FIFO blocks until
+            the consumer opens it for reading
+
+            args:
+                - path: path of the socket or FIFO
+                - isSocket: True for a unix domain socket, False for a FIFO
+                - batchSize: number of records per batch
+                - window: max number of unacknowledged batches (sockets only).
+                0 writes a raw stream with no framing"""
+        # validate input
+        if batchSize < 1:
+            raise ValueError("(in TraceStream.__init__) batchSize must be >= 1")
+
+        if window < 0:
+            raise ValueError("(in TraceStream.__init__) window must be >= 0")
+
+        self.batchSize = batchSize
+        self.window = window
+        self.isSocket = isSocket
+
+        # records waiting to be sent
+        self.batch = []
+
+        # batches sent but not yet acknowledged
+        self.unacked = 0
+
+        if isSocket:
+            self.socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.socket.connect(path)
+            self.send = self.socket.sendall
+        else:
+            self.socket = None
+            self.pipe = open(path, 'wb')
+            self.send = self.pipe.write
+
+    def write(self, record):
+        """ write: adds a record to the current batch, sending the batch
+            once it is full
+
+            args:
+                - record: string holding one formatted access"""
+        self.batch.append(record)
+
+        if len(self.batch) >= self.batchSize:
+            self.flush()
+
+    def flush(self):
+        """ flush: sends the current batch, first waiting for the consumer
+            if the window of unacknowledged batches is full"""
+        if not self.batch:
+            return
+
+        payload = "".join(self.batch)
+
+        if self.window:
+            # wait for the consumer to catch up
+            if self.isSocket:
+                while self.unacked >= self.window:
+                    self.unacked -= self.ReadAck()
+                self.unacked += 1
+
+            self.send(struct.pack(headerFormat, len(self.batch), len(payload)))
+
+        self.send(payload)
+        self.batch = []
+
+    def ReadAck(self):
+        """ ReadAck: blocks until the consumer acknowledges one or more
+            batches
+
+            return: number of batches acknowledged"""
+        size = struct.calcsize(ackFormat)
+        ack = ""
+        while len(ack) < size:
+            data = self.socket.recv(size - len(ack))
+            if not data:
+                raise IOError("(in TraceStream.ReadAck) consumer closed the connection")
+            ack += data
+
+        return struct.unpack(ackFormat, ack)[0]
+
+    def close(self):
+        """ close: sends any remaining records and the end of trace marker,
+            then closes the connection"""
+        self.flush()
+
+        if self.window:
+            self.send(struct.pack(headerFormat, 0, 0))
+
+        if self.isSocket:
+            self.socket.shutdown(socket.SHUT_WR)
+            self.socket.close()
+        else:
+            self.pipe.close()
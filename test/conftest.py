@@ -0,0 +1,19 @@
+import pytest
+import h5py as h5
+
+@pytest.fixture
+def make_profile():
+    """ returns a function that creates an in-memory profile containing only
+        the input alphas. Profiles are closed after the test"""
+    profiles = []
+
+    def MakeProfile(name, alphas):
+        profile = h5.File(name, 'w', driver = 'core', backing_store = False)
+        profile.create_dataset('alphas', data = alphas)
+        profiles.append(profile)
+        return profile
+
+    yield MakeProfile
+
+    for profile in profiles:
+        profile.close()
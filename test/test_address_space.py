@@ -0,0 +1,99 @@
+import pytest
+import numpy as np
+from lib.AddressSpace import AddressSpace, BlockAllocator, StreamingWorkingSet
+from lib.ProfileSynthesis import SynthesizeProfile
+from lib.AlphaForest import AlphaForest
+from TraceGenerator import GenerateSyntheticTrace
+import lib.TraceFormats as TraceFormats
+import h5py as h5
+
+def read_bin(name):
+    """ reads every record of a binary trace"""
+    records = []
+    with open(name, 'rb') as trace:
+        record = trace.read(TraceFormats.binRecord.size)
+        while len(record) == TraceFormats.binRecord.size:
+            records.append(TraceFormats.binRecord.unpack(record))
+            record = trace.read(TraceFormats.binRecord.size)
+    return records
+
+def test_address_layout():
+    """ tests block ids are laid out in regions"""
+    space = AddressSpace(4096, 512)
+    assert space.Address(0) == 4096
+    assert space.Address(3) == 4096 + 3 * 512
+
+    space = AddressSpace(0, 512, regionBlocks = 2, regionGap = 1024)
+    assert [space.Address(i) for i in xrange(5)] == [0, 512, 2048, 2560, 4096]
+
+    with pytest.raises(ValueError):
+        AddressSpace(100, 512)
+
+    with pytest.raises(ValueError):
+        AddressSpace(2**32 - 512, 512, addressLimit = 2**32).Address(1)
+
+    # synthesized blocks are not limited to 32-bit addresses
+    assert AddressSpace(2**32 - 512, 512).Address(1) == 2**32
+
+def test_block_allocator():
+    """ tests released ids are reused first"""
+    allocator = BlockAllocator()
+    assert [allocator.Allocate() for i in xrange(3)] == [0, 1, 2]
+
+    allocator.Release(1)
+    assert allocator.Allocate() == 1
+    assert allocator.Allocate() == 3
+
+def test_streaming_working_set(tmpdir):
+    """ tests profile blocks are used before fresh blocks and the cap
+        bounds the stack"""
+    name = str(tmpdir.join('profile'))
+    SynthesizeProfile(name, 2, [1])
+
+    with h5.File(name + '.h5', 'r') as profile:
+        forest = AlphaForest([profile], [1], 2, 512)
+        blocks = StreamingWorkingSet([0, 512], forest, AddressSpace(1024, 512), maxBlocks = 3)
+
+        assert [blocks.NewBlock() for i in xrange(3)] == [0, 512, 1024]
+        assert blocks.Reuse(2) == 0
+        assert blocks.lruStack == [0, 1024, 512]
+
+        # 512 is dropped, then 1024 is dropped & its id reused
+        assert blocks.NewBlock() == 1536
+        assert blocks.NewBlock() == 1024
+        assert blocks.NewBlock() == 2048
+        assert len(blocks) == 3
+        assert len(blocks.trees) == 3
+
+def test_unbounded_generation(tmpdir):
+    """ tests generation continues past the working set of the profile"""
+    name = str(tmpdir.join('profile'))
+    trace = str(tmpdir.join('trace.bin'))
+    SynthesizeProfile(name, 4, [0.5, 0.5])
+
+    np.random.seed(0)
+    GenerateSyntheticTrace(trace, 1000, [name + '.h5'], [], TraceFormats.Bin, \
+        unbounded = True, maxWorkingSet = 8, addressLayout = {'baseAddress': 2**20})
+
+    records = read_bin(trace)
+    assert len(records) == 1000
+
+    # synthesized blocks are within the cap past the base address
+    blocks = set(address & ~511 for cycle, accessType, address in records)
+    assert set(range(0, 4 * 512, 512)) <= blocks
+    assert all(block < 4 * 512 or 2**20 <= block < 2**20 + 8 * 512 for block in blocks)
+
+def test_unbounded_wide_addresses(tmpdir):
+    """ tests synthesized blocks past 32-bit addresses are written in the
+        binary format"""
+    name = str(tmpdir.join('profile'))
+    trace = str(tmpdir.join('trace.bin'))
+    SynthesizeProfile(name, 4, [1])
+
+    np.random.seed(0)
+    GenerateSyntheticTrace(trace, 20, [name + '.h5'], [], TraceFormats.Bin, \
+        unbounded = True, addressLayout = {'baseAddress': 2**32 - 8 * 512})
+
+    records = read_bin(trace)
+    assert len(records) == 20
+    assert max(address for cycle, accessType, address in records) >= 2**32
@@ -0,0 +1,71 @@
+import pytest
+import numpy as np
+import h5py as h5
+from lib.AlphaForest import AlphaForest
+from lib.PreProcessing import BuildAlphaForest
+from lib.ProfileSynthesis import SynthesizeProfile
+from TraceGenerator import GenerateSyntheticTrace
+
+def test_lazy_matches_eager(make_profile):
+    """ tests AlphaForest builds the same trees as BuildAlphaForest"""
+    np.random.seed(0)
+    profiles = [make_profile('a.h5', np.random.rand(6, 3, 7, 2)), \
+        make_profile('b.h5', np.random.rand(4, 3, 7, 2))]
+    weights = [2, 3]
+
+    eager = []
+    BuildAlphaForest(profiles, weights, eager, 6, 512)
+
+    lazy = AlphaForest(profiles, weights, 6, 512)
+
+    assert len(lazy) == 6
+
+    for i in xrange(6):
+        assert np.allclose(eager[i].reuseCount, lazy[i].reuseCount)
+
+def test_trees_built_on_demand(make_profile):
+    """ tests AlphaForest only builds trees that are referenced and keeps
+        their state between references"""
+    profile = make_profile('c.h5', np.ones((10, 3, 7, 2)))
+
+    forest = AlphaForest([profile], [1], 10, 512)
+
+    # nothing built yet
+    assert len(forest.trees) == 0
+
+    tree = forest[3]
+    tree.GenerateAccess(0)
+
+    # only one tree built & same object returned
+    assert forest.trees.keys() == [3]
+    assert forest[3] is tree
+
+    with pytest.raises(IndexError):
+        forest[10]
+
+def test_mismatched_shapes(make_profile):
+    """ tests AlphaForest rejects profiles with different reuseBins"""
+    profiles = [make_profile('d.h5', np.ones((4, 3, 7, 2))), \
+        make_profile('e.h5', np.ones((4, 2, 7, 2)))]
+
+    with pytest.raises(ValueError):
+        AlphaForest(profiles, [1, 1], 4, 512)
+
+def test_generator_uses_block_trees(tmpdir, monkeypatch):
+    """ tests the generator builds the tree of each block it references"""
+    built = []
+    BuildTree = AlphaForest.BuildTree
+    def RecordTree(self, blockIndex):
+        built.append(blockIndex)
+        return BuildTree(self, blockIndex)
+    monkeypatch.setattr(AlphaForest, 'BuildTree', RecordTree)
+
+    name = str(tmpdir.join('profile'))
+    SynthesizeProfile(name, 20, [0.2] + [0.8 / 20] * 20)
+
+    np.random.seed(0)
+    GenerateSyntheticTrace(str(tmpdir.join('trace.stl')), 50, [name + '.h5'])
+
+    # one tree per distinct block, built once
+    assert len(built) > 1
+    assert len(built) == len(set(built))
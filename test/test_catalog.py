@@ -0,0 +1,103 @@
+import pytest
+import numpy as np
+import h5py as h5
+import os
+from ApplicationProfiler import GenerateApplicationProfile
+from lib.Catalog import MissRatioPoints, SummarizeProfile, UpdateCatalog, QueryCatalog
+from lib.Equivalence import RandomTrace
+from lib.MissRatio import TraceMissRatios
+
+def test_miss_ratio_points():
+    """ tests the points for exact, log-binned & capped profiles"""
+    cacheBlocks, missRatios = MissRatioPoints([0.1, 0.5, 0.2, 0.2])
+    assert cacheBlocks.tolist() == [1, 2]
+    assert np.allclose(missRatios, [0.5, 0.3])
+
+    # distances 0, 1 & [2, 4)
+    cacheBlocks, missRatios = MissRatioPoints([0.1, 0.3, 0.2, 0.4], np.array([0, 1, 2, 4]))
+    assert cacheBlocks.tolist() == [1, 2, 4]
+    assert np.allclose(missRatios, [0.7, 0.5, 0.1])
+
+    # far bin of distances >= 2
+    cacheBlocks, missRatios = MissRatioPoints([0.1, 0.3, 0.2, 0.4], maxReuseDistance = 2)
+    assert cacheBlocks.tolist() == [1, 2]
+    assert np.allclose(missRatios, [0.7, 0.5])
+
+def test_summarize_profile(tmpdir):
+    """ tests a summary matches the trace it was profiled from"""
+    trace = str(tmpdir.join('trace.ovp'))
+    RandomTrace(trace, 3000, 100, seed = 2)
+    profile = str(tmpdir.join('profile'))
+    GenerateApplicationProfile(trace, profile, reuseBins = 4, parseProcesses = 0)
+
+    summary = SummarizeProfile(profile + '.h5')
+    assert summary['footprint'] == 100
+    assert summary['blockSize'] == 512
+    assert summary['reuseBins'] == 4
+
+    with open(trace) as file:
+        loads = sum(line.startswith('r') for line in file)
+    assert np.isclose(summary['loadRatio'], loads / 3000.0)
+
+    missRatios = TraceMissRatios(trace, "OVP", [512], (summary['mrcBlocks'] * 512).tolist())[0]
+    assert np.allclose(summary['mrcMissRatios'], missRatios)
+    assert 0 < summary['activityRate'] < 1
+
+def profile_library(tmpdir, seeds):
+    """ profiles a random trace for each seed & returns the profiles"""
+    profiles = []
+    for seed in seeds:
+        trace = str(tmpdir.join('trace%d.ovp' % seed))
+        RandomTrace(trace, 2000, 20 + seed * 10, seed = seed)
+        GenerateApplicationProfile(trace, trace[:-4], parseProcesses = 0)
+        profiles.append(trace[:-4] + '.h5')
+    return profiles
+
+@pytest.mark.parametrize("numProcesses", [1, 2])
+def test_update_catalog(tmpdir, numProcesses):
+    """ tests only new & changed profiles are read again"""
+    catalog = str(tmpdir.join('catalog.db'))
+    profiles = profile_library(tmpdir, [0, 1, 2])
+
+    result = UpdateCatalog(catalog, profiles, numProcesses = numProcesses)
+    assert (result['updated'], result['removed'], result['unchanged']) == (3, 0, 0)
+    with h5.File(profiles[1], 'r') as profile:
+        assert profile.attrs['footprint'] == 30
+        assert profile.attrs['mrcBlocks'].tolist() == [1, 2, 4, 8, 16]
+
+    result = UpdateCatalog(catalog, profiles, numProcesses = numProcesses)
+    assert (result['updated'], result['removed'], result['unchanged']) == (0, 0, 3)
+
+    # one profile changes, one is deleted & one is not a profile
+    RandomTrace(str(tmpdir.join('trace0.ovp')), 2000, 50, seed = 5)
+    GenerateApplicationProfile(str(tmpdir.join('trace0.ovp')), profiles[0][:-3], parseProcesses = 0)
+    os.remove(profiles[2])
+    other = str(tmpdir.join('other.h5'))
+    with open(other, 'w') as file:
+        file.write("not a profile")
+
+    result = UpdateCatalog(catalog, profiles[:2] + [other], numProcesses = numProcesses)
+    assert (result['updated'], result['removed'], result['unchanged']) == (1, 1, 1)
+    assert result['failed'] == [other]
+    assert [summary['footprint'] for summary in QueryCatalog(catalog)] == [50, 30]
+
+def test_query_catalog(tmpdir):
+    """ tests profiles are selected by summary & miss ratio"""
+    catalog = str(tmpdir.join('catalog.db'))
+    profiles = profile_library(tmpdir, [0, 1, 2])
+    UpdateCatalog(catalog, profiles, writeAttributes = False)
+
+    with h5.File(profiles[0], 'r') as profile:
+        assert 'footprint' not in profile.attrs
+
+    selected = QueryCatalog(catalog, "footprint >= ?", (30,))
+    assert [summary['path'] for summary in selected] == [os.path.abspath(name) for name in profiles[1:]]
+    summary = SummarizeProfile(profiles[1])
+    assert selected[0]['mrc'] == zip(summary['mrcBlocks'].tolist(), summary['mrcMissRatios'].tolist())
+
+    missRatios = dict((summary['path'], dict(summary['mrc'])[8]) for summary in QueryCatalog(catalog))
+    threshold = sorted(missRatios.values())[1]
+    selected = QueryCatalog(catalog, "path IN (SELECT path FROM mrc WHERE cacheBlocks = 8 AND missRatio <= ?)", \
+        (threshold,))
+    assert sorted(summary['path'] for summary in selected) == sorted(path for path in missRatios \
+        if missRatios[path] <= threshold)
@@ -0,0 +1,55 @@
+import pytest
+import numpy as np
+from lib.ChunkProfile import ChunkBoundaries, ResolveChunk
+from lib.Equivalence import RandomTrace, CompareProfiles
+from ApplicationProfiler import GenerateApplicationProfile
+
+def test_chunk_boundaries(tmpdir):
+    """ tests chunks cover the trace & are cut at line boundaries"""
+    trace = str(tmpdir.join('trace.ovp'))
+    RandomTrace(trace, 300, 16, seed = 0)
+    with open(trace) as file:
+        text = file.read()
+
+    chunks = ChunkBoundaries(trace, 7)
+    assert len(chunks) == 7
+    assert ''.join(text[start:end] for start, end in chunks) == text
+    assert all(text[end - 1] == '\n' for start, end in chunks)
+
+    # more chunks than lines
+    assert len(ChunkBoundaries(trace, 10**5)) <= text.count('\n')
+
+def test_resolve_chunk():
+    """ tests first touches are resolved against the earlier stack"""
+    # earlier stack is 5, 4, 3, 2, 1 & the chunk accesses 3, 6, 3, 1
+    chunk = {'memBlocks': np.array([3, 6, 3, 1]), 'reuseDists': np.array([-1, -1, 1, -1]), \
+        'lruStack': [1, 3, 6]}
+    lruStack = ResolveChunk(chunk, [5, 4, 3, 2, 1], {1: 0, 2: 1, 3: 2, 4: 3, 5: 4})
+
+    assert chunk['reuseDists'].tolist() == [2, -1, 1, 5]
+    assert lruStack == [1, 3, 6, 5, 4, 2]
+
+    # capped at 3 blocks: 1 is deeper than the cap
+    chunk = {'memBlocks': np.array([3, 6, 3, 1]), 'reuseDists': np.array([-1, -1, 1, -1]), \
+        'lruStack': [1, 3, 6]}
+    lruStack = ResolveChunk(chunk, [5, 4, 3], {1: 0, 2: 1, 3: 2, 4: 3, 5: 4}, 3)
+
+    assert chunk['reuseDists'].tolist() == [2, -1, 1, 3]
+    assert lruStack == [1, 3, 6]
+
+@pytest.mark.parametrize("maxReuseDistance", [0, 8])
+def test_parallel_chunks(tmpdir, maxReuseDistance):
+    """ tests profiling in chunks gives the serial profile"""
+    trace = str(tmpdir.join('trace.ovp'))
+    RandomTrace(trace, 3000, 64, seed = 1)
+
+    serial = str(tmpdir.join('serial'))
+    GenerateApplicationProfile(trace, serial, parseProcesses = 0, maxReuseDistance = maxReuseDistance)
+    for parallelChunks in [2, 13]:
+        chunked = str(tmpdir.join('chunked%d' % parallelChunks))
+        GenerateApplicationProfile(trace, chunked, maxReuseDistance = maxReuseDistance, \
+            parallelChunks = parallelChunks, chunkProcesses = 2)
+        assert CompareProfiles(serial + ".h5", chunked + ".h5") == []
+
+    with pytest.raises(ValueError):
+        GenerateApplicationProfile(trace, serial, windowSize = 100, parallelChunks = 2)
@@ -0,0 +1,58 @@
+import pytest
+import numpy as np
+import h5py as h5
+from lib.Equivalence import ChiSquareSF, HomogeneityTest, CompareProfiles, RandomTrace, CheckEngines
+from ApplicationProfiler import GenerateApplicationProfile
+from TraceGenerator import GenerateSyntheticTrace
+
+def test_chi_square_sf():
+    """ tests the survival function against table values"""
+    assert ChiSquareSF(3.841, 1) == pytest.approx(0.05, abs = 1e-4)
+    assert ChiSquareSF(18.307, 10) == pytest.approx(0.05, abs = 1e-4)
+    assert ChiSquareSF(0.584, 3) == pytest.approx(0.9, abs = 1e-3)
+    assert ChiSquareSF(0, 4) == 1.0
+
+def test_homogeneity_test():
+    """ tests samples of the same distribution pass & different ones fail"""
+    random = np.random.RandomState(0)
+    first = np.bincount(random.binomial(10, 0.5, 5000), minlength = 11)
+    second = np.bincount(random.binomial(10, 0.5, 5000), minlength = 11)
+    third = np.bincount(random.binomial(10, 0.4, 5000), minlength = 11)
+
+    assert HomogeneityTest(first, second) > 0.001
+    assert HomogeneityTest(first, third) < 0.001
+    assert HomogeneityTest([5], [7]) == 1.0
+
+def test_compare_profiles(tmpdir):
+    """ tests the engines give the same profile & differences are found"""
+    trace = str(tmpdir.join('trace.ovp'))
+    RandomTrace(trace, 500, 32, seed = 3)
+
+    fast = str(tmpdir.join('fast'))
+    reference = str(tmpdir.join('reference'))
+    GenerateApplicationProfile(trace, fast, parseProcesses = 0)
+    GenerateApplicationProfile(trace, reference, engine = "reference")
+    assert CompareProfiles(fast + ".h5", reference + ".h5") == []
+
+    with h5.File(reference + ".h5", 'a') as profile:
+        profile['loadProp'][0] += 0.5
+    assert CompareProfiles(fast + ".h5", reference + ".h5") == ['loadProp']
+
+def test_check_engines(tmpdir):
+    """ tests a small check of the engines passes"""
+    report = CheckEngines(str(tmpdir), numTraces = 2, traceAccesses = 1000, generateLength = 1000)
+
+    assert report['passed']
+    assert len(report['fits']) == 2
+
+def test_unknown_engine(tmpdir):
+    """ tests unknown engines & unsupported options are rejected"""
+    trace = str(tmpdir.join('trace.ovp'))
+    RandomTrace(trace, 100, 8, seed = 0)
+
+    with pytest.raises(ValueError):
+        GenerateApplicationProfile(trace, str(tmpdir.join('profile')), engine = "other")
+    with pytest.raises(ValueError):
+        GenerateApplicationProfile(trace, str(tmpdir.join('profile')), saveCounts = True, engine = "reference")
+    with pytest.raises(ValueError):
+        GenerateSyntheticTrace(str(tmpdir.join('out.stl')), 10, [], engine = "other")
@@ -0,0 +1,53 @@
+import pytest
+import numpy as np
+import h5py as h5
+from lib.Footprint import HyperLogLog, ExactCount, CountBlocks, ProfileMemory
+from ApplicationProfiler import GenerateApplicationProfile
+
+def test_hyper_log_log():
+    """ tests HyperLogLog estimates are close for small & large counts"""
+    for count in [10, 1000, 200000]:
+        sketch = HyperLogLog(12)
+        values = np.arange(count, dtype = np.int64) * 512
+        sketch.Add(values)
+        sketch.Add(values[:count / 2])
+        assert abs(sketch.Estimate() - count) <= max(1, 0.05 * count)
+
+    with pytest.raises(ValueError):
+        HyperLogLog(2)
+
+def test_count_blocks(tmpdir):
+    """ tests distinct blocks of a trace are counted"""
+    trace = str(tmpdir.join('trace.ovp'))
+    with open(trace, 'w') as file:
+        for i in xrange(3000):
+            file.write("r,0x%x\nidle\n" % ((i % 700) * 512 + i % 64))
+
+    assert CountBlocks(trace, 2**32 - 512, "exact", parseProcesses = 0) == 700
+    assert abs(CountBlocks(trace, 2**32 - 512, parseProcesses = 0) - 700) < 35
+
+    with pytest.raises(ValueError):
+        CountBlocks(trace, 2**32 - 512, "bitmap")
+
+@pytest.mark.parametrize("maxReuseDistance", [0, 50])
+def test_footprint_pass(tmpdir, maxReuseDistance):
+    """ tests a pre-pass does not change the profile & the memory budget
+        rejects large traces"""
+    trace = str(tmpdir.join('trace.ovp'))
+    with open(trace, 'w') as file:
+        for i in xrange(2000):
+            file.write("w,0x%x\n" % ((i * 7 % 300) * 512 + i % 128))
+
+    plain = str(tmpdir.join('plain'))
+    presized = str(tmpdir.join('presized'))
+    GenerateApplicationProfile(trace, plain, parseProcesses = 0, maxReuseDistance = maxReuseDistance)
+    GenerateApplicationProfile(trace, presized, parseProcesses = 0, footprintPass = "hll", \
+        maxReuseDistance = maxReuseDistance)
+
+    with h5.File(plain + '.h5', 'r') as a, h5.File(presized + '.h5', 'r') as b:
+        for name in a:
+            assert np.array_equal(a[name][()], b[name][()])
+
+    with pytest.raises(ValueError):
+        GenerateApplicationProfile(trace, plain, parseProcesses = 0, \
+            memoryBudget = ProfileMemory(100, 512, 3))
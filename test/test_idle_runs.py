@@ -0,0 +1,83 @@
+import pytest
+import numpy as np
+import h5py as h5
+import json
+from lib.ProfileSynthesis import SynthesizeProfile
+from lib.MissRatio import ReadAddresses
+from ApplicationProfiler import GenerateApplicationProfile
+from TraceGenerator import GenerateSyntheticTrace
+import lib.TraceFormats as TraceFormats
+
+def test_profile_idle_runs(tmpdir):
+    """ tests runs of inactive cycles profile the same as one line per
+        inactive cycle"""
+    runs = [3, 0, 1, 12, 0, 5, 2]
+    expanded = str(tmpdir.join('expanded.ovp'))
+    compressed = str(tmpdir.join('compressed.ovp'))
+    with open(expanded, 'w') as e, open(compressed, 'w') as c:
+        for i in xrange(70):
+            run = runs[i % len(runs)]
+            e.write("idle\n" * run)
+            if run:
+                c.write("i,%d\n" % run)
+            e.write("r,0x%x\n" % (i % 9 * 512))
+            c.write("r,0x%x\n" % (i % 9 * 512))
+
+    for trace in [expanded, compressed]:
+        GenerateApplicationProfile(trace, trace[:-4], parseProcesses = 0, windowSize = 30)
+
+    with h5.File(expanded[:-4] + '.h5', 'r') as a, h5.File(compressed[:-4] + '.h5', 'r') as b:
+        for name in a:
+            assert np.array_equal(a[name][()], b[name][()])
+
+    # phases count every cycle of a run
+    for trace in [expanded, compressed]:
+        with open(trace[:-4] + '_phases.json') as file:
+            cycles = [phase['cycles'] for phase in json.load(file)['phases']]
+        assert sum(cycles) == 70 + sum(runs) * 10
+
+def test_generate_idle_runs(tmpdir):
+    """ tests the generator writes runs of inactive cycles before accesses"""
+    name = str(tmpdir.join('profile'))
+    SynthesizeProfile(name, 16, [0.5, 0.5], activityMarkov = [[0.7, 0.3], [0.4, 0.6]])
+
+    traces = {}
+    for format in ['STL', 'OVP', 'Bin']:
+        traces[format] = str(tmpdir.join('trace.' + format))
+        np.random.seed(3)
+        GenerateSyntheticTrace(traces[format], 300, [name + '.h5'], [], getattr(TraceFormats, format), \
+            unbounded = True, idleRuns = format != 'STL')
+
+    # cycle of each access from the STL trace
+    with open(traces['STL']) as file:
+        cycles = [int(line.split(':')[0]) for line in file]
+
+    # cycles rebuilt from the idle runs of the OVP trace
+    rebuilt = []
+    cycle = -1
+    with open(traces['OVP']) as file:
+        for line in file:
+            if line.startswith('i,'):
+                cycle += int(line[2:])
+            else:
+                cycle += 1
+                rebuilt.append(cycle)
+    assert rebuilt == cycles
+
+    records = []
+    with open(traces['Bin'], 'rb') as file:
+        record = file.read(TraceFormats.binRecord.size)
+        while record:
+            records.append(TraceFormats.binRecord.unpack(record))
+            record = file.read(TraceFormats.binRecord.size)
+
+    idle = [(cycle, count) for cycle, accessType, count in records if accessType == TraceFormats.binIdle]
+    assert len(idle) == sum(1 for line in open(traces['OVP']) if line.startswith('i,'))
+    assert [cycle for cycle, accessType, address in records if accessType != TraceFormats.binIdle] == cycles
+    for cycle, count in idle:
+        assert cycle + count in cycles
+
+    assert len(list(ReadAddresses(traces['Bin'], 'Bin'))) == 300
+
+    with pytest.raises(ValueError):
+        GenerateSyntheticTrace(traces['STL'], 10, [name + '.h5'], idleRuns = True)
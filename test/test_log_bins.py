@@ -0,0 +1,70 @@
+import pytest
+import numpy as np
+import h5py as h5
+from lib.ProfileWriter import LogBinCounts
+from lib.PreProcessing import GetReuseBounds
+from lib.Equivalence import RandomTrace, CompareProfiles, TraceStatistics
+from ApplicationProfiler import GenerateApplicationProfile
+from TraceGenerator import GenerateSyntheticTrace
+
+def test_log_bin_counts():
+    """ tests long distances are summed into log-spaced buckets"""
+    reuseCount, loadCount, reuseBounds = LogBinCounts(range(1, 21), [1] * 20, 4)
+
+    assert reuseBounds.tolist() == [0, 1, 2, 3, 4, 8, 16, 19]
+    assert reuseCount.tolist() == [1, 2, 3, 4, 5, 6 + 7 + 8 + 9, sum(range(10, 18)), 18 + 19 + 20]
+    assert loadCount.tolist() == [1, 1, 1, 1, 1, 4, 8, 3]
+
+    # no distance past the exact ones
+    reuseCount, loadCount, reuseBounds = LogBinCounts([1, 2, 3], [0, 0, 0], 4)
+    assert reuseBounds.tolist() == [0, 1, 2]
+    assert reuseCount.tolist() == [1, 2, 3]
+
+def test_get_reuse_bounds():
+    """ tests bounds of profiles binned alike are mixed & others rejected"""
+    short = {'reuseBounds': np.array([0, 1, 2, 4, 6])}
+    long = {'reuseBounds': np.array([0, 1, 2, 4, 8, 11])}
+
+    assert GetReuseBounds([short, long]).tolist() == [0, 1, 2, 4, 8, 11]
+    assert GetReuseBounds([{}, {}]) is None
+
+    with pytest.raises(ValueError):
+        GetReuseBounds([short, {}])
+    with pytest.raises(ValueError):
+        GetReuseBounds([long, {'reuseBounds': np.array([0, 1, 2, 3, 6])}])
+
+def test_binned_profile(tmpdir):
+    """ tests binned profiles from every profiler agree & generate traces
+        with the profile's reuse distances"""
+    trace = str(tmpdir.join('trace.ovp'))
+    RandomTrace(trace, 4000, 300, seed = 2)
+
+    names = {}
+    for name, options in [('serial', {'parseProcesses': 0}), ('chunked', {'parallelChunks': 3}), \
+        ('reference', {'engine': "reference"})]:
+        names[name] = str(tmpdir.join(name))
+        GenerateApplicationProfile(trace, names[name], exactReuseDistances = 8, **options)
+    assert CompareProfiles(names['serial'] + ".h5", names['chunked'] + ".h5") == []
+    assert CompareProfiles(names['serial'] + ".h5", names['reference'] + ".h5") == []
+
+    with h5.File(names['serial'] + ".h5", 'r') as profile:
+        reuseBounds = profile['reuseBounds'][()]
+        assert len(profile['reusePMF']) == len(reuseBounds) < 20
+        assert reuseBounds[-1] == len(profile['workingSet'])
+
+    # same seed gives the same trace with both engines
+    for engine in ["fast", "reference"]:
+        np.random.seed(4)
+        try:
+            GenerateSyntheticTrace(str(tmpdir.join(engine + '.stl')), 3000, [names['serial'] + ".h5"], engine = engine)
+        except SystemExit:
+            pass
+    with open(str(tmpdir.join('fast.stl'))) as fast, open(str(tmpdir.join('reference.stl'))) as reference:
+        assert fast.read() == reference.read()
+
+    # long reuse distances are generated
+    reuse = TraceStatistics(str(tmpdir.join('fast.stl')), 512)['reuse']
+    assert reuse[5:].sum() > 0
+
+    with pytest.raises(ValueError):
+        GenerateApplicationProfile(trace, names['serial'], exactReuseDistances = 8, maxReuseDistance = 16)
@@ -0,0 +1,91 @@
+import pytest
+import numpy as np
+from lib.LRUStack import LRUStack
+from lib.MissRatio import MissRatioCurves, ReadAddresses
+
+def test_lru_stack():
+    """ tests LRUStack::Access returns reuse distances"""
+    s = LRUStack()
+
+    assert -1 == s.Access(1)
+    assert -1 == s.Access(2)
+    assert -1 == s.Access(3)
+
+    # 1 is at the bottom of the stack
+    assert 2 == s.Access(1)
+
+    # 1 moved to the top
+    assert 0 == s.Access(1)
+    assert 2 == s.Access(2)
+    assert len(s) == 3
+
+def test_lru_stack_cap():
+    """ tests blocks past the cap are dropped from the stack"""
+    s = LRUStack(maxDepth = 2)
+
+    assert -1 == s.Access(1)
+    assert -1 == s.Access(2)
+    assert -1 == s.Access(3)
+    assert len(s) == 2
+
+    # 1 was dropped
+    assert -1 == s.Access(1)
+    assert 1 == s.Access(3)
+    assert s.stack == [3, 1]
+
+    with pytest.raises(ValueError):
+        LRUStack(maxDepth = -1)
+
+def brute_force(addresses, blockSize, cacheBlocks):
+    """ simulates a fully-associative LRU cache directly"""
+    cache = []
+    misses = 0
+    for address in addresses:
+        block = address / blockSize
+        if block in cache:
+            cache.remove(block)
+        else:
+            misses += 1
+            if not cacheBlocks:
+                continue
+            if len(cache) == cacheBlocks:
+                cache.pop()
+        cache.insert(0, block)
+    return misses / float(len(addresses))
+
+def test_miss_ratios_match_simulation():
+    """ tests MissRatioCurves against a direct LRU cache simulation"""
+    np.random.seed(0)
+    addresses = (np.random.randint(0, 256, 2000) * 4).tolist()
+    blockSizes = [4, 16, 64]
+    cacheSizes = [16, 64, 256, 1024]
+
+    curves = MissRatioCurves(blockSizes)
+    for address in addresses:
+        curves.Access(address)
+
+    test = curves.MissRatios(cacheSizes)
+
+    for i in xrange(len(blockSizes)):
+        for j in xrange(len(cacheSizes)):
+            sol = brute_force(addresses, blockSizes[i], cacheSizes[j] / blockSizes[i])
+            assert abs(test[i, j] - sol) < 1e-12
+
+def test_read_addresses(tmpdir):
+    """ tests ReadAddresses for each text format"""
+    lines = {"OVP": "r,0x10\nidle\nw,0x2c\n", \
+        "Din": "0 0x10\n1 0x2c\n", \
+        "STL": "0: read 0x10\n3: write 0x2c 0xABCD\n"}
+
+    for traceFormat in lines:
+        trace = tmpdir.join(traceFormat)
+        trace.write(lines[traceFormat])
+        assert list(ReadAddresses(str(trace), traceFormat)) == [0x10, 0x2c]
+
+    with pytest.raises(ValueError):
+        list(ReadAddresses(str(trace), "bad"))
+
+def test_bad_block_size():
+    """ tests MissRatioCurves input validation"""
+    with pytest.raises(ValueError):
+        MissRatioCurves([4, 12])
@@ -0,0 +1,84 @@
+import pytest
+import numpy as np
+import h5py as h5
+from StringIO import StringIO
+from lib.ProfileSynthesis import SynthesizeProfile
+from TraceGenerator import GenerateMultiCoreTrace, GenerateSyntheticTrace
+from ApplicationProfiler import GenerateApplicationProfile
+from lib.Equivalence import CompareProfiles
+import lib.TraceFormats as TraceFormats
+
+def test_core_formats():
+    """ tests the core id prefixes each text format"""
+    trace = StringIO()
+    TraceFormats.CoreSTL(trace, 5, 2, 1, 0x40)
+    TraceFormats.CoreOVP(trace, 5, 2, 0, 0x40)
+    TraceFormats.CoreDin(trace, 5, 2, 1, 0x40)
+    assert trace.getvalue() == "2 5: write 0x40 0xABCD\n2,r,0x40\n2 1 0x40\n"
+
+def test_multi_core_trace(tmpdir):
+    """ tests core streams are merged by cycle with their offsets"""
+    profiles = []
+    for i in xrange(3):
+        name = str(tmpdir.join('core%d' % i))
+        SynthesizeProfile(name, 64, [0.5, 0.5], activityMarkov = [[1, i + 1], [1, 1]])
+        profiles.append(name + '.h5')
+
+    trace = str(tmpdir.join('trace.bin'))
+    GenerateMultiCoreTrace(trace, 50, profiles, [0, 2**32, 2**33], TraceFormats.CoreBin, \
+        numProcesses = 2, seed = 1)
+
+    records = []
+    with open(trace, 'rb') as file:
+        record = file.read(TraceFormats.binCoreRecord.size)
+        while len(record) == TraceFormats.binCoreRecord.size:
+            records.append(TraceFormats.binCoreRecord.unpack(record))
+            record = file.read(TraceFormats.binCoreRecord.size)
+
+    assert len(records) == 150
+    assert records == sorted(records)
+
+    for core in xrange(3):
+        addresses = [memAddress for cycle, c, accessType, memAddress in records if c == core]
+        assert len(addresses) == 50
+        assert all(core * 2**32 <= address < core * 2**32 + 64 * 512 for address in addresses)
+
+    with pytest.raises(ValueError):
+        GenerateMultiCoreTrace(trace, 50, profiles, [0])
+
+def test_multi_core_streams(tmpdir):
+    """ tests an OVP multi-core trace is profiled per core by the profiler's
+        stream demultiplexer"""
+    profiles = []
+    for i in xrange(2):
+        name = str(tmpdir.join('core%d' % i))
+        SynthesizeProfile(name, 32, [0.5, 0.5], activityMarkov = [[1, i + 1], [1, 1]])
+        profiles.append(name + '.h5')
+
+    trace = str(tmpdir.join('trace.ovp'))
+    GenerateMultiCoreTrace(trace, 200, profiles, [0, 2**32], TraceFormats.CoreOVP, numProcesses = 2, seed = 1)
+    output = str(tmpdir.join('mixed'))
+    GenerateApplicationProfile(trace, output, streamRegEx = "^(\d+),")
+
+    with open(trace) as file:
+        lines = file.readlines()
+
+    for core in xrange(2):
+        # the stream of each core on its own
+        single = str(tmpdir.join('single%d' % core))
+        with open(single + '.ovp', 'w') as file:
+            file.writelines(line.split(',', 1)[1] for line in lines if line.startswith('%d,' % core))
+        GenerateApplicationProfile(single + '.ovp', single, parseProcesses = 0)
+        assert CompareProfiles(single + '.h5', '%s_%d.h5' % (output, core)) == []
+
+        with h5.File('%s_%d.h5' % (output, core), 'r') as profile:
+            assert np.sum(profile['reusePMF']) > 0
+            assert all(address >> 32 == core for address in profile['workingSet'][()].tolist())
+
+def test_stuck_inactive(tmpdir):
+    """ tests a profile that never leaves an inactive cycle is rejected"""
+    name = str(tmpdir.join('stuck'))
+    SynthesizeProfile(name, 4, [0.5, 0.5], activityMarkov = [[1, 0], [1, 1]])
+
+    with pytest.raises(ValueError):
+        GenerateSyntheticTrace(str(tmpdir.join('trace.stl')), 10, [name + '.h5'])
@@ -0,0 +1,125 @@
+import pytest
+import numpy as np
+import h5py as h5
+import json
+from lib.AlphaTree import AlphaTree
+from lib.ProfileWriter import NormalizeAlphas
+from ApplicationProfiler import GenerateApplicationProfile
+from TraceGenerator import GeneratePhasedTrace, GenerateSyntheticTrace
+import lib.TraceFormats as TraceFormats
+
+def write_trace(name, patterns):
+    """ writes an OVP trace that loops over each list of block numbers in
+        patterns, with three inactive cycles between accesses"""
+    with open(name, 'w') as trace:
+        for blocks, repeats in patterns:
+            for i in xrange(repeats):
+                for block in blocks:
+                    trace.write("r,0x%x\n" % (block * 512))
+                    trace.write("idle\nidle\nidle\n")
+
+def test_normalize_alphas():
+    """ tests NormalizeAlphas matches AlphaTree.NormalizeReuseCount"""
+    np.random.seed(0)
+    counts = np.random.randint(0, 3, (5, 3, 7, 2)).astype(np.float)
+
+    test = counts.copy()
+    NormalizeAlphas(test)
+
+    for i in xrange(5):
+        a = AlphaTree()
+        a.reuseCount = counts[i].copy()
+        a.NormalizeReuseCount()
+        assert np.array_equal(test[i], a.reuseCount)
+
+def test_fixed_windows(tmpdir):
+    """ tests every window is saved as a phase"""
+    trace = str(tmpdir.join('trace.ovp'))
+    output = str(tmpdir.join('profile'))
+    write_trace(trace, [(range(10), 25)])
+
+    GenerateApplicationProfile(trace, output, windowSize = 100)
+
+    with open(output + '_phases.json') as file:
+        phases = json.load(file)['phases']
+
+    assert [phase['accesses'] for phase in phases] == [100, 100, 50]
+
+    # only the first phase has compulsory misses
+    with h5.File(str(tmpdir.join(phases[0]['profile'])), 'r') as profile:
+        assert np.isclose(profile['reusePMF'][0], 0.1)
+    with h5.File(str(tmpdir.join(phases[1]['profile'])), 'r') as profile:
+        assert profile['reusePMF'][0] == 0
+        assert np.isclose(profile['reusePMF'][10], 1.0)
+
+def test_auto_phases(tmpdir):
+    """ tests similar windows are merged into one phase"""
+    trace = str(tmpdir.join('trace.ovp'))
+    output = str(tmpdir.join('profile'))
+
+    # reuse distance 1 for 400 accesses, then 31 for 400 accesses
+    write_trace(trace, [(range(2), 200), (range(2, 34), 12)])
+
+    GenerateApplicationProfile(trace, output, windowSize = 50, phaseDetection = "auto")
+
+    with open(output + '_phases.json') as file:
+        phases = json.load(file)['phases']
+
+    # the first window of the second pattern holds its compulsory misses,
+    # so it may be split into a phase of its own
+    assert len(phases) in (2, 3)
+    assert phases[0]['accesses'] == 400
+    assert sum(phase['accesses'] for phase in phases) == 784
+
+    with h5.File(str(tmpdir.join(phases[-1]['profile'])), 'r') as profile:
+        assert len(profile['workingSet']) == 34
+        assert profile['reusePMF'][32] > 0.9
+
+def test_phased_generation(tmpdir):
+    """ tests phases are stitched in order with continuing cycles"""
+    trace = str(tmpdir.join('trace.ovp'))
+    output = str(tmpdir.join('profile'))
+    write_trace(trace, [(range(10), 25)])
+    GenerateApplicationProfile(trace, output, windowSize = 100)
+
+    synthetic = str(tmpdir.join('synthetic.stl'))
+    GeneratePhasedTrace(synthetic, 500, output + '_phases.json', TraceFormats.STL, 2, seed = 1)
+
+    with open(synthetic) as file:
+        cycles = [int(line.split(':')[0]) for line in file]
+
+    assert len(cycles) == 500
+    assert all(cycles[i] < cycles[i + 1] for i in xrange(len(cycles) - 1))
+
+def test_max_reuse_distance(tmpdir):
+    """ tests reuse distances past the cap are counted in the far bin"""
+    trace = str(tmpdir.join('trace.ovp'))
+    write_trace(trace, [(range(10), 5), (range(3), 10)])
+
+    exact = str(tmpdir.join('exact'))
+    capped = str(tmpdir.join('capped'))
+    GenerateApplicationProfile(trace, exact)
+    GenerateApplicationProfile(trace, capped, maxReuseDistance = 4, windowSize = 60)
+
+    with h5.File(exact + '.h5', 'r') as e, h5.File(capped + '.h5', 'r') as c:
+        assert c['maxReuseDistance'][()] == 4
+        assert len(c['reusePMF']) == 6
+        assert np.allclose(c['reusePMF'][:5], e['reusePMF'][:5])
+        assert np.isclose(c['reusePMF'][5], e['reusePMF'][5:].sum())
+        assert np.array_equal(c['workingSet'][:], e['workingSet'][:])
+
+        # far reuses have an alpha bin after the 3 exact bins
+        assert c['alphas'].shape[1] == 4
+
+    # phases are capped the same way
+    with open(capped + '_phases.json') as file:
+        phases = json.load(file)['phases']
+    with h5.File(str(tmpdir.join(phases[0]['profile'])), 'r') as profile:
+        assert len(profile['reusePMF']) == 6
+
+    # generation from the capped profile
+    output = str(tmpdir.join('trace.stl'))
+    np.random.seed(0)
+    GenerateSyntheticTrace(output, 200, [capped + '.h5'], unbounded = True)
+    with open(output) as file:
+        assert len(file.readlines()) == 200
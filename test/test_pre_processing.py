@@ -0,0 +1,88 @@
+import pytest
+import numpy as np
+import h5py as h5
+from lib.PreProcessing import MixAlphas, LoadProfile
+from lib.ProfileSynthesis import SynthesizeProfile
+from TraceGenerator import GenerateSyntheticTrace
+
+def naive_mix(alphaList, weights, wsSize):
+    """ mixes alphas the way BuildAlphaForest originally did"""
+    sol = np.zeros((wsSize,) + alphaList[0].shape[1:], dtype = np.float)
+    for i in xrange(len(alphaList)):
+        temp = np.array(alphaList[i])
+        temp.resize(sol.shape)
+        sol += temp * weights[i]
+    return sol
+
+def test_mix_alphas_chunked(make_profile):
+    """ tests MixAlphas with chunks smaller than any profile"""
+    np.random.seed(0)
+    alphaList = [np.random.rand(37, 3, 7, 2), np.random.rand(20, 3, 7, 2), \
+        np.random.rand(41, 3, 7, 2)]
+    weights = [1, 2, 0.5]
+    profiles = [make_profile('p%d.h5' % i, alphaList[i]) for i in xrange(3)]
+
+    sol = naive_mix(alphaList, weights, 41)
+
+    # budget of 3 rows per chunk
+    rowBytes = 3 * 7 * 2 * 8
+    test = MixAlphas(profiles, weights, 41, memoryBudget = 3 * rowBytes)
+    assert np.allclose(test, sol)
+
+    # single row chunks spread over threads
+    test = MixAlphas(profiles, weights, 41, memoryBudget = 4 * rowBytes, numThreads = 4)
+    assert np.allclose(test, sol)
+
+    # whole working set in one chunk
+    test = MixAlphas(profiles, weights, 41)
+    assert np.allclose(test, sol)
+
+def test_mix_alphas_bad_args(make_profile):
+    """ tests MixAlphas input validation"""
+    profiles = [make_profile('q0.h5', np.ones((4, 3, 7, 2))), \
+        make_profile('q1.h5', np.ones((4, 2, 7, 2)))]
+
+    with pytest.raises(ValueError):
+        MixAlphas(profiles, [1, 1], 4)
+
+    with pytest.raises(ValueError):
+        MixAlphas(profiles[:1], [1], 4, memoryBudget = 0)
+
+    with pytest.raises(ValueError):
+        MixAlphas(profiles[:1], [1], 4, numThreads = 0)
+
+def test_load_profile(tmpdir):
+    """ tests LoadProfile copies every dataset of a profile"""
+    name = str(tmpdir.join('profile.h5'))
+    alphas = np.random.rand(5, 3, 7, 2)
+    with h5.File(name, 'w') as profile:
+        profile.create_dataset('blockSize', data = 512)
+        profile.create_dataset('reusePMF', data = np.arange(6) / 15.0)
+        profile.create_dataset('alphas', data = alphas)
+
+    profile = LoadProfile(name)
+
+    assert sorted(profile.keys()) == ['alphas', 'blockSize', 'reusePMF']
+    assert profile['blockSize'][()] == 512
+    assert np.array_equal(profile['reusePMF'], np.arange(6) / 15.0)
+    assert np.array_equal(profile['alphas'], alphas)
+
+def test_mix_alphas_generator(tmpdir):
+    """ tests generating with alphas mixed up front from loaded profiles
+        matches mixing each block on first use"""
+    names = []
+    for i in xrange(2):
+        name = str(tmpdir.join('profile%d' % i))
+        SynthesizeProfile(name, 16, [0.3] + [0.7 / 16] * 16, alphas = 0.2 + 0.6 * i)
+        names.append(name + '.h5')
+
+    traces = [str(tmpdir.join('lazy.stl')), str(tmpdir.join('mixed.stl'))]
+
+    np.random.seed(3)
+    GenerateSyntheticTrace(traces[0], 100, names, [1, 2], unbounded = True)
+
+    np.random.seed(3)
+    GenerateSyntheticTrace(traces[1], 100, [LoadProfile(name) for name in names], [1, 2], \
+        unbounded = True, mixAlphas = True, mixMemoryBudget = 1000)
+
+    assert open(traces[0]).read() == open(traces[1]).read()
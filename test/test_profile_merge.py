@@ -0,0 +1,56 @@
+import pytest
+import numpy as np
+import h5py as h5
+from ApplicationProfiler import GenerateApplicationProfile
+from lib.ProfileWriter import LoadCounts
+from lib.ProfileMerge import MergeCounts, MergeShards, SaveMergedProfile
+
+def profile_shard(tmpdir, name, blocks, repeats):
+    """ profiles a trace looping over blocks & returns its counts file"""
+    trace = str(tmpdir.join(name + '.ovp'))
+    with open(trace, 'w') as file:
+        for i in xrange(repeats):
+            for block in blocks:
+                file.write("r,0x%x\nidle\n" % (block * 512 + i * 4))
+    output = str(tmpdir.join(name))
+    GenerateApplicationProfile(trace, output, parseProcesses = 0, saveCounts = True)
+    return output
+
+def test_counts_round_trip(tmpdir):
+    """ tests a profile saved from one shard's counts matches the profile"""
+    shard = profile_shard(tmpdir, 'shard', range(5), 4)
+    merged = str(tmpdir.join('merged'))
+    SaveMergedProfile(merged, MergeShards([shard + '_counts.h5']))
+
+    with h5.File(shard + '.h5', 'r') as a, h5.File(merged + '.h5', 'r') as b:
+        for name in a:
+            assert np.array_equal(a[name][()], b[name][()])
+
+def test_merge_counts(tmpdir):
+    """ tests counts are summed and blocks matched by address"""
+    a = profile_shard(tmpdir, 'a', [0, 1, 2], 4)
+    b = profile_shard(tmpdir, 'b', [2, 3], 5)
+    first = LoadCounts(a + '_counts.h5')
+    second = LoadCounts(b + '_counts.h5')
+
+    merged = MergeCounts(first, second)
+    assert merged['workingSet'].tolist() == [0, 512, 1024, 1536]
+    assert merged['reuseCount'].tolist() == [5, 0, 8, 9]
+    assert np.array_equal(merged['activityCount'], first['activityCount'] + second['activityCount'])
+    assert np.array_equal(merged['alphaCounts'][2], first['alphaCounts'][2] + second['alphaCounts'][0])
+    assert np.array_equal(merged['alphaCounts'][3], second['alphaCounts'][1])
+
+def test_tree_reduction(tmpdir):
+    """ tests the parallel tree reduction matches merging in order"""
+    shards = [profile_shard(tmpdir, 's%d' % i, range(i, i + 3), i + 2) + '_counts.h5' for i in xrange(5)]
+
+    serial = LoadCounts(shards[0])
+    for shard in shards[1:]:
+        serial = MergeCounts(serial, shard)
+
+    merged = MergeShards(shards, numProcesses = 2)
+    for name in serial:
+        assert np.array_equal(np.asarray(serial[name]), np.asarray(merged[name]))
+
+    with pytest.raises(ValueError):
+        MergeShards([])
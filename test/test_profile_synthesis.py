@@ -0,0 +1,63 @@
+import pytest
+import numpy as np
+import h5py as h5
+from lib.ProfileSynthesis import ReusePMF, SynthesizeProfile
+from lib.AlphaForest import AlphaForest
+
+def test_reuse_pmf_families():
+    """ tests ReusePMF for each distribution family"""
+    pmf = ReusePMF(4, "geometric", [0.5], missRate = 0.2)
+    sol = np.array([0.2, 8, 4, 2, 1]) * np.array([1, 0.8 / 15, 0.8 / 15, 0.8 / 15, 0.8 / 15])
+    assert np.allclose(pmf, sol)
+
+    pmf = ReusePMF(3, "zipf", [1], missRate = 0)
+    assert np.allclose(pmf, np.array([0, 1, 0.5, 1 / 3.0]) / (11 / 6.0))
+
+    pmf = ReusePMF(5, "uniform", missRate = 0.5)
+    assert np.allclose(pmf, [0.5, 0.1, 0.1, 0.1, 0.1, 0.1])
+
+    with pytest.raises(ValueError):
+        ReusePMF(5, "normal")
+
+    with pytest.raises(ValueError):
+        ReusePMF(5, "geometric", [2])
+
+def test_synthesize_profile(tmpdir):
+    """ tests SynthesizeProfile writes the layout read by the generator"""
+    name = str(tmpdir.join('synth'))
+    SynthesizeProfile(name, 10, [0.1, 0.5, 0.4], loadProp = [0.5, 0.7], \
+        activityMarkov = [[1, 1], [1, 3]], alphas = [0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7], \
+        baseAddress = 4096, chunkRows = 3)
+
+    with h5.File(name + '.h5', 'r') as profile:
+        assert profile['blockSize'][()] == 512
+        assert np.array_equal(profile['workingSet'], 4096 + np.arange(10) * 512)
+        assert np.allclose(profile['reusePMF'], [0.1, 0.5, 0.4] + [0] * 8)
+        assert np.allclose(profile['loadProp'], [0.5] + [0.7] * 10)
+        assert np.allclose(profile['activityMarkov'], [[0.5, 0.5], [0.25, 0.75]])
+        assert profile['alphas'].shape == (10, 3, 7, 2)
+
+        # every block has the same alphas in every bin
+        alphas = np.asarray(profile['alphas'])
+        assert np.allclose(alphas[:, :, :, 1], np.arange(1, 8) / 10.0)
+        assert np.allclose(alphas.sum(axis = 3), 1)
+
+        # alphas load into trees unchanged
+        forest = AlphaForest([profile], [1], 10, 512)
+        assert np.allclose(forest[9].reuseCount, alphas[9])
+
+def test_synthesize_bad_args(tmpdir):
+    """ tests SynthesizeProfile input validation"""
+    name = str(tmpdir.join('bad'))
+
+    with pytest.raises(ValueError):
+        SynthesizeProfile(name, 2, [0.1, 0.2, 0.3, 0.4])
+
+    with pytest.raises(ValueError):
+        SynthesizeProfile(name, 2, [1], alphas = [0.5, 0.5])
+
+    with pytest.raises(ValueError):
+        SynthesizeProfile(name, 2, [1], activityMarkov = [[0, 0], [0, 1]])
+
+    with pytest.raises(ValueError):
+        SynthesizeProfile(name, 2, [1], baseAddress = 100)
@@ -0,0 +1,53 @@
+import pytest
+import json
+from lib.RunStats import RunStats
+
+def test_sampling_and_report(tmpdir):
+    """ tests RunStats samples every sampleRate-th iteration and saves the
+        stages, counters and depth stats"""
+    statsFile = str(tmpdir.join('stats.json'))
+    stats = RunStats("test", statsFile, sampleRate = 4, progressInterval = 0)
+
+    sampled = 0
+    for i in xrange(20):
+        if stats.Sample():
+            sampled += 1
+            stats.Mark('first')
+            stats.Mark('second')
+            stats.Depth(i)
+
+    assert sampled == 5
+    assert stats.Iterations() == 20
+
+    result = stats.Finish(accesses = 20)
+
+    with open(statsFile) as file:
+        saved = json.load(file)
+
+    assert saved['cycles'] == 20
+    assert saved['counters'] == {'accesses': 20}
+    assert saved['stages']['first']['samples'] == 5
+    assert saved['stages']['second']['samples'] == 5
+
+    # sampled depths are 3, 7, 11, 15, 19
+    assert saved['lruDepth']['max'] == 19
+    assert saved['lruDepth']['mean'] == 11.0
+    assert saved['lruDepth']['log2Histogram'] == {'2': 1, '3': 1, '4': 2, '5': 1}
+    assert result['rates']['accessesPerSecond'] > 0
+
+def test_bad_sample_rate(tmpdir):
+    """ tests RunStats input validation"""
+    with pytest.raises(ValueError):
+        RunStats("test", str(tmpdir.join('stats.json')), sampleRate = 0)
+
+def test_waits(tmpdir):
+    """ tests every wait is totaled, not sampled"""
+    statsFile = str(tmpdir.join('stats.json'))
+    stats = RunStats("test", statsFile, sampleRate = 100, progressInterval = 0)
+
+    for i in xrange(3):
+        stats.Wait('parse', 0.5)
+
+    result = stats.Finish()
+    assert result['waits']['parse']['count'] == 3
+    assert result['waits']['parse']['seconds'] == 1.5
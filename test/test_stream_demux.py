@@ -0,0 +1,48 @@
+import pytest
+import re
+import numpy as np
+from lib.StreamDemux import SplitStreams
+from lib.Equivalence import RandomTrace, CompareProfiles
+from ApplicationProfiler import GenerateApplicationProfile
+
+def test_split_streams():
+    """ tests lines are split by stream id & untagged lines go to every
+        stream seen so far"""
+    streamIds = []
+    streams = SplitStreams("0,r,0x10\nidle\n1,w,0x20\n0,i,3\nidle\n", re.compile("^(\d+),"), streamIds)
+
+    assert streamIds == ['0', '1']
+    assert streams == {'0': "r,0x10\nidle\ni,3\nidle\n", '1': "w,0x20\nidle\n"}
+
+    streams = SplitStreams("idle\n", re.compile("^(\d+),"), streamIds)
+    assert streams == {'0': "idle\n", '1': "idle\n"}
+
+def test_stream_profiles(tmpdir):
+    """ tests each stream's profile is the profile of the stream alone"""
+    random = np.random.RandomState(0)
+    streams = []
+    for i in xrange(3):
+        trace = str(tmpdir.join('stream%d.ovp' % i))
+        RandomTrace(trace, 500 + 200 * i, 32, seed = i)
+        with open(trace) as file:
+            streams.append(file.readlines())
+
+    # interleave the streams
+    mixed = str(tmpdir.join('mixed.ovp'))
+    with open(mixed, 'w') as file:
+        positions = [0] * 3
+        while any(positions[i] < len(streams[i]) for i in xrange(3)):
+            i = random.randint(3)
+            if positions[i] < len(streams[i]):
+                file.write("cpu%d %s" % (i, streams[i][positions[i]]))
+                positions[i] += 1
+
+    output = str(tmpdir.join('mixed'))
+    GenerateApplicationProfile(mixed, output, streamRegEx = "^cpu(\d+) ", readSize = 1000)
+    for i in xrange(3):
+        single = str(tmpdir.join('single%d' % i))
+        GenerateApplicationProfile(str(tmpdir.join('stream%d.ovp' % i)), single, parseProcesses = 0)
+        assert CompareProfiles(single + ".h5", "%s_%d.h5" % (output, i)) == []
+
+    with pytest.raises(ValueError):
+        GenerateApplicationProfile(mixed, output, streamRegEx = "^cpu(\d+) ", maxStreams = 2)
@@ -0,0 +1,61 @@
+import pytest
+import numpy as np
+from lib.TracePipeline import ParseChunk, AccessBatches
+from lib.RunStats import RunStats
+from lib.TraceFormats import binIdle
+
+def test_parse_chunk():
+    """ tests lines are parsed into addresses & types"""
+    memAddresses, accessTypes = ParseChunk("r,0x10\nidle\nw,0xff\n\nr,0x4")
+    assert memAddresses.tolist() == [16, 1, 255, 1, 4]
+    assert accessTypes.tolist() == [0, binIdle, 1, binIdle, 0]
+
+    # runs of inactive cycles
+    memAddresses, accessTypes = ParseChunk("i,7\nr,0x10\ni,1\n")
+    assert memAddresses.tolist() == [7, 16, 1]
+    assert accessTypes.tolist() == [binIdle, 0, binIdle]
+
+@pytest.mark.parametrize("parseProcesses", [0, 2])
+def test_access_batches(tmpdir, parseProcesses):
+    """ tests batches cover every line in order for small reads"""
+    trace = str(tmpdir.join('trace.ovp'))
+    lines = []
+    for i in xrange(500):
+        lines.append("w,0x%x" % (i * 4) if i % 3 else "idle")
+    with open(trace, 'w') as file:
+        file.write('\n'.join(lines) + '\n')
+
+    memAddresses = []
+    for batch, types in AccessBatches(trace, readSize = 37, queueDepth = 2, parseProcesses = parseProcesses):
+        memAddresses.extend(np.where(types == binIdle, -1, batch.astype(np.int64)).tolist())
+
+    assert memAddresses == [i * 4 if i % 3 else -1 for i in xrange(500)]
+
+def test_access_batches_errors(tmpdir):
+    """ tests errors in the background stages are raised by the consumer
+        and stopping early shuts the stages down"""
+    with pytest.raises(IOError):
+        list(AccessBatches(str(tmpdir.join('missing.ovp'))))
+
+    trace = str(tmpdir.join('bad.ovp'))
+    with open(trace, 'w') as file:
+        file.write("r,0x10\nx,0x20\n")
+    with pytest.raises(KeyError):
+        list(AccessBatches(trace, parseProcesses = 0))
+
+    with open(trace, 'w') as file:
+        file.write("r,0x10\n" * 1000)
+    batches = AccessBatches(trace, readSize = 10, queueDepth = 1)
+    next(batches)
+    batches.close()
+
+def test_parse_wait_stats(tmpdir):
+    """ tests the wait for each batch is recorded"""
+    trace = str(tmpdir.join('trace.ovp'))
+    with open(trace, 'w') as file:
+        file.write("r,0x10\n" * 100)
+
+    stats = RunStats("test", str(tmpdir.join('stats.json')), progressInterval = 0)
+    batches = list(AccessBatches(trace, readSize = 70, parseProcesses = 0, stats = stats))
+
+    assert stats.waitCount['parse'] == len(batches)
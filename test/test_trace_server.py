@@ -0,0 +1,79 @@
+import pytest
+import numpy as np
+import threading
+import time
+import os
+from lib.ProfileSynthesis import SynthesizeProfile
+import lib.PreProcessing as PreProc
+from TraceGenerator import GenerateSyntheticTrace
+from TraceServer import MixtureCache, Serve, RequestTrace
+
+def test_build_mixture(tmpdir):
+    """ tests a mixture generates the same trace as its profiles"""
+    names = []
+    for i in xrange(2):
+        names.append(str(tmpdir.join('p%d' % i)))
+        SynthesizeProfile(names[-1], 8, [0.1] + [0.9 / (i + 1)] * (i + 1), loadProp = 0.5 * i)
+    profiles = [PreProc.LoadProfile(name + '.h5') for name in names]
+
+    mixture = PreProc.BuildMixture(profiles, [1, 3])
+    traces = []
+    for appProfiles, weights in [(profiles, [1, 3]), ([mixture], [])]:
+        path = str(tmpdir.join('trace%d.stl' % len(traces)))
+        np.random.seed(0)
+        GenerateSyntheticTrace(path, 200, appProfiles, weights, unbounded = True)
+        with open(path) as file:
+            traces.append(file.read())
+
+    assert traces[0] == traces[1]
+
+def test_mixture_cache(tmpdir):
+    """ tests mixtures are reused & the least recently used are dropped"""
+    names = []
+    for i in xrange(3):
+        names.append(str(tmpdir.join('p%d' % i)) + '.h5')
+        SynthesizeProfile(names[-1][:-3], 16, [0.5, 0.5])
+
+    cache = MixtureCache()
+    mixture, cached = cache.Get([names[0]])
+    assert not cached
+    assert cache.Get([names[0]]) == (mixture, True)
+
+    # room for two mixtures
+    cache.memoryBudget = 2 * cache.size
+    cache.Get([names[1]])
+    cache.Get([names[0]])
+    cache.Get([names[2]])
+    assert cache.mixtures.keys() == [((names[0],), ()), ((names[2],), ())]
+
+def test_server(tmpdir):
+    """ tests concurrent requests are served and shutdown stops the server"""
+    name = str(tmpdir.join('profile'))
+    SynthesizeProfile(name, 32, [0.2, 0.8])
+    path = str(tmpdir.join('server.sock'))
+
+    server = threading.Thread(target = Serve, args = (path, 2, 2**20, [[name + '.h5']]))
+    server.start()
+    while not os.path.exists(path):
+        time.sleep(0.01)
+
+    replies = [None] * 4
+    def request(i):
+        replies[i] = RequestTrace(path, {'traceFile': str(tmpdir.join('trace%d.stl' % i)), \
+            'traceLength': 100, 'appProfiles': [name + '.h5'], 'seed': i % 2, 'unbounded': True})
+
+    clients = [threading.Thread(target = request, args = (i,)) for i in xrange(4)]
+    for client in clients:
+        client.start()
+    for client in clients:
+        client.join()
+
+    assert RequestTrace(path, {'traceFile': 'x', 'traceLength': 1, 'appProfiles': ['missing.h5']})['status'] == 'error'
+    assert RequestTrace(path, {'command': 'shutdown'})['status'] == 'ok'
+    server.join()
+    assert not os.path.exists(path)
+
+    assert all(reply['status'] == 'ok' and reply['cached'] for reply in replies)
+    traces = [open(str(tmpdir.join('trace%d.stl' % i))).read() for i in xrange(4)]
+    assert len(traces[0].splitlines()) == 100
+    assert traces[0] == traces[2] and traces[1] == traces[3]
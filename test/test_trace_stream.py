@@ -0,0 +1,132 @@
+import pytest
+import socket
+import struct
+import threading
+import os
+import numpy as np
+from lib.TraceStream import OpenTrace, TraceStream, AsyncWriter
+from lib.RunStats import RunStats
+from lib.ProfileSynthesis import SynthesizeProfile
+from TraceGenerator import GenerateSyntheticTrace
+
+def read_exactly(conn, size):
+    """ reads size bytes from a socket"""
+    data = ""
+    while len(data) < size:
+        chunk = conn.recv(size - len(data))
+        assert chunk
+        data += chunk
+    return data
+
+def test_socket_windowed(tmpdir):
+    """ tests framed batches and acknowledgements over a unix socket"""
+    path = str(tmpdir.join('trace.sock'))
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(path)
+    server.listen(1)
+
+    batches = []
+
+    def consume():
+        conn = server.accept()[0]
+        while True:
+            records, size = struct.unpack("<II", read_exactly(conn, 8))
+            if not records:
+                break
+            batches.append((records, read_exactly(conn, size)))
+            conn.sendall(struct.pack("<I", 1))
+        conn.close()
+
+    consumer = threading.Thread(target = consume)
+    consumer.start()
+
+    stream = OpenTrace("unix:" + path, batchSize = 3, window = 2)
+    for i in xrange(10):
+        stream.write("%d\n" % i)
+    stream.close()
+
+    consumer.join()
+    server.close()
+
+    assert [records for records, payload in batches] == [3, 3, 3, 1]
+    assert "".join(payload for records, payload in batches) == \
+        "".join("%d\n" % i for i in xrange(10))
+
+def test_fifo_raw(tmpdir):
+    """ tests a raw stream written to an existing named pipe"""
+    path = str(tmpdir.join('trace.fifo'))
+    os.mkfifo(path)
+
+    received = []
+
+    def consume():
+        with open(path, 'rb') as pipe:
+            received.append(pipe.read())
+
+    consumer = threading.Thread(target = consume)
+    consumer.start()
+
+    stream = OpenTrace(path, batchSize = 4)
+    assert isinstance(stream, TraceStream)
+    for i in xrange(10):
+        stream.write("r,0x%x\n" % i)
+    stream.close()
+
+    consumer.join()
+
+    assert received[0] == "".join("r,0x%x\n" % i for i in xrange(10))
+
+def test_regular_file(tmpdir):
+    """ tests regular files are opened as files"""
+    path = str(tmpdir.join('trace.txt'))
+    trace = OpenTrace(path)
+    assert isinstance(trace, file)
+    trace.close()
+
+def test_bad_args(tmpdir):
+    """ tests TraceStream input validation"""
+    with pytest.raises(ValueError):
+        TraceStream(str(tmpdir.join('x')), True, batchSize = 0)
+
+    with pytest.raises(ValueError):
+        TraceStream(str(tmpdir.join('x')), True, window = -1)
+
+def test_async_writer(tmpdir):
+    """ tests the background writer writes every record in order and
+        records its waits"""
+    path = str(tmpdir.join('trace.txt'))
+    stats = RunStats("test", str(tmpdir.join('stats.json')), progressInterval = 0)
+    trace = OpenTrace(path, writeBuffers = 2, writeBufferSize = 64, stats = stats)
+    assert isinstance(trace, AsyncWriter)
+
+    for i in xrange(1000):
+        trace.write("r,0x%x\n" % i)
+    trace.flush()
+    assert os.path.getsize(path) == len("".join("r,0x%x\n" % i for i in xrange(1000)))
+
+    trace.write("idle\n")
+    trace.close()
+
+    with open(path) as file:
+        assert file.read() == "".join("r,0x%x\n" % i for i in xrange(1000)) + "idle\n"
+
+    assert stats.waitCount['writer'] > 0
+
+    with pytest.raises(ValueError):
+        AsyncWriter(open(path, 'wb'), numBuffers = 1)
+
+def test_async_writer_generator(tmpdir):
+    """ tests the generator's output is unchanged by the background writer"""
+    name = str(tmpdir.join('profile'))
+    SynthesizeProfile(name, 16, [0.5, 0.5])
+
+    traces = []
+    for writeBuffers in [0, 3]:
+        path = str(tmpdir.join('trace%d.stl' % writeBuffers))
+        np.random.seed(0)
+        GenerateSyntheticTrace(path, 500, [name + '.h5'], unbounded = True, \
+            writeBuffers = writeBuffers, writeBufferSize = 100)
+        with open(path) as file:
+            traces.append(file.read())
+
+    assert traces[0] == traces[1]
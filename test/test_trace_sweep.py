@@ -0,0 +1,110 @@
+import pytest
+import numpy as np
+import ConfigParser
+import subprocess
+import sys
+import os
+from lib.ProfileSynthesis import SynthesizeProfile
+from TraceSweep import ReadJobs, BuildGrid, RunSweep
+
+def write_config(name, text):
+    """ writes a sweep config & returns the parser reading it"""
+    with open(name, 'w') as file:
+        file.write(text)
+
+    config = ConfigParser.RawConfigParser()
+    config.read(name)
+    return config
+
+def test_read_jobs(tmpdir):
+    """ tests generator sections & the grid are read as jobs with their
+        file names filled in"""
+    config = write_config(str(tmpdir.join('sweep.ini')), \
+        "[generator.a]\ntraceFile = a.din\ntraceLength = 10\nappProfiles = [\"a.h5\"]\n" \
+        "formatAccess = Din\nseed = 4\n\n" \
+        "[sweep]\ntraceFile = out_{job}_{traceLength}.{formatAccess}\n" \
+        "appProfiles = [[\"a.h5\"],[\"a.h5\",\"b.h5\"]]\ntraceLength = [5,50]\n" \
+        "formatAccess = [\"STL\"]\n")
+
+    assert len(BuildGrid(config)) == 4
+
+    jobs = ReadJobs(config)
+    assert len(jobs) == 5
+    assert jobs[0] == {'traceFile': 'a.din', 'traceLength': 10, 'appProfiles': ['a.h5'], \
+        'weights': [], 'formatAccess': 'Din', 'seed': 4, 'options': {}}
+    assert [job['traceFile'] for job in jobs[1:]] == \
+        ['out_1_5.STL', 'out_2_50.STL', 'out_3_5.STL', 'out_4_50.STL']
+    assert jobs[4]['appProfiles'] == ['a.h5', 'b.h5']
+    assert jobs[4]['seed'] is None
+
+    config = write_config(str(tmpdir.join('bad.ini')), \
+        "[generator]\ntraceFile = a\ntraceLength = 1\nappProfiles = []\nformatAccess = Hex\n")
+    with pytest.raises(KeyError):
+        ReadJobs(config)
+
+def test_read_options(tmpdir):
+    """ tests the other generator options are passed through & options
+        the sweep does not run are rejected"""
+    config = write_config(str(tmpdir.join('sweep.ini')), \
+        "[generator]\ntraceFile = a_{job}\ntraceLength = 10\nappProfiles = [\"a.h5\"]\n" \
+        "unbounded = True\nmaxWorkingSet = 64\nbaseAddress = 0x1000\nregionGap = 4096\n" \
+        "statsFile = stats_{job}.json\nprogressInterval = 0.5\nengine = reference\nwarmStart = no\n")
+
+    assert ReadJobs(config)[0]['options'] == {'unbounded': True, 'maxWorkingSet': 64, \
+        'addressLayout': {'baseAddress': 0x1000, 'regionGap': 4096}, 'statsFile': 'stats_0.json', \
+        'progressInterval': 0.5, 'engine': 'reference', 'warmStart': False}
+
+    for option in ["phases = a_phases.json", "coreProfiles = [\"a.h5\"]", "tracelen = 5"]:
+        config = write_config(str(tmpdir.join('bad.ini')), \
+            "[generator]\ntraceFile = a\ntraceLength = 1\nappProfiles = []\n%s\n" % option)
+        with pytest.raises(ValueError):
+            ReadJobs(config)
+
+def test_run_sweep(tmpdir):
+    """ tests jobs write their traces and failures are reported"""
+    profile = str(tmpdir.join('profile'))
+    SynthesizeProfile(profile, 8, [0.5, 0.5])
+
+    # profile that never leaves an inactive cycle is rejected
+    stuck = str(tmpdir.join('stuck'))
+    SynthesizeProfile(stuck, 8, [0.5, 0.5], activityMarkov = [[1, 0], [1, 1]])
+
+    # profile with inactive cycles
+    idle = str(tmpdir.join('idle'))
+    SynthesizeProfile(idle, 8, [0.5, 0.5], activityMarkov = [[1, 1], [1, 1]])
+
+    jobs = [{'traceFile': str(tmpdir.join('ok.din')), 'traceLength': 6, \
+        'appProfiles': [profile + '.h5'], 'weights': [], 'formatAccess': 'Din', 'seed': 1, 'options': {}}, \
+        {'traceFile': str(tmpdir.join('stuck.din')), 'traceLength': 6, \
+        'appProfiles': [stuck + '.h5'], 'weights': [], 'formatAccess': 'Din', 'seed': 1, 'options': {}}, \
+        {'traceFile': str(tmpdir.join('runs.ovp')), 'traceLength': 6, \
+        'appProfiles': [idle + '.h5'], 'weights': [], 'formatAccess': 'OVP', 'seed': 1, \
+        'options': {'idleRuns': True}}]
+
+    results = RunSweep(jobs, 2)
+
+    assert results[0][1] is None
+    assert len(open(jobs[0]['traceFile']).readlines()) == 6
+    assert results[1][1].startswith("ValueError")
+
+    # options reach the generator
+    assert results[2][1] is None
+    lines = open(jobs[2]['traceFile']).read().split()
+    assert 'idle' not in lines and any(line.startswith('i,') for line in lines)
+
+    with pytest.raises(ValueError):
+        RunSweep([])
+
+def test_sweep_exit_status(tmpdir):
+    """ tests the script exits with an error when a job fails"""
+    script = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'TraceSweep.py')
+
+    for inactive, status in [(1, 0), (0, 1)]:
+        profile = str(tmpdir.join('profile%d' % inactive))
+        SynthesizeProfile(profile, 8, [0.5, 0.5], activityMarkov = [[1, inactive], [1, 1]])
+
+        config = str(tmpdir.join('sweep%d.ini' % inactive))
+        write_config(config, "[generator]\ntraceFile = %s\ntraceLength = 6\n" \
+            "appProfiles = [\"%s.h5\"]\nseed = 2\n" % (tmpdir.join('out.stl'), profile))
+
+        assert subprocess.call([sys.executable, script, config], stdout = open(os.devnull, 'w')) == status
@@ -0,0 +1,129 @@
+import pytest
+import numpy as np
+import h5py as h5
+import re
+from ApplicationProfiler import GenerateApplicationProfile
+from TraceGenerator import GenerateSyntheticTrace
+from lib.AlphaTree import AlphaTree
+from lib.ProfileWriter import PackTreeState
+from lib.ProfileMerge import MergeShards, SaveMergedProfile
+from lib.Equivalence import CompareProfiles
+import lib.PreProcessing as PreProc
+
+def write_trace(trace):
+    """ writes a trace over blocks 0 - 7 that ends by hammering one word of
+        block 5 after block 2"""
+    with open(trace, 'w') as file:
+        for i in xrange(40):
+            file.write("r,0x%x\ni,3\n" % ((i * 3 % 8) * 512 + i * 4 % 512))
+        file.write("w,0x%x\n" % (2 * 512))
+        for i in xrange(200):
+            file.write("w,0x%x\ni,3\n" % (5 * 512 + 0xbc))
+
+def test_pack_tree_state():
+    """ tests tree flags round trip through the packed bits"""
+    tree = AlphaTree(64, 1)
+    tree.ProcessAccess(0x24, 0)
+    packed = PackTreeState([tree.tree, np.zeros(31, dtype = np.bool)])
+
+    assert packed.shape == (2, 4)
+    assert np.array_equal(np.unpackbits(packed[0])[:31].astype(np.bool), tree.tree)
+    assert not packed[1].any()
+
+@pytest.mark.parametrize("maxReuseDistance", [0, 3])
+def test_saved_state(tmpdir, maxReuseDistance):
+    """ tests the profile saves the final LRU order & tree flags, the same
+        for every engine"""
+    trace = str(tmpdir.join('trace.ovp'))
+    write_trace(trace)
+
+    output = str(tmpdir.join('fast'))
+    GenerateApplicationProfile(trace, output, parseProcesses = 0, maxReuseDistance = maxReuseDistance)
+    with h5.File(output + '.h5', 'r') as profile:
+        workingSet = profile['workingSet'][()].tolist()
+        lruOrder = [workingSet[i] / 512 for i in profile['lruOrder'][()]]
+        assert lruOrder == [5, 2, 7, 4, 1, 6, 3, 0][:maxReuseDistance or 8]
+
+        # blocks deeper than the cap follow in order of first access
+        lruOrder, treeState = PreProc.GetWarmState([profile])
+        expected = [5, 2, 7, 0, 3, 6, 1, 4] if maxReuseDistance else [5, 2, 7, 4, 1, 6, 3, 0]
+        assert [workingSet[i] / 512 for i in lruOrder] == expected
+
+    for engine, parallelChunks in [("reference", 0), ("fast", 3)]:
+        other = str(tmpdir.join(engine + str(parallelChunks)))
+        GenerateApplicationProfile(trace, other, maxReuseDistance = maxReuseDistance, engine = engine, \
+            parallelChunks = parallelChunks, chunkProcesses = 2)
+        assert CompareProfiles(output + '.h5', other + '.h5') == []
+
+def test_merged_state(tmpdir):
+    """ tests the state of merged shards is the second shard's on top"""
+    shards = []
+    for i, blocks in enumerate([[0, 1, 2, 3], [5, 1]]):
+        trace = str(tmpdir.join('shard%d.ovp' % i))
+        with open(trace, 'w') as file:
+            for block in blocks * 3:
+                file.write("r,0x%x\n" % (block * 512 + i * 8))
+        GenerateApplicationProfile(trace, trace[:-4], parseProcesses = 0, saveCounts = True)
+        shards.append(trace[:-4] + '_counts.h5')
+
+    merged = MergeShards(shards, numProcesses = 1)
+    assert merged['workingSet'][merged['lruOrder']].tolist() == [512, 5 * 512, 3 * 512, 1024, 0]
+
+    second = str(tmpdir.join('shard1.h5'))
+    with h5.File(second, 'r') as profile:
+        assert np.array_equal(merged['treeState'][[4, 1]], profile['treeState'][()])
+
+    SaveMergedProfile(str(tmpdir.join('merged')), merged)
+    with h5.File(str(tmpdir.join('merged.h5')), 'r') as profile:
+        assert np.array_equal(profile['lruOrder'][()], merged['lruOrder'])
+
+def first_accesses(trace, count):
+    """ returns the addresses of the first accesses of an STL trace"""
+    with open(trace) as file:
+        return [int(match.group(1), 16) for match in re.finditer("0x([0-9a-f]+)", file.read())][:count]
+
+@pytest.mark.parametrize("unbounded", [False, True])
+def test_warm_start(tmpdir, unbounded):
+    """ tests a warm trace starts where the profiled trace ended and is not
+        limited by the working set"""
+    trace = str(tmpdir.join('trace.ovp'))
+    write_trace(trace)
+    profile = str(tmpdir.join('profile'))
+    GenerateApplicationProfile(trace, profile, parseProcesses = 0)
+
+    # a cold trace uses up the 8 blocks of the working set
+    if not unbounded:
+        with pytest.raises(SystemExit):
+            GenerateSyntheticTrace(str(tmpdir.join('cold.stl')), 500, [profile + '.h5'])
+
+    # the profiled trace ends reusing one word of block 5, which a warm
+    # stack & tree give straight away
+    warm = str(tmpdir.join('warm.stl'))
+    np.random.seed(0)
+    GenerateSyntheticTrace(warm, 500, [profile + '.h5'], unbounded = unbounded, warmStart = True)
+    accesses = first_accesses(warm, 500)
+    assert len(accesses) == 500
+    assert accesses[0] == 5 * 512 + 0xbc
+
+    # compulsory misses reference new blocks only if unbounded
+    assert any(access >= 8 * 512 for access in accesses) == unbounded
+
+    # the reference engine gives the same trace
+    reference = str(tmpdir.join('reference.stl'))
+    if not unbounded:
+        np.random.seed(0)
+        GenerateSyntheticTrace(reference, 500, [profile + '.h5'], engine = "reference", warmStart = True)
+        with open(warm) as a, open(reference) as b:
+            assert a.read() == b.read()
+
+def test_no_warm_state(tmpdir):
+    """ tests profiles without a saved state are rejected"""
+    trace = str(tmpdir.join('trace.ovp'))
+    write_trace(trace)
+    profile = str(tmpdir.join('profile.h5'))
+    GenerateApplicationProfile(trace, profile[:-3], parseProcesses = 0)
+    with h5.File(profile, 'a') as file:
+        del file['lruOrder']
+
+    with pytest.raises(ValueError):
+        GenerateSyntheticTrace(str(tmpdir.join('out.stl')), 10, [profile], warmStart = True)
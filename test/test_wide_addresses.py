@@ -0,0 +1,41 @@
+import pytest
+import numpy as np
+import h5py as h5
+from lib.TracePipeline import ParseChunk
+from lib.Equivalence import CompareProfiles
+from ApplicationProfiler import GenerateApplicationProfile
+
+def test_64_bit_blocks(tmpdir):
+    """ tests blocks above 4 GB & in the upper half of the address space
+        are not aliased & every engine agrees"""
+    trace = str(tmpdir.join('trace.ovp'))
+    random = np.random.RandomState(0)
+    bases = [0x100000000, 0x200000000, 0x7fffdead0000, 0xffff800000001000]
+    with open(trace, 'w') as file:
+        for i in xrange(1000):
+            if random.randint(3) == 0:
+                file.write("i,10\n")
+            file.write("r,0x%x\n" % (bases[random.randint(4)] + random.randint(8) * 512 + 4 * random.randint(128)))
+
+    GenerateApplicationProfile(trace, str(tmpdir.join('serial')), parseProcesses = 0)
+    with h5.File(str(tmpdir.join('serial.h5')), 'r') as profile:
+        workingSet = profile['workingSet'][()]
+
+    # 8 blocks at each base
+    assert len(workingSet) == 32
+    assert workingSet.dtype == np.uint64
+    assert set(workingSet.tolist()) == set(base + i * 512 for base in bases for i in xrange(8))
+
+    GenerateApplicationProfile(trace, str(tmpdir.join('chunked')), parallelChunks = 3, chunkProcesses = 2)
+    GenerateApplicationProfile(trace, str(tmpdir.join('reference')), engine = "reference")
+    assert CompareProfiles(str(tmpdir.join('serial.h5')), str(tmpdir.join('chunked.h5'))) == []
+    assert CompareProfiles(str(tmpdir.join('serial.h5')), str(tmpdir.join('reference.h5'))) == []
+
+def test_address_range():
+    """ tests the whole unsigned 64-bit range is parsed & larger addresses
+        are rejected"""
+    memAddresses, accessTypes = ParseChunk("r,0x7fffffffffffffff\nw,0xffff800000001000\nr,0xffffffffffffffff\n")
+    assert memAddresses.tolist() == [2**63 - 1, 0xffff800000001000, 2**64 - 1]
+    assert accessTypes.tolist() == [0, 1, 0]
+    with pytest.raises(ValueError):
+        ParseChunk("r,0x10000000000000000\n")